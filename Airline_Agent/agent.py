@@ -1,17 +1,26 @@
+import argparse
 
 from langchain_core.messages import HumanMessage
 from utils.state import create_support_graph
+from utils.streaming import stream_turn
+
+parser = argparse.ArgumentParser(description="Chat with the booking agent in the terminal")
+parser.add_argument("--draw", metavar="PATH", nargs="?", const="workflow_graph.png",
+                    help="Save the graph as a PNG (default workflow_graph.png) and exit; "
+                         "rendering calls the mermaid.ink web service")
+args = parser.parse_args()
 
 app = create_support_graph()
 
-# Save the graph visualization
-try:
-    graph_png = app.get_graph().draw_mermaid_png()
-    with open("workflow_graph.png", "wb") as f:
-        f.write(graph_png)
-    print("Graph saved to workflow_graph.png\n")
-except Exception as e:
-    print(f"Could not save graph: {e}\n")
+if args.draw:
+    try:
+        graph_png = app.get_graph().draw_mermaid_png()
+        with open(args.draw, "wb") as f:
+            f.write(graph_png)
+        print(f"Graph saved to {args.draw}")
+    except Exception as e:
+        print(f"Could not save graph: {e}")
+    exit()
 
 # Initialize state
 state = {
@@ -70,18 +79,15 @@ while True:
     state["intent"] = ""
     state["next"] = ""
 
-    # Invoke the agent
+    # Stream the agent's answer as it is generated
     try:
-        result = app.invoke(state)
-        state = result
-
-        # Get the last AI message
-        last_message = state["messages"][-1]
-        if hasattr(last_message, 'content'):
-            response = last_message.content
-            print(f"\nAgent : {response}")
-        else:
-            print(f"\nAgent: {last_message}")
+        print("\nAgent : ", end="", flush=True)
+        for event, data in stream_turn(app, state, on_complete=state.update):
+            if event == "token":
+                print(data["text"], end="", flush=True)
+            elif event == "error":
+                raise RuntimeError(data["message"])
+        print()
 
         print("-" * 60)
 
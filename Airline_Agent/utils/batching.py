@@ -0,0 +1,137 @@
+"""
+Running many chat messages through the graph at once (/api/chat/batch).
+
+Messages for different sessions run concurrently through graph.batch /
+graph.abatch, limited by max_concurrency. Messages for the same session
+keep their order: the batch is split into rounds where round k holds the
+k-th message of every session, and each round starts from the states the
+previous round saved. All sessions in the batch are locked for its
+duration, so they do not interleave with single /api/chat requests.
+"""
+import asyncio
+import os
+from contextlib import AsyncExitStack, ExitStack
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import HumanMessage
+
+from .state import get_initial_state, get_turn_response
+
+# Upper bound for the per-request max_concurrency
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "8"))
+# Most messages accepted in one batch request
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "100"))
+
+
+def parse_batch_request(data: Dict) -> Tuple[List[Dict], int]:
+    """
+    Validate a batch request body.
+
+    Returns:
+        (items, max_concurrency)
+    Raises:
+        ValueError: If the body is malformed
+    """
+    items = (data or {}).get('items')
+    if not isinstance(items, list) or not items:
+        raise ValueError("'items' must be a non-empty list of {session_id, message}")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise ValueError(f"At most {BATCH_MAX_ITEMS} items per batch")
+    for item in items:
+        if not isinstance(item, dict) or not item.get('message'):
+            raise ValueError("Every item needs a 'message'")
+
+    max_concurrency = data.get('max_concurrency')
+    if max_concurrency is None:
+        max_concurrency = BATCH_MAX_CONCURRENCY
+    # bool is an int subclass, so `true` would otherwise pass as 1
+    if isinstance(max_concurrency, bool) or not isinstance(max_concurrency, int) or max_concurrency < 1:
+        raise ValueError("'max_concurrency' must be a positive integer")
+    return items, min(max_concurrency, BATCH_MAX_CONCURRENCY)
+
+
+def batch_rounds(items: List[Dict]) -> List[List[int]]:
+    """Split item indices into rounds with at most one message per session each."""
+    rounds = []
+    seen = {}  # session_id -> messages scheduled so far
+    for index, item in enumerate(items):
+        session_id = item.get('session_id', 'default')
+        position = seen.get(session_id, 0)
+        seen[session_id] = position + 1
+        if position == len(rounds):
+            rounds.append([])
+        rounds[position].append(index)
+    return rounds
+
+
+def _prepare_round(sessions, items: List[Dict], round_indices: List[int], results: List[Dict]):
+    """Build input states for a round, answering idempotent retries from the store."""
+    pending, states = [], []
+    for index in round_indices:
+        item = items[index]
+        session_id = item.get('session_id', 'default')
+        key = item.get('idempotency_key')
+        cached = sessions.get_response(session_id, key) if key else None
+        if cached:
+            results[index] = {'index': index, 'session_id': session_id, **cached}
+            continue
+
+        state = sessions.get(session_id) or get_initial_state()
+        states.append({
+            **state,
+            "messages": state["messages"] + [HumanMessage(content=item['message'])],
+            "intent": "",
+            "next": ""
+        })
+        pending.append(index)
+    return pending, states
+
+
+def _finish_round(sessions, items: List[Dict], pending: List[int], outputs: List, results: List[Dict]):
+    """Save each successful turn and record per-item results and errors."""
+    for index, output in zip(pending, outputs):
+        session_id = items[index].get('session_id', 'default')
+        if isinstance(output, Exception):
+            results[index] = {'index': index, 'session_id': session_id, 'status': 'error',
+                              'message': f'Error processing message: {str(output)}'}
+            continue
+        response = {'status': 'success', **get_turn_response(output)}
+        sessions.save(session_id, output, idempotency_key=items[index].get('idempotency_key'),
+                      response=response)
+        results[index] = {'index': index, 'session_id': session_id, **response}
+
+
+def _batch_sessions(items: List[Dict]) -> List[str]:
+    # Locks are taken in sorted order so overlapping batches cannot deadlock
+    return sorted({item.get('session_id', 'default') for item in items})
+
+
+def run_batch(graph, sessions, locks, items: List[Dict], max_concurrency: int) -> List[Dict]:
+    """Run a batch with graph.batch; returns one result per item, in input order."""
+    results = [None] * len(items)
+    with ExitStack() as stack:
+        for session_id in _batch_sessions(items):
+            stack.enter_context(locks.hold(session_id))
+        for round_indices in batch_rounds(items):
+            pending, states = _prepare_round(sessions, items, round_indices, results)
+            if states:
+                outputs = graph.batch(states, config={"max_concurrency": max_concurrency},
+                                      return_exceptions=True)
+                _finish_round(sessions, items, pending, outputs, results)
+    return results
+
+
+async def arun_batch(graph, sessions, locks, items: List[Dict], max_concurrency: int) -> List[Dict]:
+    """Run a batch with graph.abatch; returns one result per item, in input order."""
+    results = [None] * len(items)
+    async with AsyncExitStack() as stack:
+        for session_id in _batch_sessions(items):
+            await stack.enter_async_context(locks.hold(session_id))
+        for round_indices in batch_rounds(items):
+            # Session store reads and writes run off the event loop
+            pending, states = await asyncio.to_thread(_prepare_round, sessions, items, round_indices, results)
+            if states:
+                outputs = await graph.abatch(states, config={"max_concurrency": max_concurrency},
+                                             return_exceptions=True)
+                await asyncio.to_thread(_finish_round, sessions, items, pending, outputs, results)
+    return results
@@ -0,0 +1,178 @@
+"""
+Bounded conversation context for the graph nodes.
+
+The session history in SupportState["messages"] is compacted at the start of
+every turn: the most recent turns that fit CONTEXT_MAX_TOKENS are kept and
+older turns are folded into a rolling plain-text summary (state["summary"]),
+itself capped at SUMMARY_MAX_TOKENS. Each prompt then asks for its own slice
+of that window through HISTORY_POLICIES, so prompt size stays bounded no
+matter how long the session runs.
+
+Token counts are estimated (about four characters per token); they only need
+to be good enough to keep prompts in budget.
+"""
+import os
+from typing import Dict, List, Tuple
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage, ToolMessage
+
+# Token budget for the messages kept in the session state
+CONTEXT_MAX_TOKENS = int(os.getenv("CONTEXT_MAX_TOKENS", "3000"))
+# Never keep more than this many user turns in the session state
+CONTEXT_MAX_TURNS = int(os.getenv("CONTEXT_MAX_TURNS", "10"))
+# Token budget for the rolling summary of folded turns
+SUMMARY_MAX_TOKENS = int(os.getenv("SUMMARY_MAX_TOKENS", "400"))
+# Longest excerpt of a single message kept in a summary line
+SUMMARY_LINE_CHARS = 160
+
+# How much history each prompt gets:
+#   max_tokens:   budget for the rendered history (summary included)
+#   tool_results: include tool outputs (flight/hotel listings, booking results)
+#   tool_chars:   clip each tool output to this many characters
+HISTORY_POLICIES: Dict[str, Dict] = {
+    "intent_detect": {"max_tokens": 600, "tool_results": False, "tool_chars": 0},
+    "route_request": {"max_tokens": 1500, "tool_results": True, "tool_chars": 600},
+    "flight_agent": {"max_tokens": 600, "tool_results": False, "tool_chars": 0},
+    "hotel_agent": {"max_tokens": 600, "tool_results": False, "tool_chars": 0},
+    "book_flight": {"max_tokens": 1500, "tool_results": True, "tool_chars": 1200},
+    "book_hotel": {"max_tokens": 1500, "tool_results": True, "tool_chars": 1200},
+}
+DEFAULT_HISTORY_POLICY = {"max_tokens": 800, "tool_results": False, "tool_chars": 0}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token)."""
+    return (len(text or "") + 3) // 4
+
+
+def _clip(text: str, max_chars: int) -> str:
+    text = " ".join(str(text or "").split())
+    if max_chars and len(text) > max_chars:
+        return text[:max_chars - 3].rstrip() + "..."
+    return text
+
+
+def _speaker(message: BaseMessage) -> str:
+    if isinstance(message, HumanMessage):
+        return "User"
+    if isinstance(message, ToolMessage):
+        return f"Tool {message.tool_call_id}"
+    return "Assistant"
+
+
+def split_turns(messages: List[BaseMessage]) -> List[List[BaseMessage]]:
+    """Group messages into turns, each starting at a user message."""
+    turns = []
+    for message in messages:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([])
+        turns[-1].append(message)
+    return turns
+
+
+def _summarize_turn(turn: List[BaseMessage]) -> str:
+    """One summary line for a folded turn: the request and how it ended."""
+    request = next((m.content for m in turn if isinstance(m, HumanMessage)), "")
+    outcome = ""
+    for message in reversed(turn):
+        if isinstance(message, ToolMessage) and message.tool_call_id.startswith("book_"):
+            outcome = message.content  # booking results matter more than the chat reply
+            break
+        if isinstance(message, AIMessage) and not outcome:
+            outcome = message.content
+    line = f"- User: {_clip(request, SUMMARY_LINE_CHARS)}"
+    if outcome:
+        line += f" -> {_clip(outcome, SUMMARY_LINE_CHARS)}"
+    return line
+
+
+def _cap_summary(lines: List[str]) -> str:
+    """Keep the newest summary lines that fit SUMMARY_MAX_TOKENS."""
+    kept, used = [], 0
+    for line in reversed(lines):
+        cost = estimate_tokens(line) + 1
+        if kept and used + cost > SUMMARY_MAX_TOKENS:
+            break
+        kept.append(line)
+        used += cost
+    return "\n".join(reversed(kept))
+
+
+def compact_history(messages: List[BaseMessage], summary: str = "") -> Tuple[List[BaseMessage], str, int]:
+    """
+    Fold old turns into the rolling summary until the history fits its budget.
+
+    The latest turn is always kept whole, so the current user message (and
+    the messages[-2] layout set_variables relies on) is never touched.
+
+    Args:
+        messages: Session history, oldest first
+        summary: Rolling summary from earlier compactions
+    Returns:
+        (kept messages, updated summary, number of messages folded)
+    """
+    turns = split_turns(messages)
+    kept, used = [], 0
+    for turn in reversed(turns):
+        cost = sum(estimate_tokens(m.content) for m in turn)
+        if kept and (used + cost > CONTEXT_MAX_TOKENS or len(kept) >= CONTEXT_MAX_TURNS):
+            break
+        kept.append(turn)
+        used += cost
+    kept.reverse()
+
+    folded = turns[:len(turns) - len(kept)]
+    if not folded:
+        return messages, summary, 0
+
+    lines = summary.splitlines() if summary else []
+    lines.extend(_summarize_turn(turn) for turn in folded)
+    kept_messages = [m for turn in kept for m in turn]
+    return kept_messages, _cap_summary(lines), len(messages) - len(kept_messages)
+
+
+def _window(state: Dict, node: str) -> Tuple[str, List[Tuple[BaseMessage, str]]]:
+    """The summary and the newest messages that fit the node's history budget."""
+    policy = HISTORY_POLICIES.get(node, DEFAULT_HISTORY_POLICY)
+    summary = state.get("summary") or ""
+    budget = policy["max_tokens"] - estimate_tokens(summary)
+
+    window = []
+    for message in reversed(state.get("messages") or []):
+        if isinstance(message, ToolMessage) and not policy["tool_results"]:
+            continue
+        content = _clip(message.content, policy["tool_chars"]) if isinstance(message, ToolMessage) \
+            else message.content
+        cost = estimate_tokens(content)
+        if window and cost > budget:
+            break
+        window.append((message, content))
+        budget -= cost
+    window.reverse()
+    return summary, window
+
+
+def history_messages(state: Dict, node: str) -> List[BaseMessage]:
+    """
+    Chat history for a node that sends messages to the LLM directly.
+
+    The summary becomes a leading SystemMessage and tool outputs are turned
+    into plain assistant notes, so no ToolMessage is sent without the tool
+    call that produced it.
+    """
+    summary, window = _window(state, node)
+    messages = [SystemMessage(content=f"Summary of earlier conversation:\n{summary}")] if summary else []
+    for message, content in window:
+        if isinstance(message, ToolMessage):
+            messages.append(AIMessage(content=f"[{message.tool_call_id} result] {content}"))
+        else:
+            messages.append(message)
+    return messages
+
+
+def render_history(state: Dict, node: str) -> str:
+    """Chat history for a node that interpolates it into a prompt, one line per message."""
+    summary, window = _window(state, node)
+    lines = [f"Earlier conversation (summary):\n{summary}"] if summary else []
+    lines.extend(f"{_speaker(message)}: {content}" for message, content in window)
+    return "\n".join(lines)
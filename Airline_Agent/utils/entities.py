@@ -0,0 +1,222 @@
+"""
+Deterministic entity extraction for customer IDs, flight/hotel IDs,
+airports and cities.
+
+Every extractor checks its candidates against the live flights, hotels and
+customers tables, so a value is only returned if it actually exists. Nodes
+call these first and fall back to the LLM only when they return None.
+"""
+import re
+import sys
+import os
+import threading
+import time
+from difflib import SequenceMatcher
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+# Add parent directory to path to access Data folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Data.database import db, CATALOG_CACHE_TTL
+
+CUSTOMER_ID_PATTERN = re.compile(r"\bCUST\d+\b", re.IGNORECASE)
+FLIGHT_ID_PATTERN = re.compile(r"\bFLIGHT\d+\b", re.IGNORECASE)
+HOTEL_ID_PATTERN = re.compile(r"\bHOTEL\d+\b", re.IGNORECASE)
+AIRPORT_CODE_PATTERN = re.compile(r"\b[A-Za-z]{3}\b")
+DEPARTURE_MARKER_PATTERN = re.compile(r"\b(from|departing|leaving|out of)\s+$", re.IGNORECASE)
+ARRIVAL_MARKER_PATTERN = re.compile(r"\b(to|into|arriving (?:at|in)|landing (?:at|in))\s+$", re.IGNORECASE)
+
+# Minimum similarity for a fuzzy city match ("san francisco" vs "San Fransisco")
+FUZZY_CITY_THRESHOLD = 0.85
+
+# Cities served by each airport in the catalog
+CITY_AIRPORTS = {
+    "new york": "JFK",
+    "nyc": "JFK",
+    "los angeles": "LAX",
+    "chicago": "ORD",
+    "san francisco": "SFO",
+}
+
+
+# ==================== ID Extraction ====================
+
+def extract_customer_id(text: str) -> Optional[str]:
+    """Return the first customer ID in the text that exists in the customers table."""
+    for match in CUSTOMER_ID_PATTERN.findall(text or ""):
+        customer = db.get_customer(match.upper())
+        if customer:
+            return customer["customer_id"]
+    return None
+
+
+def extract_flight_id(text: str) -> Optional[str]:
+    """Return the first flight ID in the text that exists in the flights table."""
+    candidates = [m.upper() for m in FLIGHT_ID_PATTERN.findall(text or "")]
+    if not candidates:
+        return None
+    found = db.get_flights_by_ids(candidates)
+    return found[0]["flight_id"] if found else None
+
+
+def extract_hotel_id(text: str) -> Optional[str]:
+    """Return the first hotel ID in the text that exists in the hotels table."""
+    candidates = [m.upper() for m in HOTEL_ID_PATTERN.findall(text or "")]
+    if not candidates:
+        return None
+    found = db.get_hotels_by_ids(candidates)
+    return found[0]["hotel_id"] if found else None
+
+
+# ==================== Place Extraction ====================
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"[a-z]+", (text or "").lower())
+
+
+class PlaceVocabulary:
+    """Place names indexed by their lowercase words, for matching against messages."""
+
+    def __init__(self, places: Iterable[str]):
+        self.places: Dict[str, str] = {}  # "new york" -> "New York"
+        self.by_size: Dict[int, List[Tuple[str, str]]] = {}
+        for place in places:
+            key = " ".join(_words(place))
+            if key and key not in self.places:
+                self.places[key] = place
+                self.by_size.setdefault(len(key.split()), []).append((key, place))
+        self.max_words = max(self.by_size, default=0)
+
+    def match(self, text: str) -> Optional[str]:
+        """Find the place named in the text, exactly or by close spelling."""
+        words = _words(text)
+        sizes = range(min(self.max_words, len(words)), 0, -1)
+
+        # Exact: dictionary lookups of word runs, longest names first
+        for size in sizes:
+            for i in range(len(words) - size + 1):
+                place = self.places.get(" ".join(words[i:i + size]))
+                if place:
+                    return place
+
+        # Fuzzy: compare word runs with places of the same length; the quick
+        # ratios are upper bounds of ratio() and rule out most pairs cheaply
+        best_place, best_score = None, 0.0
+        for size in sizes:
+            for i in range(len(words) - size + 1):
+                matcher = SequenceMatcher(None, "", " ".join(words[i:i + size]), autojunk=False)
+                for key, place in self.by_size.get(size, ()):
+                    matcher.set_seq1(key)
+                    if (matcher.real_quick_ratio() < FUZZY_CITY_THRESHOLD
+                            or matcher.quick_ratio() < FUZZY_CITY_THRESHOLD):
+                        continue
+                    score = matcher.ratio()
+                    if score > best_score:
+                        best_place, best_score = place, score
+        return best_place if best_score >= FUZZY_CITY_THRESHOLD else None
+
+
+# Vocabularies built from the catalog: name -> (catalog generation, built at, vocabulary)
+_vocabularies: Dict[str, tuple] = {}
+_vocabularies_lock = threading.Lock()
+
+CITY_AIRPORT_VOCABULARY = PlaceVocabulary(CITY_AIRPORTS)
+
+
+def _vocabulary(namespace: str, load: Callable[[], Iterable[str]], build: Callable = PlaceVocabulary):
+    """
+    A vocabulary built from a catalog query, rebuilt after catalog writes in
+    this process or CATALOG_CACHE_TTL seconds (writes from other processes).
+    """
+    name = f"{namespace}:{load.__name__}"
+    generation = db.catalog_generation(namespace)
+    with _vocabularies_lock:
+        cached = _vocabularies.get(name)
+        if cached and cached[0] == generation and time.monotonic() - cached[1] <= CATALOG_CACHE_TTL:
+            return cached[2]
+    vocabulary = build(load())
+    with _vocabularies_lock:
+        _vocabularies[name] = (generation, time.monotonic(), vocabulary)
+    return vocabulary
+
+
+def _hotel_locations():
+    return db.get_hotel_locations()
+
+
+def _airport_codes():
+    return db.get_airport_codes()
+
+
+def extract_city(text: str) -> Optional[str]:
+    """Return the hotel location named in the text, spelled as stored in the hotels table."""
+    return _vocabulary("hotels", _hotel_locations).match(text)
+
+
+def _airport_mentions(text: str) -> List[tuple]:
+    """(position, code) for each known airport mentioned in the text, in order."""
+    text = text or ""
+    known = _vocabulary("flights", _airport_codes, frozenset)
+    mentions = []
+
+    # Codes are normally uppercase; accept "jfk" only when the whole message is lowercase
+    case_insensitive = text == text.lower()
+    for match in AIRPORT_CODE_PATTERN.finditer(text):
+        token = match.group(0)
+        if (token.isupper() or case_insensitive) and token.upper() in known:
+            mentions.append((match.start(), token.upper()))
+
+    lowered = text.lower()
+    for city, code in CITY_AIRPORTS.items():
+        for match in re.finditer(r"\b" + re.escape(city) + r"\b", lowered):
+            if code in known:
+                mentions.append((match.start(), code))
+
+    if not mentions:
+        city = CITY_AIRPORT_VOCABULARY.match(text)
+        if city and CITY_AIRPORTS[city] in known:
+            mentions.append((0, CITY_AIRPORTS[city]))
+
+    return sorted(mentions)
+
+
+def extract_airports(text: str) -> List[str]:
+    """
+    Return known airport codes mentioned in the text, in order of appearance.
+
+    Codes are matched against airports in the flights table; city names are
+    mapped through CITY_AIRPORTS.
+    """
+    ordered = []
+    for _, code in _airport_mentions(text):
+        if code not in ordered:
+            ordered.append(code)
+    return ordered
+
+
+def extract_departure_airport(text: str) -> Optional[str]:
+    """Return the departure airport: the one after "from"/"departing", else the first mentioned."""
+    mentions = _airport_mentions(text)
+    if not mentions:
+        return None
+    for position, code in mentions:
+        if DEPARTURE_MARKER_PATTERN.search(text[:position]):
+            return code
+    return mentions[0][1]
+
+
+def extract_route(text: str) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Return (departure, arrival) airports for "ORD to JFK" style requests.
+
+    The arrival is the airport after "to"/"arriving at", else the first
+    airport other than the departure; it is None unless two airports are named.
+    """
+    departure = extract_departure_airport(text)
+    others = [(position, code) for position, code in _airport_mentions(text) if code != departure]
+    if not departure or not others:
+        return departure, None
+    for position, code in others:
+        if ARRIVAL_MARKER_PATTERN.search(text[:position]):
+            return departure, code
+    return departure, others[0][1]
@@ -0,0 +1,144 @@
+"""
+Compact encoding of tool results for the respond prompts.
+
+Tools return JSON (records, pages of records, itineraries); pasted as-is,
+every row repeats every key and full "YYYY-MM-DD HH:MM:SS" timestamps. The
+tool nodes store compact_tool_result() output in their ToolMessage instead:
+
+    showing 1-10 of 42, next_offset 10
+    departure_airport: JFK
+    flight_id|arrival_airport|departure_time|arrival_time
+    FLIGHT123|LAX|10-15 08:00|10-15 11:30
+
+- keys are written once as a table header,
+- columns with the same value in every row are hoisted above the table,
+- each tool only keeps the fields its answer needs (TOOL_RESULT_FIELDS),
+- seconds are dropped from timestamps, and the year too when all share it.
+
+Anything that is not JSON (booking results, "not found" messages) passes
+through unchanged. Raw and compact token counts (context.estimate_tokens)
+are recorded per tool in tool_result_tokens_total{tool, encoding}.
+"""
+import json
+import re
+from typing import Dict, List, Optional, Sequence
+
+from .context import estimate_tokens
+from Data.metrics import metrics
+
+# Fields kept per tool node (tool_call_id), in column order; unknown tools keep every field
+TOOL_RESULT_FIELDS: Dict[str, Sequence[str]] = {
+    "flight_details": ("flight_id", "departure_airport", "arrival_airport", "departure_time", "arrival_time"),
+    "all_flights": ("flight_id", "departure_airport", "arrival_airport", "departure_time", "arrival_time"),
+    "hotel_details": ("hotel_id", "name", "location", "price_per_night"),
+    "all_hotels": ("hotel_id", "name", "location", "price_per_night"),
+    "lookup_customer": ("customer_id", "item_type", "item_id", "departure_airport", "arrival_airport",
+                        "departure_time", "arrival_time", "name", "location", "price_per_night"),
+}
+
+TIMESTAMP_PATTERN = re.compile(r"^(\d{4})-(\d{2}-\d{2}) (\d{2}:\d{2})(?::\d{2})?$")
+
+TOOL_RESULT_TOKENS = metrics.counter(
+    "tool_result_tokens_total", "Estimated tokens of tool results before and after compact encoding",
+    labels=("tool", "encoding"))
+
+
+def _value(value) -> str:
+    if value is None:
+        return "-"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).replace("|", "/")
+
+
+def _trim_timestamps(rows: List[Dict]) -> Optional[str]:
+    """Drop seconds from timestamp values, and the year if they all share one; returns that year."""
+    years = {match.group(1) for row in rows for value in row.values()
+             for match in [TIMESTAMP_PATTERN.match(str(value))] if match}
+    drop_year = len(years) == 1
+    for row in rows:
+        for key, value in row.items():
+            match = TIMESTAMP_PATTERN.match(str(value)) if isinstance(value, str) else None
+            if match:
+                row[key] = f"{match.group(2)} {match.group(3)}" if drop_year else \
+                    f"{match.group(1)}-{match.group(2)} {match.group(3)}"
+    return years.pop() if drop_year else None
+
+
+def format_records(records: List[Dict], fields: Sequence[str] = None) -> str:
+    """Render records as a header line plus one "|"-separated line per record."""
+    if fields:
+        rows = [{key: record.get(key) for key in fields if key in record} for record in records]
+    else:
+        rows = [dict(record) for record in records]
+    if not rows:
+        return "no results"
+
+    lines = []
+    year = _trim_timestamps(rows)
+    if year:
+        lines.append(f"year: {year}")
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    if len(rows) > 1:
+        # Values shared by every row are stated once
+        for key in list(columns):
+            values = {_value(row.get(key)) for row in rows}
+            if len(values) == 1 and len(columns) > 1:
+                lines.append(f"{key}: {values.pop()}")
+                columns.remove(key)
+    lines.append("|".join(columns))
+    lines.extend("|".join(_value(row.get(key)) for key in columns) for row in rows)
+    return "\n".join(lines)
+
+
+def format_itineraries(itineraries: List[Dict]) -> str:
+    """One line per itinerary: stops, duration, then legs and layovers."""
+    legs = [leg for itinerary in itineraries for leg in itinerary.get("legs", [])]
+    year = _trim_timestamps(legs)
+    lines = [f"year: {year}"] if year else []
+    for number, itinerary in enumerate(itineraries, 1):
+        hours, minutes = divmod(itinerary.get("total_minutes", 0), 60)
+        steps = []
+        for index, leg in enumerate(itinerary.get("legs", [])):
+            if index:
+                steps.append(f"{itinerary['layover_minutes'][index - 1]}m layover")
+            steps.append(f"{leg['flight_id']} {leg['departure_airport']} {leg['departure_time']}"
+                         f" -> {leg['arrival_airport']} {leg['arrival_time']}")
+        lines.append(f"{number}. {itinerary.get('stops', 0)} stop(s), {hours}h{minutes:02d}m: " + "; ".join(steps))
+    return "\n".join(lines)
+
+
+def encode_tool_result(tool: str, content: str) -> str:
+    """Compact text for a tool's JSON output; non-JSON content is returned unchanged."""
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return content
+
+    fields = TOOL_RESULT_FIELDS.get(tool)
+    if isinstance(data, dict) and "total" in data:
+        # A page from a browse tool: {"total", "offset", "next_offset", "<kind>": [...]}
+        items = next((value for value in data.values() if isinstance(value, list)), [])
+        offset = data.get("offset") or 0
+        header = f"showing {offset + 1}-{offset + len(items)} of {data['total']}" if items else f"total {data['total']}"
+        if data.get("next_offset") is not None:
+            header += f", next_offset {data['next_offset']}"
+        return f"{header}\n{format_records(items, fields)}"
+    if isinstance(data, dict):
+        return format_records([data], fields)
+    if isinstance(data, list) and data and all(isinstance(item, dict) for item in data):
+        if "legs" in data[0]:
+            return format_itineraries(data)
+        return format_records(data, fields)
+    if isinstance(data, list) and not data:
+        return "no results"
+    return content
+
+
+def compact_tool_result(tool: str, content: str) -> str:
+    """encode_tool_result, recording raw and compact token counts for the tool."""
+    compact = encode_tool_result(tool, content)
+    raw_tokens, compact_tokens = estimate_tokens(content), estimate_tokens(compact)
+    TOOL_RESULT_TOKENS.inc(tool, "raw", amount=raw_tokens)
+    TOOL_RESULT_TOKENS.inc(tool, "compact", amount=compact_tokens)
+    return compact
@@ -0,0 +1,108 @@
+"""
+Deterministic intent pre-classifier used ahead of the LLM in intent_detect.
+
+Handles messages whose intent is obvious from their surface form (a bare
+customer ID, "book FLIGHT456", "hotels in Chicago", ...). Each rule returns
+one of the existing intents with a confidence score; intent_detect skips the
+LLM call only when the confidence clears its threshold.
+"""
+import re
+from typing import Optional, Tuple
+
+from .entities import (CUSTOMER_ID_PATTERN,
+                       FLIGHT_ID_PATTERN,
+                       HOTEL_ID_PATTERN,
+                       extract_airports,
+                       extract_city)
+
+# A message that is nothing but a customer ID, optionally introduced ("my id is CUST123")
+BARE_CUSTOMER_ID_PATTERN = re.compile(
+    r"^\s*(?:(?:hi|hello|hey)[\s,!.]*)?(?:(?:my|the)\s+)?(?:customer\s*)?(?:id\s*)?"
+    r"(?:is\s*)?[:#-]?\s*CUST\d+\s*[.!]?\s*$",
+    re.IGNORECASE,
+)
+
+BOOK_VERB_PATTERN = re.compile(r"\b(book|reserve|get me|i'?ll take)\b", re.IGNORECASE)
+FLIGHT_WORD_PATTERN = re.compile(r"\bflights?\b", re.IGNORECASE)
+HOTEL_WORD_PATTERN = re.compile(r"\b(hotels?|stay|rooms?|accommodations?)\b", re.IGNORECASE)
+MY_FLIGHT_PATTERN = re.compile(r"\bmy\s+(?:\w+\s+)?flights?\b", re.IGNORECASE)
+MY_HOTEL_PATTERN = re.compile(r"\bmy\s+(?:\w+\s+)?(hotel|room|stay)s?\b", re.IGNORECASE)
+DEPARTURE_PATTERN = re.compile(r"\b(from|departing|leaving|out of)\b", re.IGNORECASE)
+LOCATION_PATTERN = re.compile(r"\b(in|at|near|around)\b", re.IGNORECASE)
+SUPPORT_PATTERN = re.compile(
+    r"\b(ticket|complaint|refund|issue|problem|help desk|support|help|cancel\w*|change|reschedule|rebook"
+    r"|modify|upgrade|delay(?:ed)?|missed|lost)\b",
+    re.IGNORECASE,
+)
+
+
+def mentions_airport(text: str) -> bool:
+    """True if the text names an airport (code or city) served by the flights table"""
+    return bool(extract_airports(text))
+
+
+def mentions_city(text: str) -> bool:
+    """True if the text names a hotel location in the hotels table"""
+    return extract_city(text) is not None
+
+
+def classify_intent(text: str) -> Tuple[Optional[str], float]:
+    """
+    Classify a user message without calling the LLM.
+
+    Args:
+        text: The latest user message
+    Returns:
+        (intent, confidence) - intent is None when no rule applies
+    """
+    text = (text or "").strip()
+    if not text:
+        return None, 0.0
+
+    has_flight_word = bool(FLIGHT_WORD_PATTERN.search(text) or FLIGHT_ID_PATTERN.search(text))
+    has_hotel_word = bool(HOTEL_WORD_PATTERN.search(text) or HOTEL_ID_PATTERN.search(text))
+    wants_booking = bool(BOOK_VERB_PATTERN.search(text))
+    needs_support = bool(SUPPORT_PATTERN.search(text))
+
+    # "CUST123" / "my customer id is CUST123"
+    if BARE_CUSTOMER_ID_PATTERN.match(text):
+        return "set_state_variables", 0.98
+    # An ID inside a longer message ("CUST123 wants to cancel") may come with
+    # another request, so it stays below the threshold and goes to the LLM
+    if CUSTOMER_ID_PATTERN.search(text) and not (has_flight_word or has_hotel_word or wants_booking):
+        return "set_state_variables", 0.6
+
+    # Requests that mix flights and hotels are left to the LLM
+    if has_flight_word and has_hotel_word:
+        return None, 0.0
+
+    # "book FLIGHT456" / "reserve HOTEL123"
+    if wants_booking and FLIGHT_ID_PATTERN.search(text):
+        return "book_flight", 0.97
+    if wants_booking and HOTEL_ID_PATTERN.search(text):
+        return "book_hotel", 0.97
+
+    # "show my flight details" / "where is my hotel"
+    if MY_FLIGHT_PATTERN.search(text) and not (wants_booking or has_hotel_word or needs_support):
+        return "my_flight_details", 0.92
+    if MY_HOTEL_PATTERN.search(text) and not (wants_booking or has_flight_word or needs_support):
+        return "my_hotel_details", 0.92
+
+    # "flights from JFK" / "hotels in Chicago"
+    if has_flight_word and not wants_booking and mentions_airport(text):
+        confidence = 0.95 if DEPARTURE_PATTERN.search(text) else 0.85
+        return "all_flight_details", confidence
+    if has_hotel_word and not wants_booking and mentions_city(text):
+        confidence = 0.95 if LOCATION_PATTERN.search(text) else 0.85
+        return "all_hotel_details", confidence
+
+    # "book a flight" without an ID usually depends on earlier turns
+    if wants_booking and has_flight_word:
+        return "book_flight", 0.8
+    if wants_booking and has_hotel_word:
+        return "book_hotel", 0.8
+
+    if needs_support and not (has_flight_word or has_hotel_word):
+        return "customer_support_help", 0.7
+
+    return None, 0.0
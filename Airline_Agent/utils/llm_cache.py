@@ -0,0 +1,306 @@
+"""
+Response cache for LLM calls made by the graph nodes.
+
+Two tiers: an in-memory LRU in front of an optional on-disk SQLite table.
+Keys hash the model, temperature and the normalized prompt (message types
+plus contents with whitespace collapsed), so prompts that differ only in
+spacing share an entry. Case is kept: it can change the answer (IDs, names). Caching is opt-in
+per node: only nodes listed in the policies dict are cached, each with its
+own TTL.
+"""
+import hashlib
+import json
+import re
+import sys
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from langchain_core.messages import AIMessage, BaseMessage
+
+# Add parent directory to path to access Data folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Data.connection_pool import ConnectionPool
+from Data.metrics import LLM_CALL_SECONDS, LLM_TOKENS
+
+# Purge expired disk entries once every this many writes
+PURGE_EVERY = 500
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace so prompts differing only in spacing share a key."""
+    return re.sub(r"\s+", " ", str(text)).strip()
+
+
+def make_cache_key(messages: List[BaseMessage], model: str, temperature: float) -> str:
+    """Stable hash of model, temperature and the normalized prompt."""
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": [[m.type, normalize_text(m.content)] for m in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Two-tier (memory LRU + SQLite) store of LLM response texts with TTL."""
+
+    def __init__(self, max_entries: int = 2048, db_path: Optional[str] = None):
+        """
+        Args:
+            max_entries: Maximum responses kept in memory
+            db_path: SQLite file for the persistent tier (None keeps the cache in memory only)
+        """
+        self.max_entries = max_entries
+        self._memory = OrderedDict()  # key -> (expires_at, content)
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.stats = {}  # node -> {"hits": n, "misses": n, "disk_hits": n}
+
+        self.pool = None
+        if db_path:
+            self.pool = ConnectionPool(db_path, pool_size=2)
+            with self.pool.connection() as conn:
+                conn.execute('PRAGMA journal_mode=WAL')
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS llm_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        content TEXT NOT NULL,
+                        expires_at REAL NOT NULL
+                    )
+                ''')
+                conn.commit()
+
+    def _count(self, node: str, field: str):
+        with self._lock:
+            node_stats = self.stats.setdefault(node, {"hits": 0, "misses": 0, "disk_hits": 0})
+            node_stats[field] += 1
+
+    def _remember(self, key: str, content: str, expires_at: float):
+        with self._lock:
+            self._memory[key] = (expires_at, content)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str, node: str = "default") -> Optional[str]:
+        """Return the cached response text, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[0] > now:
+                self._memory.move_to_end(key)
+            elif entry:
+                del self._memory[key]
+                entry = None
+        if entry:
+            self._count(node, "hits")
+            return entry[1]
+
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                row = conn.execute(
+                    'SELECT content, expires_at FROM llm_cache WHERE cache_key = ? AND expires_at > ?',
+                    (key, now)
+                ).fetchone()
+            if row:
+                self._remember(key, row["content"], row["expires_at"])
+                self._count(node, "hits")
+                self._count(node, "disk_hits")
+                return row["content"]
+
+        self._count(node, "misses")
+        return None
+
+    def set(self, key: str, content: str, ttl_seconds: float):
+        """Store a response text in both tiers."""
+        expires_at = time.time() + ttl_seconds
+        self._remember(key, content, expires_at)
+
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                conn.execute(
+                    'INSERT OR REPLACE INTO llm_cache (cache_key, content, expires_at) VALUES (?, ?, ?)',
+                    (key, content, expires_at)
+                )
+                with self._lock:
+                    self._writes += 1
+                    purge = self._writes % PURGE_EVERY == 0
+                if purge:
+                    conn.execute('DELETE FROM llm_cache WHERE expires_at <= ?', (time.time(),))
+                conn.commit()
+
+    def clear(self):
+        """Drop every cached response."""
+        with self._lock:
+            self._memory.clear()
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                conn.execute('DELETE FROM llm_cache')
+                conn.commit()
+
+    def get_stats(self) -> Dict:
+        """Hit/miss counters per node plus the overall hit rate."""
+        with self._lock:
+            per_node = {node: dict(counts) for node, counts in self.stats.items()}
+            entries = len(self._memory)
+        hits = sum(c["hits"] for c in per_node.values())
+        lookups = hits + sum(c["misses"] for c in per_node.values())
+        for counts in per_node.values():
+            total = counts["hits"] + counts["misses"]
+            counts["hit_rate"] = round(counts["hits"] / total, 4) if total else 0.0
+        return {
+            "hits": hits,
+            "lookups": lookups,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+            "memory_entries": entries,
+            "nodes": per_node,
+        }
+
+
+class CachedLLM:
+    """
+    Wraps a chat model so that invoke(messages, node=...) is served from an
+    LLMCache for nodes that opted in. Everything else (with_structured_output,
+    bind_tools, ...) is passed through to the wrapped model untouched.
+    """
+
+    def __init__(self, llm, cache: Optional[LLMCache], policies: Dict[str, float]):
+        """
+        Args:
+            llm: The chat model to wrap
+            cache: Response cache (None disables caching)
+            policies: Node name -> TTL in seconds for nodes whose calls are cached
+        """
+        self.llm = llm
+        self.cache = cache
+        self.policies = policies
+
+    def __getattr__(self, name):
+        return getattr(self.llm, name)
+
+    def _cache_key(self, messages: List[BaseMessage]) -> str:
+        model = getattr(self.llm, "model_name", None) or getattr(self.llm, "model", None)
+        temperature = getattr(self.llm, "temperature", None)
+        return make_cache_key(messages, model, temperature)
+
+    def _observe(self, node: Optional[str], started: float, cache: str, response=None):
+        """Record llm_call_seconds{node, cache} and the model's token usage."""
+        node = node or "default"
+        LLM_CALL_SECONDS.observe(time.perf_counter() - started, node, cache)
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            LLM_TOKENS.inc(node, "prompt", amount=usage.get("input_tokens", 0))
+            LLM_TOKENS.inc(node, "completion", amount=usage.get("output_tokens", 0))
+
+    def invoke(self, messages: List[BaseMessage], node: Optional[str] = None, **kwargs):
+        """Invoke the model, answering from the cache when this node opted in."""
+        started = time.perf_counter()
+        ttl = self.policies.get(node) if self.cache is not None else None
+        if not ttl:
+            response = self.llm.invoke(messages, **kwargs)
+            self._observe(node, started, "off", response)
+            return response
+
+        key = self._cache_key(messages)
+        content = self.cache.get(key, node)
+        if content is not None:
+            self._observe(node, started, "hit")
+            return AIMessage(content=content, response_metadata={"cache_hit": True})
+
+        response = self.llm.invoke(messages, **kwargs)
+        self.cache.set(key, response.content, ttl)
+        self._observe(node, started, "miss", response)
+        return response
+
+    async def ainvoke(self, messages: List[BaseMessage], node: Optional[str] = None, **kwargs):
+        """Async invoke; cache lookups are the same as invoke, the model call is awaited."""
+        started = time.perf_counter()
+        ttl = self.policies.get(node) if self.cache is not None else None
+        if not ttl:
+            response = await self.llm.ainvoke(messages, **kwargs)
+            self._observe(node, started, "off", response)
+            return response
+
+        key = self._cache_key(messages)
+        content = self.cache.get(key, node)
+        if content is not None:
+            self._observe(node, started, "hit")
+            return AIMessage(content=content, response_metadata={"cache_hit": True})
+
+        response = await self.llm.ainvoke(messages, **kwargs)
+        self.cache.set(key, response.content, ttl)
+        self._observe(node, started, "miss", response)
+        return response
+
+    def _structured(self, schema):
+        """Structured-output runnable that also returns the raw message, for its token usage."""
+        return self.llm.with_structured_output(schema, include_raw=True)
+
+    @staticmethod
+    def _parsed(output):
+        """(parsed result, raw message) of an include_raw output; parse failures still raise."""
+        if output.get("parsing_error") is not None:
+            raise output["parsing_error"]
+        return output["parsed"], output["raw"]
+
+    def invoke_structured(self, schema, messages: List[BaseMessage], node: Optional[str] = None):
+        """Run with_structured_output(schema).invoke(messages), caching the parsed result."""
+        started = time.perf_counter()
+        ttl = self.policies.get(node) if self.cache is not None else None
+        if not ttl:
+            result, raw = self._parsed(self._structured(schema).invoke(messages))
+            self._observe(node, started, "off", raw)
+            return result
+
+        key = f"{getattr(schema, '__name__', 'schema')}:{self._cache_key(messages)}"
+        content = self.cache.get(key, node)
+        if content is not None:
+            self._observe(node, started, "hit")
+            return json.loads(content)
+
+        result, raw = self._parsed(self._structured(schema).invoke(messages))
+        if isinstance(result, dict):
+            self.cache.set(key, json.dumps(result), ttl)
+        self._observe(node, started, "miss", raw)
+        return result
+
+    async def ainvoke_structured(self, schema, messages: List[BaseMessage], node: Optional[str] = None):
+        """Async invoke_structured."""
+        started = time.perf_counter()
+        ttl = self.policies.get(node) if self.cache is not None else None
+        if not ttl:
+            result, raw = self._parsed(await self._structured(schema).ainvoke(messages))
+            self._observe(node, started, "off", raw)
+            return result
+
+        key = f"{getattr(schema, '__name__', 'schema')}:{self._cache_key(messages)}"
+        content = self.cache.get(key, node)
+        if content is not None:
+            self._observe(node, started, "hit")
+            return json.loads(content)
+
+        result, raw = self._parsed(await self._structured(schema).ainvoke(messages))
+        if isinstance(result, dict):
+            self.cache.set(key, json.dumps(result), ttl)
+        self._observe(node, started, "miss", raw)
+        return result
+
+
+def parse_cache_policies(spec: str) -> Dict[str, float]:
+    """
+    Parse "node:ttl,node:ttl" (ttl in seconds) into a policies dict.
+
+    Example: "all_flights:86400,respond_flight:600"
+    """
+    policies = {}
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        node, _, ttl = item.partition(":")
+        policies[node.strip()] = float(ttl) if ttl else 3600.0
+    return policies
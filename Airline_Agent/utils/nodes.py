@@ -1,40 +1,217 @@
+import asyncio
+import inspect
 import json
+import functools
+import logging
 import re # Import re for regular expressions
-from typing import TypedDict, Annotated, List
+from typing import TypedDict, Annotated, List, NamedTuple, Optional
 from langchain_core.messages import BaseMessage, HumanMessage, AIMessage, ToolMessage, SystemMessage
 from langchain_core.tools import tool
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, END
 from langchain_core.messages import ToolMessage
 import sys
 import os
+import threading
 from dotenv import load_dotenv
 
 # Add parent directory to path to access Data folder
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
 
-from Data.customer_data import CUSTOMER_DATA
-
 # Load environment variables from .env file
 load_dotenv()
 
-groq_api_key = os.getenv("GROQ_KEY")
-groq_model = os.getenv("GROQ_MODEL")
-print("Using Groq Model:", groq_model)
-print("Using Groq API Key:", groq_api_key)
-from langchain_groq import ChatGroq
-from .tools import get_flight_details, get_customer_details, get_all_flights, get_hotel_details, get_all_hotels
-from Data.database import add_flight_to_customer, add_hotel_to_customer
-
-# Create LLM class
-llm = ChatGroq(
-    model=groq_model,
-    temperature=0.7,
-    max_retries=2,
-    api_key=groq_api_key,
-)
-
-import sqlite3
-import time
+from .tools import (get_flight_details, get_customer_itinerary, get_all_flights, find_connections,
+                    get_hotel_details, get_all_hotels, find_hotels, booking_message)
+from .intent_rules import classify_intent
+from .entities import (extract_customer_id,
+                       extract_flight_id,
+                       extract_hotel_id,
+                       extract_departure_airport,
+                       extract_route,
+                       extract_city)
+from .llm_cache import LLMCache, CachedLLM, parse_cache_policies
+from .context import compact_history, history_messages, render_history
+from .formatting import compact_tool_result
+from Data.database import (reserve_flight, reserve_hotel, areserve_flight, areserve_hotel,
+                           BOOKED, ALREADY_BOOKED, db)
+from Data.metrics import GRAPH_NODE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Nodes whose LLM calls are cached by default (node -> TTL seconds): extraction and
+# routing prompts that repeat across sessions. Override with LLM_CACHE_NODES="node:ttl,...".
+DEFAULT_LLM_CACHE_POLICIES = {
+    "intent_detect": 3600,
+    "route_request": 3600,
+    "flight_agent": 3600,
+    "hotel_agent": 3600,
+    "set_variables": 86400,
+    "all_flights": 86400,
+    "connections": 86400,
+}
+
+
+def create_llm() -> CachedLLM:
+    """Build the chat model (LLM_BACKEND=fake selects the offline load-test model) behind the cache."""
+    if os.getenv("LLM_BACKEND", "groq") == "fake":
+        from loadtest.fake_llm import FakeChatModel
+        chat_model = FakeChatModel()
+    else:
+        # Imported here: the Groq client is only needed once a node calls the model
+        from langchain_groq import ChatGroq
+        groq_model = os.getenv("GROQ_MODEL")
+        logger.debug("Using Groq model: %s", groq_model)
+        chat_model = ChatGroq(
+            model=groq_model,
+            temperature=0.7,
+            max_retries=2,
+            api_key=os.getenv("GROQ_KEY"),
+        )
+
+    return CachedLLM(
+        chat_model,
+        cache=LLMCache(
+            max_entries=int(os.getenv("LLM_CACHE_SIZE", "2048")),
+            db_path=os.getenv("LLM_CACHE_DB") or None,
+        ) if os.getenv("LLM_CACHE", "1") == "1" else None,
+        policies=parse_cache_policies(os.getenv("LLM_CACHE_NODES")) if os.getenv("LLM_CACHE_NODES")
+                 else DEFAULT_LLM_CACHE_POLICIES,
+    )
+
+
+_llm = None
+_llm_lock = threading.Lock()
+
+
+def get_llm() -> CachedLLM:
+    """The shared LLM, created on first use so importing the graph needs no API key or network."""
+    global _llm
+    if _llm is None:
+        with _llm_lock:
+            if _llm is None:
+                _llm = create_llm()
+    return _llm
+
+
+# Rule-based intents at or above this confidence skip the intent LLM call
+INTENT_RULES_THRESHOLD = float(os.getenv("INTENT_RULES_THRESHOLD", "0.9"))
+
+
+class LLMRequest(NamedTuple):
+    """An LLM call yielded by a graph node; the node receives the response back."""
+    messages: List[BaseMessage]
+    node: str
+    schema: Optional[type] = None  # set for with_structured_output calls
+
+
+class BookingRequest(NamedTuple):
+    """A reservation yielded by a graph node; the node receives the booking result back."""
+    kind: str  # "flight" or "hotel"
+    customer_id: str
+    item_id: str
+
+
+RESERVE = {"flight": reserve_flight, "hotel": reserve_hotel}
+ARESERVE = {"flight": areserve_flight, "hotel": areserve_hotel}
+
+
+def _answer(request):
+    """Run a request yielded by a graph node and return its result."""
+    if isinstance(request, BookingRequest):
+        return RESERVE[request.kind](request.customer_id, request.item_id)
+    llm = get_llm()
+    if request.schema is not None:
+        return llm.invoke_structured(request.schema, request.messages, node=request.node)
+    return llm.invoke(request.messages, node=request.node)
+
+
+async def _aanswer(request):
+    """Await a request yielded by a graph node and return its result."""
+    if isinstance(request, BookingRequest):
+        # Awaits the group-commit writer instead of blocking the event loop on the write
+        return await ARESERVE[request.kind](request.customer_id, request.item_id)
+    llm = get_llm()
+    if request.schema is not None:
+        return await llm.ainvoke_structured(request.schema, request.messages, node=request.node)
+    return await llm.ainvoke(request.messages, node=request.node)
+
+
+def _step(steps_run, response, error):
+    """
+    Resume a node generator with a response (or exception)
+
+    Returns (False, next request), or (True, the node's return value) once it
+    finishes; StopIteration is caught here because it cannot cross a thread.
+    """
+    try:
+        return False, steps_run.throw(error) if error else steps_run.send(response)
+    except StopIteration as done:
+        return True, done.value
+
+
+def graph_node(steps):
+    """
+    Decorator for graph nodes that run both under graph.invoke and graph.ainvoke.
+
+    The node body is written once as a generator: instead of calling the LLM
+    it yields an LLMRequest and gets the response (or the exception) back;
+    bookings are yielded the same way as a BookingRequest. The sync entry
+    point answers requests with llm.invoke / reserve_*; the async one,
+    stored as `node.asynchronous`, awaits llm.ainvoke / areserve_* so the
+    event loop is free while the model or the database writer is working,
+    and runs the rest of the body in worker threads. Nodes that never yield
+    are plain functions and work unchanged. Both entry points record the
+    node's wall time in graph_node_seconds.
+    """
+    name = steps.__name__
+    is_generator = inspect.isgeneratorfunction(steps)
+
+    @functools.wraps(steps)
+    def node(*args):
+        with GRAPH_NODE_SECONDS.time(name):
+            steps_run = steps(*args)
+            if not hasattr(steps_run, "send"):
+                return steps_run
+            response, error = None, None
+            while True:
+                finished, request = _step(steps_run, response, error)
+                if finished:
+                    return request
+                try:
+                    response, error = _answer(request), None
+                except Exception as e:
+                    response, error = None, e
+
+    async def asynchronous(*args):
+        with GRAPH_NODE_SECONDS.time(name):
+            # The node body (database reads, tools) runs in a worker thread;
+            # only the yielded requests are awaited on the event loop
+            if not is_generator:
+                return await asyncio.to_thread(steps, *args)
+            steps_run = steps(*args)  # runs nothing until the first send
+            response, error = None, None
+            while True:
+                finished, request = await asyncio.to_thread(_step, steps_run, response, error)
+                if finished:
+                    return request
+                try:
+                    response, error = await _aanswer(request), None
+                except Exception as e:
+                    response, error = None, e
+
+    node.asynchronous = asynchronous
+    return node
+
+
+def as_runnable(node) -> RunnableLambda:
+    """Wrap a graph_node function or bound method with its sync and async entry points."""
+    func = getattr(node, "__func__", node)
+    owner = getattr(node, "__self__", None)
+    afunc = func.asynchronous if owner is None else functools.partial(func.asynchronous, owner)
+    return RunnableLambda(node, afunc=afunc, name=func.__name__)
+
+
 class IntentSchema(TypedDict):
     intent: str
 class SupportState(TypedDict):
@@ -48,11 +225,65 @@ class SupportState(TypedDict):
     intent: Annotated[str, "Intent of the customer"]
     resolution_status: Annotated[str, "Current resolution status"]
     next: Annotated[str, "Next action"]
+    route_args: Annotated[dict, "Arguments extracted by the combined router"]
+    summary: Annotated[str, "Rolling summary of turns folded out of messages"]
+    history_offset: Annotated[int, "Number of messages folded into the summary so far"]
+class RouteSchema(TypedDict):
+    """Routing decision for one user turn: intent, sub-agent action and extracted arguments."""
+    intent: Annotated[str, "One of: customer_support_help, set_state_variables, book_flight, my_flight_details, "
+                           "all_flight_details, my_hotel_details, all_hotel_details, book_hotel, disambiguation"]
+    action: Annotated[str, "Flight actions: flight_details, all_flights, connections, lookup_customer, book_flight. "
+                           "Hotel actions: hotel_details, all_hotels, lookup_customer, book_hotel. "
+                           "Empty for other intents"]
+    customer_id: Annotated[Optional[str], "Customer ID mentioned by the user (e.g. CUST123), else null"]
+    flight_id: Annotated[Optional[str], "Flight ID to book or look up (e.g. FLIGHT123), else null"]
+    hotel_id: Annotated[Optional[str], "Hotel ID to book or look up (e.g. HOTEL123), else null"]
+    departure_airport: Annotated[Optional[str], "Departure airport code (e.g. JFK), else null"]
+    arrival_airport: Annotated[Optional[str], "Destination airport code when the user names one (e.g. SFO), else null"]
+    location: Annotated[Optional[str], "Hotel city (e.g. New York), else null"]
+
+# Default sub-agent action for each intent when the router does not pick one
+INTENT_DEFAULT_ACTIONS = {
+    "book_flight": "book_flight",
+    "my_flight_details": "flight_details",
+    "all_flight_details": "all_flights",
+    "book_hotel": "book_hotel",
+    "my_hotel_details": "hotel_details",
+    "all_hotel_details": "all_hotels",
+}
+def start_turn(state: SupportState) -> SupportState:
+    """Fold turns that no longer fit the context budget into the rolling summary."""
+    messages, summary, folded = compact_history(state["messages"], state.get("summary") or "")
+    if folded:
+        logger.debug("Folded %d messages into the conversation summary", folded)
+    return {
+        **state,
+        "messages": messages,
+        "summary": summary,
+        "history_offset": (state.get("history_offset") or 0) + folded
+    }
+
+@graph_node
 def intent_detect(state: SupportState) -> SupportState:
     """Detect Intent of user."""
+    state = start_turn(state)
     messages = state["messages"]
     last_message = messages[-1]
     state['human_message']= last_message.content
+    state['route_args']= {}
+
+    # Fast path: trivially classifiable messages don't need the LLM
+    intent, confidence = classify_intent(last_message.content)
+    if intent and confidence >= INTENT_RULES_THRESHOLD:
+        logger.debug("Detected intent (rules, confidence %.2f): %s", confidence, intent)
+        # Keep the same message layout as the LLM path (set_variables reads messages[-2])
+        response = AIMessage(content=json.dumps({"intent": intent}))
+        return {
+            **state,
+            "messages": messages + [response],
+            "intent": intent
+        }
+
     system_prompt = """
     You are a intent detection agent. Your task is identify the intent of the user and pick one of the intent strictly:
     customer_support_help: need help with ticket or issues
@@ -68,7 +299,8 @@ def intent_detect(state: SupportState) -> SupportState:
     {"intent": "customer_support_help"}
     """
 
-    response = llm.invoke([SystemMessage(content=system_prompt)] + messages)
+    response = yield LLMRequest([SystemMessage(content=system_prompt)] + history_messages(state, "intent_detect"),
+                                "intent_detect")
     response_content = response.content.strip()
 
     # Extract JSON string from markdown code block
@@ -85,7 +317,7 @@ def intent_detect(state: SupportState) -> SupportState:
     except json.JSONDecodeError:
         # Handle cases where the LLM might not return perfect JSON
         intent = "unknown" # or some default handling
-    print("Detected intent:", intent)
+    logger.debug("Detected intent: %s", intent)
     return {
         **state,
         "messages": messages + [response],
@@ -109,6 +341,7 @@ def route_to_agent(state: SupportState) -> str:
     }
 
     return routing_map.get(intent, END) # Default to END if intent is unknown
+@graph_node
 def set_variables(state: SupportState) -> SupportState:
     """Set necessary variables based on intent."""
     messages= state["messages"]
@@ -117,15 +350,18 @@ def set_variables(state: SupportState) -> SupportState:
     Extract the customer ID from the last message. Only display the customer ID.
     Do not explain. last message: {last_message}"""
     state['human_message']= last_message
-    response= llm.invoke([HumanMessage(content=system_prompt)])
-    customer_id= response.content.strip()
-    for c in CUSTOMER_DATA:
-        if c["customer_id"].lower() in customer_id.lower():
-            state["customer_id"]= c["customer_id"]
-            state["ticket_id"]= c["FLIGHT_ID"]
-            state["hotel_id"]= c["HOTEL_ID"]
-            print("Set state variables:", state["customer_id"], state["ticket_id"], state["hotel_id"])
-            break
+    # Resolve the ID against the customers table; only ask the LLM if nothing matches
+    route_args= state.get("route_args") or {}
+    customer_id= extract_customer_id(route_args.get("customer_id", "")) or extract_customer_id(last_message)
+    if not customer_id:
+        response= yield LLMRequest([HumanMessage(content=system_prompt)], "set_variables")
+        customer_id= extract_customer_id(response.content)
+    customer= db.get_customer(customer_id) if customer_id else None
+    if customer:
+        state["customer_id"]= customer["customer_id"]
+        state["ticket_id"]= customer["flight_id"] or ""
+        state["hotel_id"]= customer["hotel_id"] or ""
+        logger.debug("Set state variables: %s %s %s", state["customer_id"], state["ticket_id"], state["hotel_id"])
     state["messages"]= messages + [AIMessage(content=f"Set customer ID to {state['customer_id']}. How can I assist you further?")]
     return state
 def route_flight_agent_output(state: SupportState) -> str:
@@ -137,6 +373,8 @@ def route_flight_agent_output(state: SupportState) -> str:
         return "flight_details"
     elif next_action == "all_flights":
         return "all_flights"
+    elif next_action == "connections":
+        return "find_connections"
     elif next_action == "book_flight":
         return "book_flight"
     else:
@@ -157,6 +395,79 @@ def route_hotel_agent_output(state: SupportState) -> str:
         return END # If no specific action, just end for now
 
 
+@graph_node
+def route_request(state: SupportState) -> SupportState:
+    """Pick intent, sub-agent action and arguments in a single structured LLM call."""
+    state = start_turn(state)
+    messages = state["messages"]
+    last_message = messages[-1]
+    state['human_message']= last_message.content
+
+    # Same deterministic fast path as intent_detect; tool nodes extract their own arguments
+    intent, confidence = classify_intent(last_message.content)
+    if intent and confidence >= INTENT_RULES_THRESHOLD:
+        decision = {"intent": intent, "action": INTENT_DEFAULT_ACTIONS.get(intent, "")}
+        # "flights from ORD to JFK" is a connection search rather than a departure board
+        if intent == "all_flight_details" and extract_route(last_message.content)[1]:
+            decision["action"] = "connections"
+        logger.debug("Routed request (rules, confidence %.2f): %s", confidence, decision)
+    else:
+        system_prompt = """
+        You are the router for a flight and hotel booking assistant. For the user's latest message pick:
+        intent:
+          customer_support_help: need help with ticket or issues
+          set_state_variables: if user inputs customer-id, set the state variables
+          book_flight: need to book a flight
+          my_flight_details: need to get my flight details
+          my_hotel_details: need to get my hotel details
+          all_hotel_details: need hotel details as per location asked
+          all_flight_details: need flight details as per departure airport asked
+          book_hotel: need to book a hotel
+          disambiguation: if the user's request is ambiguous and does not fit the above actions
+        action (flight and hotel intents only):
+          flight_details / hotel_details: they need their own booking details
+          all_flights / all_hotels: they want to browse flights from an airport / hotels in a city
+          connections: they want flights or itineraries between two airports, including connecting flights
+          lookup_customer: they need their customer details
+          book_flight / book_hotel: they want to book a specific flight / hotel
+        Also fill in any customer ID, flight ID, hotel ID, departure and arrival airport or hotel city the user refers to,
+        using earlier turns of the conversation when the latest message only refers back to them.
+        """
+        try:
+            decision = (yield LLMRequest(
+                [SystemMessage(content=system_prompt)] + history_messages(state, "route_request"),
+                "route_request", RouteSchema
+            )) or {}
+        except Exception as e:
+            logger.debug("Structured routing failed: %s", e)
+            decision = {"intent": "disambiguation"}
+        logger.debug("Routed request (LLM): %s", decision)
+
+    intent = decision.get("intent") or "disambiguation"
+    action = (decision.get("action") or "").strip().lower() or INTENT_DEFAULT_ACTIONS.get(intent, "")
+    route_args = {key: value for key, value in decision.items()
+                  if key not in ("intent", "action") and value}
+
+    return {
+        **state,
+        # Keep the same message layout as intent_detect (set_variables reads messages[-2])
+        "messages": messages + [AIMessage(content=json.dumps(decision))],
+        "intent": intent,
+        "next": action,
+        "route_args": route_args
+    }
+
+def route_combined_output(state: SupportState) -> str:
+    """Route from the combined router straight to the tool node for its intent and action."""
+    agent = route_to_agent(state)
+    if agent == "flight_agent":
+        return route_flight_agent_output(state)
+    if agent == "hotel_agent":
+        return route_hotel_agent_output(state)
+    return agent
+
+
+@graph_node
 def disambiguation(state: SupportState) -> SupportState:
       """Handle disambiguation when user request is unclear."""
       messages = state["messages"]
@@ -169,7 +480,7 @@ def disambiguation(state: SupportState) -> SupportState:
       User's message: {user_message}
       """
 
-      response = llm.invoke([HumanMessage(content=system_prompt)])
+      response = yield LLMRequest([HumanMessage(content=system_prompt)], "disambiguation")
 
       return {
           **state,
@@ -180,14 +491,14 @@ def disambiguation(state: SupportState) -> SupportState:
 
 class flightAgent:
   def __init__(self) -> None:
-      self.llm=llm
-      self.tools = [get_flight_details, get_customer_details, get_all_flights]
+      self.tools = [get_flight_details, get_customer_itinerary, get_all_flights, find_connections]
+  @graph_node
   def flight_agent_orchestraor(self,state: SupportState) -> SupportState:
     messages = state["messages"]
     tools = state["tools"]
     tool_descriptions = "\n".join([f"- {tool.name}: {tool.description}" for tool in self.tools])
 
-    flight_tools=[tool for tool in tools if tool.name in ["get_flight_details", "get_all_flights", "get_customer_details"]]
+    flight_tools=[tool for tool in tools if tool.name in ["get_flight_details", "get_all_flights", "find_connections", "get_customer_itinerary"]]
     tool_descriptions = "\n".join([f"- {tool.name}: {tool.description}" for tool in flight_tools])
     system_prompt = f"""
     You are a Flight Booking Agent. Analyze the user's message and determine the best action.
@@ -196,12 +507,13 @@ class flightAgent:
     {tool_descriptions}
 
     Current conversation:
-    {messages}
+    {render_history(state, "flight_agent")}
 
     Determine the next action based on the user's message:
     - "flight_details" if they need their flight details
     - "all_flights" if they want to see all flights
-    - "lookup_customer" if they need their customer details
+    - "connections" if they want flights or itineraries between two airports, including connecting flights
+    - "lookup_customer" if they need their customer details or all of their bookings
     - "book_flight" if they want to book a specific flight
     
 
@@ -209,25 +521,27 @@ class flightAgent:
     Respond with just the action name.
     """
 
-    response = llm.invoke([HumanMessage(content=system_prompt)])
+    response = yield LLMRequest([HumanMessage(content=system_prompt)], "flight_agent")
 
     # Determine next action based on response
     action = response.content.strip().lower()
 
     return {**state, "next": action}
   
+  @graph_node
   def lookup_customer(self, state: SupportState) -> SupportState:
       """Look up customer information."""
       customer_id = state["customer_id"]
-      result = get_customer_details.invoke({"customer_id": customer_id})
+      result = get_customer_itinerary.invoke({"customer_id": customer_id})
 
-      tool_message = ToolMessage(content=result, tool_call_id="lookup_customer")
+      tool_message = ToolMessage(content=compact_tool_result("lookup_customer", result), tool_call_id="lookup_customer")
 
       return {
           **state,
           "messages": state["messages"] + [tool_message],
           "next": "respond"
       }
+  @graph_node
   def flight_details(self,state: SupportState) -> SupportState:
       """Get flight details."""
 
@@ -235,28 +549,33 @@ class flightAgent:
       flight_id = state["ticket_id"]
       result = get_flight_details.invoke({"flight_id": flight_id}) # Corrected tool call
 
-      tool_message = ToolMessage(content=result, tool_call_id="flight_details")
+      tool_message = ToolMessage(content=compact_tool_result("flight_details", result), tool_call_id="flight_details")
 
       return {
           **state,
           "messages": state["messages"] + [tool_message] ,
           "next": "respond"
       }
+  @graph_node
   def all_flights(self,state: SupportState) -> SupportState:
       """Get all flights."""
       last_message = state["human_message"]
-      print('last message', last_message)
+      logger.debug("Last message: %s", last_message)
       system_prompt = f"""
       Extract the departure airport from the last message: {last_message}. Only display the departure airport. Do not explain.
       MUST MAP TO ONE OF THE FOLLOWING AIRPORTS:
       JFK, LAX, ORD, SFO
       Departure Airport:
       """
-      response = llm.invoke([HumanMessage(content=system_prompt)])
-      departure_airport = response.content.strip().upper()
+      route_args = state.get("route_args") or {}
+      departure_airport = (extract_departure_airport(route_args.get("departure_airport", ""))
+                           or extract_departure_airport(last_message))
+      if not departure_airport:
+          response = yield LLMRequest([HumanMessage(content=system_prompt)], "all_flights")
+          departure_airport = response.content.strip().upper()
       result = get_all_flights.invoke({"departure_airport": departure_airport}) # Corrected tool call
 
-      tool_message = ToolMessage(content=result, tool_call_id="all_flights")
+      tool_message = ToolMessage(content=compact_tool_result("all_flights", result), tool_call_id="all_flights")
 
       return {
           **state,
@@ -264,6 +583,38 @@ class flightAgent:
           "next": "respond"
       }
 
+  @graph_node
+  def connections(self, state: SupportState) -> SupportState:
+      """Find direct and connecting itineraries between two airports."""
+      last_message = state["human_message"]
+      system_prompt = f"""
+      Extract the departure and arrival airports from the last message: {last_message}.
+      Only display the two airport codes separated by a space, departure first. Do not explain.
+      MUST MAP TO THE FOLLOWING AIRPORTS:
+      JFK, LAX, ORD, SFO
+      Airports:
+      """
+      route_args = state.get("route_args") or {}
+      departure_airport = extract_departure_airport(route_args.get("departure_airport", ""))
+      arrival_airport = extract_departure_airport(route_args.get("arrival_airport", ""))
+      if not (departure_airport and arrival_airport):
+          departure_airport, arrival_airport = extract_route(last_message)
+      if not (departure_airport and arrival_airport):
+          response = yield LLMRequest([HumanMessage(content=system_prompt)], "connections")
+          codes = response.content.strip().upper().split()
+          departure_airport, arrival_airport = (codes + ["", ""])[:2]
+      result = find_connections.invoke({"departure_airport": departure_airport,
+                                        "arrival_airport": arrival_airport})
+
+      tool_message = ToolMessage(content=compact_tool_result("find_connections", result), tool_call_id="find_connections")
+
+      return {
+          **state,
+          "messages": state["messages"] + [tool_message],
+          "next": "respond"
+      }
+
+  @graph_node
   def book_flight(self, state: SupportState) -> SupportState:
       """Book a flight by updating the database."""
       last_message = state["human_message"]
@@ -272,26 +623,26 @@ class flightAgent:
       # Extract flight_id from the message
       system_prompt = f"""
       Extract the flight ID from the message: {last_message}, OR if not explicitly mentioned,
-      infer the most suitable flight ID based on the past conversations and tool data {state['messages']}.
+      infer the most suitable flight ID based on the past conversations and tool data:
+      {render_history(state, "book_flight")}
       Only display the flight ID (e.g., FLIGHT123). Do not explain.
       Flight ID:
       """
-      response = llm.invoke([HumanMessage(content=system_prompt)])
-      print('response in book flight', response.content)
-      flight_id = response.content.strip().upper()
-
-      # Update database
-      success = add_flight_to_customer(customer_id, flight_id)
-
-      if success:
-          result = f"Successfully booked flight {flight_id} for customer {customer_id}"
+      route_args = state.get("route_args") or {}
+      flight_id = extract_flight_id(route_args.get("flight_id", "")) or extract_flight_id(last_message)
+      if not flight_id:
+          response = yield LLMRequest([HumanMessage(content=system_prompt)], "book_flight")
+          logger.debug("Response in book flight: %s", response.content)
+          flight_id = response.content.strip().upper()
+
+      # Take a seat and assign the flight in one transaction
+      booking = yield BookingRequest("flight", customer_id, flight_id)
+      result = booking_message("flight", booking)
+      if booking["status"] in (BOOKED, ALREADY_BOOKED):
           state["ticket_id"] = flight_id  # Update state with new flight_id
-          print(result)
-      else:
-          result = f"Failed to book flight {flight_id}. Customer {customer_id} may not exist in the database."
-          print(result)
+      logger.debug("Book flight result: %s", result)
 
-      tool_message = ToolMessage(content=result, tool_call_id="book_flight")
+      tool_message = ToolMessage(content=compact_tool_result("book_flight", result), tool_call_id="book_flight")
 
       return {
           **state,
@@ -299,11 +650,12 @@ class flightAgent:
           "next": "respond"
       }
 
+  @graph_node
   def respond(self, state: SupportState) -> SupportState:
       """Generate a response to the user."""
       messages = state["messages"]
       laast_message_content = messages[-1].content
-      print('messages in respond', messages[-1])
+      logger.debug("Last message in respond: %s", messages[-1])
       system_prompt = f"""
       You are a helpful flight booking assistant. 
       Use the information from the tools to respond to the user's query.
@@ -311,9 +663,9 @@ class flightAgent:
       message from the tool: {laast_message_content}
       """
 
-      response = llm.invoke([HumanMessage(content=system_prompt)])
+      response = yield LLMRequest([HumanMessage(content=system_prompt)], "respond_flight")
 
-      print('response in flight respond', response)
+      logger.debug("Response in flight respond: %s", response)
 
       return {
           **state,
@@ -323,14 +675,14 @@ class flightAgent:
 
 class hotelAgent:
   def __init__(self) -> None:
-      self.llm=llm
-      self.tools = [get_hotel_details, get_customer_details, get_all_hotels]
+      self.tools = [get_hotel_details, get_customer_itinerary, get_all_hotels, find_hotels]
 
+  @graph_node
   def hotel_agent_orchestrator(self,state: SupportState) -> SupportState:
     messages = state["messages"]
     tools = state["tools"]
 
-    hotel_tools=[tool for tool in tools if tool.name in ["get_hotel_details", "get_all_hotels", "get_customer_details"]]
+    hotel_tools=[tool for tool in tools if tool.name in ["get_hotel_details", "get_all_hotels", "find_hotels", "get_customer_itinerary"]]
     tool_descriptions = "\n".join([f"- {tool.name}: {tool.description}" for tool in hotel_tools])
     system_prompt = f"""
     You are a Hotel Booking Agent. Analyze the user's message and determine the best action.
@@ -339,32 +691,33 @@ class hotelAgent:
     {tool_descriptions}
 
     Current conversation:
-    {messages}
+    {render_history(state, "hotel_agent")}
 
     Determine the next action based on the user's message:
     - "hotel_details" if they need their hotel details
-    - "all_hotels" if they want to see all hotels
-    - "lookup_customer" if they need their customer details
+    - "all_hotels" if they want to see all hotels or look for a hotel by name or city
+    - "lookup_customer" if they need their customer details or all of their bookings
     - "book_hotel" if they want to book a specific hotel
 
 
     Respond with just the action name.
     """
 
-    response = llm.invoke([HumanMessage(content=system_prompt)])
+    response = yield LLMRequest([HumanMessage(content=system_prompt)], "hotel_agent")
 
     # Determine next action based on response
     action = response.content.strip().lower()
-    print("Determined hotel agent action:", action)
+    logger.debug("Determined hotel agent action: %s", action)
 
     return {**state, "next": action}
 
+  @graph_node
   def lookup_customer(self, state: SupportState) -> SupportState:
       """Look up customer information."""
       customer_id = state["customer_id"]
-      result = get_customer_details.invoke({"customer_id": customer_id})
+      result = get_customer_itinerary.invoke({"customer_id": customer_id})
 
-      tool_message = ToolMessage(content=result, tool_call_id="lookup_customer")
+      tool_message = ToolMessage(content=compact_tool_result("lookup_customer", result), tool_call_id="lookup_customer")
 
       return {
           **state,
@@ -372,12 +725,13 @@ class hotelAgent:
           "next": "respond"
       }
 
+  @graph_node
   def hotel_details(self,state: SupportState) -> SupportState:
       """Get hotel details."""
       hotel_id = state["hotel_id"]
       result = get_hotel_details.invoke({"hotel_id": hotel_id})
 
-      tool_message = ToolMessage(content=result, tool_call_id="hotel_details")
+      tool_message = ToolMessage(content=compact_tool_result("hotel_details", result), tool_call_id="hotel_details")
 
       return {
           **state,
@@ -385,32 +739,30 @@ class hotelAgent:
           "next": "respond"
       }
 
+  @graph_node
   def all_hotels(self,state: SupportState) -> SupportState:
-      """Get all hotels."""
+      """Get all hotels in the requested city, or the hotels whose name or location matches the message."""
       last_message = state["human_message"]
-      print('last message', last_message)
-      system_prompt = f"""
-      Identify the location from the message: {last_message}.
-      MUST MAP TO ONE OF THE FOLLOWING LOCATIONS (exact match):
-      - New York
-      - Chicago
-      - San Fransisco
-
-      Return ONLY the location name, nothing else.
-      Location:
-      """
-      response = llm.invoke([HumanMessage(content=system_prompt)])
-      location = response.content.strip()
-      print('extracted location:', location)
-      result = get_all_hotels.invoke({"location": location})
+      logger.debug("Last message: %s", last_message)
+      route_args = state.get("route_args") or {}
+      location = extract_city(route_args.get("location", "")) or extract_city(last_message)
+      if location:
+          logger.debug("Extracted location: %s", location)
+          result = get_all_hotels.invoke({"location": location})
+      else:
+          # Typo-tolerant lookup in the hotel search index instead of asking the LLM for a city
+          query = route_args.get("location") or last_message
+          logger.debug("Searching hotels for: %s", query)
+          result = find_hotels.invoke({"query": query})
 
-      tool_message = ToolMessage(content=result, tool_call_id="all_hotels")
+      tool_message = ToolMessage(content=compact_tool_result("all_hotels", result), tool_call_id="all_hotels")
       return {
           **state,
           "messages": state["messages"] + [tool_message],
           "next": "respond"
       }
 
+  @graph_node
   def book_hotel(self, state: SupportState) -> SupportState:
       """Book a hotel by updating the database."""
       last_message = state["human_message"]
@@ -422,7 +774,8 @@ class hotelAgent:
 
       User's message: {last_message}
 
-      Recent conversation: {state['messages'][-3:] if len(state['messages']) >= 3 else state['messages']}
+      Recent conversation:
+      {render_history(state, "book_hotel")}
 
       Look for a hotel ID in the format HOTELXXX (e.g., HOTEL123, HOTEL456).
       If the user mentioned a hotel name or asked about hotels, find the corresponding hotel ID from the conversation.
@@ -430,27 +783,26 @@ class hotelAgent:
       Return ONLY the hotel ID in the format HOTELXXX. Do not explain.
       Hotel ID:
       """
-      response = llm.invoke([HumanMessage(content=system_prompt)])
-      hotel_id = response.content.strip().upper()
-      print(f"Extracted hotel_id: {hotel_id}")
+      route_args = state.get("route_args") or {}
+      hotel_id = extract_hotel_id(route_args.get("hotel_id", "")) or extract_hotel_id(last_message)
+      if not hotel_id:
+          response = yield LLMRequest([HumanMessage(content=system_prompt)], "book_hotel")
+          hotel_id = response.content.strip().upper()
+      logger.debug("Extracted hotel_id: %s", hotel_id)
 
       # Validate hotel_id format
       if not hotel_id.startswith("HOTEL") or hotel_id == "NONE" or hotel_id == "HOTELXXX":
           result = f"Could not identify a valid hotel ID. Please specify which hotel you'd like to book (e.g., HOTEL123, HOTEL456)."
-          print(result)
+          logger.debug("Book hotel result: %s", result)
       else:
-          # Update database
-          success = add_hotel_to_customer(customer_id, hotel_id)
-
-          if success:
-              result = f"Successfully booked hotel {hotel_id} for customer {customer_id}"
+          # Take a room and assign the hotel in one transaction
+          booking = yield BookingRequest("hotel", customer_id, hotel_id)
+          result = booking_message("hotel", booking)
+          if booking["status"] in (BOOKED, ALREADY_BOOKED):
               state["hotel_id"] = hotel_id  # Update state with new hotel_id
-              print(result)
-          else:
-              result = f"Failed to book hotel {hotel_id}. Customer {customer_id} may not exist in the database."
-              print(result)
+          logger.debug("Book hotel result: %s", result)
 
-      tool_message = ToolMessage(content=result, tool_call_id="book_hotel")
+      tool_message = ToolMessage(content=compact_tool_result("book_hotel", result), tool_call_id="book_hotel")
 
       return {
           **state,
@@ -458,20 +810,21 @@ class hotelAgent:
           "next": "respond"
       }
 
+  @graph_node
   def respond(self, state: SupportState) -> SupportState:
       """Generate a response to the user."""
       messages = state["messages"]
-      print('messages in respond', messages[-1])
+      logger.debug("Last message in respond: %s", messages[-1])
       last_message = messages[-1]
       system_prompt = f"""
       You are a helpful hotel booking assistant.
       Use the message from the tools to create a user-friendly response. Also, display the hotel id.
       Human Query: {state['human_message']} 
-      message from the tool: {last_message}
+      message from the tool: {last_message.content}
       """
 
-      response = llm.invoke([HumanMessage(content=system_prompt)])
-      print('response in hotel respond', response)
+      response = yield LLMRequest([HumanMessage(content=system_prompt)], "respond_hotel")
+      logger.debug("Response in hotel respond: %s", response)
 
       return {
           **state,
@@ -0,0 +1,400 @@
+"""
+Conversation session stores for the API servers.
+
+Two implementations share the SessionStore interface:
+- InMemorySessionStore: per-process LRU with an idle TTL and a cap on the
+  number of sessions, so abandoned conversations are evicted instead of
+  accumulating for the life of the process.
+- SQLiteSessionStore: sessions in a SQLite file, shared by every worker
+  process and surviving restarts. Each save writes only the messages added
+  since the previous save (plus the small scalar fields); messages folded
+  into the rolling summary (see context.py) are deleted.
+
+Both also remember the response for each idempotency key for
+IDEMPOTENCY_TTL seconds, so a retried message returns the earlier answer
+instead of running the turn again. SessionLocks / AsyncSessionLocks make
+turns for one session run strictly one at a time.
+
+create_session_store() picks one from the SESSION_STORE env var.
+"""
+import abc
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+from typing import Dict, Optional
+
+from langchain_core.messages import message_to_dict, messages_from_dict
+
+# Add parent directory to path to access Data folder
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Data.connection_pool import ConnectionPool
+
+# Sessions idle for longer than this are dropped (seconds)
+SESSION_TTL = float(os.getenv("SESSION_TTL", "3600"))
+# Most sessions the in-memory store keeps before evicting the least recently used
+SESSION_MAX = int(os.getenv("SESSION_MAX", "10000"))
+# Seconds a response is kept for replay under its idempotency key
+IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "900"))
+# Most idempotency responses the in-memory store keeps
+IDEMPOTENCY_MAX = int(os.getenv("IDEMPOTENCY_MAX", "10000"))
+# Purge expired sessions from SQLite once every this many saves
+PURGE_EVERY = 200
+
+
+class SessionStore(abc.ABC):
+    """Interface for session state storage, keyed by session ID."""
+
+    @abc.abstractmethod
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Return the session state, or None if it does not exist or expired."""
+
+    @abc.abstractmethod
+    def save(self, session_id: str, state: Dict, idempotency_key: str = None, response: Dict = None):
+        """
+        Store the state after a turn.
+
+        If idempotency_key is given, response is remembered under it and
+        returned by get_response for retries of the same message.
+        """
+
+    @abc.abstractmethod
+    def get_response(self, session_id: str, idempotency_key: str) -> Optional[Dict]:
+        """Return the response saved for an idempotency key, or None."""
+
+    @abc.abstractmethod
+    def delete(self, session_id: str):
+        """Forget a session."""
+
+    @abc.abstractmethod
+    def get_stats(self) -> Dict:
+        """Counters for monitoring."""
+
+
+class InMemorySessionStore(SessionStore):
+    """LRU + idle-TTL store kept in this process."""
+
+    def __init__(self, max_sessions: int = SESSION_MAX, ttl_seconds: float = SESSION_TTL):
+        """
+        Args:
+            max_sessions: Sessions kept before the least recently used is evicted
+            ttl_seconds: Idle seconds before a session expires
+        """
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self._sessions = OrderedDict()  # session_id -> (expires_at, state)
+        self._responses = OrderedDict()  # (session_id, idempotency_key) -> (expires_at, response)
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "saves": 0, "evictions": 0, "expirations": 0, "replays": 0}
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._sessions.get(session_id)
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            expires_at, state = entry
+            if expires_at < time.monotonic():
+                del self._sessions[session_id]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return None
+            self._sessions.move_to_end(session_id)
+            self.stats["hits"] += 1
+            return state
+
+    def save(self, session_id: str, state: Dict, idempotency_key: str = None, response: Dict = None):
+        with self._lock:
+            self._sessions[session_id] = (time.monotonic() + self.ttl_seconds, state)
+            self._sessions.move_to_end(session_id)
+            self.stats["saves"] += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.stats["evictions"] += 1
+
+            if idempotency_key:
+                self._responses[(session_id, idempotency_key)] = (time.monotonic() + IDEMPOTENCY_TTL, response)
+                self._responses.move_to_end((session_id, idempotency_key))
+                while len(self._responses) > IDEMPOTENCY_MAX:
+                    self._responses.popitem(last=False)
+
+    def get_response(self, session_id: str, idempotency_key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._responses.get((session_id, idempotency_key))
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            self.stats["replays"] += 1
+            return entry[1]
+
+    def delete(self, session_id: str):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+            for key in [k for k in self._responses if k[0] == session_id]:
+                del self._responses[key]
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                "backend": "memory",
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+            }
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Sessions persisted in SQLite, one row per session plus one row per message.
+
+    Messages are numbered by their absolute position in the conversation
+    (history_offset + index in state["messages"]), so a save inserts only
+    positions it has not stored yet and deletes positions that were folded
+    into the summary.
+    """
+
+    def __init__(self, db_path: str, ttl_seconds: float = SESSION_TTL, pool_size: int = 5):
+        """
+        Args:
+            db_path: SQLite file holding the sessions
+            ttl_seconds: Idle seconds before a session expires
+            pool_size: Connections kept open to the file
+        """
+        self.ttl_seconds = ttl_seconds
+        self.pool = ConnectionPool(db_path, pool_size=pool_size)
+        self._lock = threading.Lock()
+        self._saves = 0
+        self.stats = {"hits": 0, "misses": 0, "saves": 0, "messages_written": 0, "expirations": 0, "replays": 0}
+
+        with self.pool.connection() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS sessions (
+                    session_id TEXT PRIMARY KEY,
+                    state TEXT NOT NULL,
+                    message_count INTEGER NOT NULL,
+                    expires_at REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS session_messages (
+                    session_id TEXT NOT NULL,
+                    seq INTEGER NOT NULL,
+                    message TEXT NOT NULL,
+                    PRIMARY KEY (session_id, seq)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS session_responses (
+                    session_id TEXT NOT NULL,
+                    idempotency_key TEXT NOT NULL,
+                    response TEXT NOT NULL,
+                    expires_at REAL NOT NULL,
+                    PRIMARY KEY (session_id, idempotency_key)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)')
+            conn.commit()
+
+    def _count(self, field: str, amount: int = 1):
+        with self._lock:
+            self.stats[field] += amount
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT state, expires_at FROM sessions WHERE session_id = ?', (session_id,)
+            ).fetchone()
+            if row is None or row["expires_at"] < time.time():
+                self._count("misses")
+                if row is not None:
+                    self._count("expirations")
+                return None
+            state = json.loads(row["state"])
+            rows = conn.execute(
+                'SELECT message FROM session_messages WHERE session_id = ? AND seq >= ? ORDER BY seq',
+                (session_id, state.get("history_offset") or 0)
+            ).fetchall()
+        state["messages"] = messages_from_dict([json.loads(r["message"]) for r in rows])
+        self._count("hits")
+        return state
+
+    def save(self, session_id: str, state: Dict, idempotency_key: str = None, response: Dict = None):
+        messages = state.get("messages") or []
+        offset = state.get("history_offset") or 0
+        scalars = {key: value for key, value in state.items() if key != "messages"}
+
+        with self.pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                row = conn.execute(
+                    'SELECT message_count FROM sessions WHERE session_id = ?', (session_id,)
+                ).fetchone()
+                stored = row["message_count"] if row else 0
+                if stored > offset + len(messages):
+                    # The conversation was restarted; rewrite it from scratch
+                    conn.execute('DELETE FROM session_messages WHERE session_id = ?', (session_id,))
+                    stored = 0
+
+                new_rows = [(session_id, offset + i, json.dumps(message_to_dict(m)))
+                            for i, m in enumerate(messages) if offset + i >= stored]
+                conn.executemany(
+                    'INSERT OR REPLACE INTO session_messages (session_id, seq, message) VALUES (?, ?, ?)',
+                    new_rows
+                )
+                conn.execute('DELETE FROM session_messages WHERE session_id = ? AND seq < ?',
+                             (session_id, offset))
+                conn.execute('''
+                    INSERT INTO sessions (session_id, state, message_count, expires_at)
+                    VALUES (?, ?, ?, ?)
+                    ON CONFLICT(session_id) DO UPDATE SET
+                        state = excluded.state,
+                        message_count = excluded.message_count,
+                        expires_at = excluded.expires_at
+                ''', (session_id, json.dumps(scalars, default=str), offset + len(messages),
+                      time.time() + self.ttl_seconds))
+                if idempotency_key:
+                    # Saved in the same transaction, so a replayed response always matches the stored turn
+                    conn.execute(
+                        'INSERT OR REPLACE INTO session_responses (session_id, idempotency_key, response, expires_at) '
+                        'VALUES (?, ?, ?, ?)',
+                        (session_id, idempotency_key, json.dumps(response), time.time() + IDEMPOTENCY_TTL)
+                    )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+        self._count("saves")
+        self._count("messages_written", len(new_rows))
+        with self._lock:
+            self._saves += 1
+            purge = self._saves % PURGE_EVERY == 0
+        if purge:
+            self.purge_expired()
+
+    def get_response(self, session_id: str, idempotency_key: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT response FROM session_responses '
+                'WHERE session_id = ? AND idempotency_key = ? AND expires_at >= ?',
+                (session_id, idempotency_key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        self._count("replays")
+        return json.loads(row["response"])
+
+    def delete(self, session_id: str):
+        with self.pool.connection() as conn:
+            conn.execute('DELETE FROM session_responses WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM session_messages WHERE session_id = ?', (session_id,))
+            conn.execute('DELETE FROM sessions WHERE session_id = ?', (session_id,))
+            conn.commit()
+
+    def purge_expired(self) -> int:
+        """Delete sessions past their TTL; returns how many were removed."""
+        now = time.time()
+        with self.pool.connection() as conn:
+            conn.execute('''
+                DELETE FROM session_messages WHERE session_id IN
+                    (SELECT session_id FROM sessions WHERE expires_at < ?)
+            ''', (now,))
+            removed = conn.execute('DELETE FROM sessions WHERE expires_at < ?', (now,)).rowcount
+            conn.execute('DELETE FROM session_responses WHERE expires_at < ?', (now,))
+            conn.commit()
+        self._count("expirations", removed)
+        return removed
+
+    def get_stats(self) -> Dict:
+        with self.pool.connection() as conn:
+            sessions = conn.execute('SELECT COUNT(*) FROM sessions').fetchone()[0]
+            stored_messages = conn.execute('SELECT COUNT(*) FROM session_messages').fetchone()[0]
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, "backend": "sqlite", "sessions": sessions, "stored_messages": stored_messages}
+
+
+class SessionLocks:
+    """
+    One lock per active session, so turns of a session run one at a time
+    while different sessions run in parallel. Locks are dropped once no
+    request holds or waits for them.
+
+    Locks are per process; with several workers, route each session to the
+    same worker (sticky sessions).
+    """
+
+    def __init__(self):
+        self._locks = {}  # session_id -> [lock, holders and waiters]
+        self._lock = threading.Lock()
+        self.stats = {"acquired": 0, "contended": 0}
+
+    def _checkout(self, session_id: str):
+        with self._lock:
+            entry = self._locks.setdefault(session_id, [self._new_lock(), 0])
+            entry[1] += 1
+            self.stats["acquired"] += 1
+            if entry[1] > 1:
+                self.stats["contended"] += 1
+            return entry[0]
+
+    def _checkin(self, session_id: str):
+        with self._lock:
+            entry = self._locks[session_id]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[session_id]
+
+    def _new_lock(self):
+        return threading.Lock()
+
+    @contextmanager
+    def hold(self, session_id: str):
+        """Hold the session's lock for the duration of a turn."""
+        lock = self._checkout(session_id)
+        try:
+            with lock:
+                yield
+        finally:
+            self._checkin(session_id)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {**self.stats, "active": len(self._locks)}
+
+
+class AsyncSessionLocks(SessionLocks):
+    """SessionLocks for the ASGI server: waiting for a busy session does not block the event loop."""
+
+    def _new_lock(self):
+        return asyncio.Lock()
+
+    @asynccontextmanager
+    async def hold(self, session_id: str):
+        """Hold the session's lock for the duration of a turn."""
+        lock = self._checkout(session_id)
+        try:
+            async with lock:
+                yield
+        finally:
+            self._checkin(session_id)
+
+
+def create_session_store() -> SessionStore:
+    """
+    Build the store selected by SESSION_STORE ("memory", the default, or "sqlite").
+
+    The SQLite store uses SESSION_DB (default Data/sessions.db).
+    """
+    backend = os.getenv("SESSION_STORE", "memory").lower()
+    if backend == "sqlite":
+        default_path = os.path.join(os.path.dirname(__file__), '..', '..', 'Data', 'sessions.db')
+        return SQLiteSessionStore(os.getenv("SESSION_DB") or os.path.abspath(default_path))
+    if backend != "memory":
+        raise ValueError(f"Unknown SESSION_STORE: {backend}")
+    return InMemorySessionStore()
@@ -1,78 +1,156 @@
+import functools
+import os
 from .nodes import (SupportState,
                      intent_detect, 
+                     route_request,
                      route_to_agent, 
+                     route_combined_output,
                      route_flight_agent_output, 
                      route_hotel_agent_output,
                      set_variables,
                      disambiguation,
                      flightAgent, 
-                     hotelAgent)
+                     hotelAgent,
+                     as_runnable,
+                     get_llm)
+from langchain_core.messages import HumanMessage, ToolMessage
 from langgraph.graph import StateGraph, END
+from Data.database import get_db
 
 
+def get_initial_state():
+    """Create initial state for a new session."""
+    return {
+        "messages": [],
+        "customer_id": "",
+        "ticket_id": "",
+        "hotel_id": "",
+        "intent": "",
+        "tools": [],
+        "issue_type": "",
+        "resolution_status": "pending",
+        "next": ""
+    }
 
 
-def create_support_graph():
-    """Create the customer support workflow graph."""
+def get_turn_response(result):
+    """Answer fields returned to the client after a turn."""
+    messages = result.get("messages") or []
+    last_message = messages[-1] if messages else None
+    # Sub-agent action that answered the turn: the tool message it added after the user's message
+    action = ""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            break
+        if isinstance(message, ToolMessage):
+            action = message.tool_call_id
+            break
+    return {
+        "response": last_message.content if hasattr(last_message, 'content') else str(last_message or ''),
+        "customer_id": result.get("customer_id", ""),
+        "intent": result.get("intent", ""),
+        "action": action
+    }
+
+
+def create_support_graph(combined_routing: bool = None):
+    """Create the customer support workflow graph.
+
+    The compiled graph supports both invoke (Flask app, CLI) and ainvoke
+    (ASGI app); see graph_node in nodes.py.
+
+    Args:
+        combined_routing: Use the single-call router (intent, action and arguments
+            in one structured LLM call) instead of intent detection followed by the
+            flight/hotel orchestrators. Defaults to the COMBINED_ROUTING env var.
+    """
+    if combined_routing is None:
+        combined_routing = os.getenv("COMBINED_ROUTING", "0") == "1"
+
     workflow = StateGraph(SupportState)
     flight_agent = flightAgent()
     hotel_agent= hotelAgent()
     # Add nodes
-    workflow.add_node("detect_intent", intent_detect)
-    workflow.add_node("disambiguation", disambiguation)
-
-
-    workflow.add_node("hotel_agent", hotel_agent.hotel_agent_orchestrator)
-    workflow.add_node("hotel_details", hotel_agent.hotel_details)
-    workflow.add_node("all_hotels", hotel_agent.all_hotels)
-    workflow.add_node("book_hotel", hotel_agent.book_hotel)
-    workflow.add_node("lookup_customer_hotel", hotel_agent.lookup_customer)
-    workflow.add_node("flight_agent", flight_agent.flight_agent_orchestraor)
-    workflow.add_node("lookup_customer_flight", flight_agent.lookup_customer)
-    workflow.add_node("flight_details", flight_agent.flight_details)
-    workflow.add_node("all_flights", flight_agent.all_flights)
-    workflow.add_node("book_flight", flight_agent.book_flight)
-    workflow.add_node('respond_flight', flight_agent.respond)
-    workflow.add_node('respond_hotel', hotel_agent.respond)
-    workflow.add_node("set_variables", set_variables)
-
-    workflow.set_entry_point("detect_intent")
-
-    workflow.add_conditional_edges(
-            "detect_intent",
-            route_to_agent,
+    workflow.add_node("disambiguation", as_runnable(disambiguation))
+
+
+    workflow.add_node("hotel_details", as_runnable(hotel_agent.hotel_details))
+    workflow.add_node("all_hotels", as_runnable(hotel_agent.all_hotels))
+    workflow.add_node("book_hotel", as_runnable(hotel_agent.book_hotel))
+    workflow.add_node("lookup_customer_hotel", as_runnable(hotel_agent.lookup_customer))
+    workflow.add_node("lookup_customer_flight", as_runnable(flight_agent.lookup_customer))
+    workflow.add_node("flight_details", as_runnable(flight_agent.flight_details))
+    workflow.add_node("all_flights", as_runnable(flight_agent.all_flights))
+    workflow.add_node("find_connections", as_runnable(flight_agent.connections))
+    workflow.add_node("book_flight", as_runnable(flight_agent.book_flight))
+    workflow.add_node('respond_flight', as_runnable(flight_agent.respond))
+    workflow.add_node('respond_hotel', as_runnable(hotel_agent.respond))
+    workflow.add_node("set_variables", as_runnable(set_variables))
+
+    if combined_routing:
+        # One structured LLM call picks intent, action and arguments
+        workflow.add_node("route_request", as_runnable(route_request))
+        workflow.set_entry_point("route_request")
+
+        workflow.add_conditional_edges(
+            "route_request",
+            route_combined_output,
             {
                 "disambiguation": "disambiguation",
-                "flight_agent": "flight_agent",
-                "hotel_agent": "hotel_agent",
                 "set_variables": "set_variables",
-                END: END # If the intent is not flight or hotel, end the workflow
-
+                "lookup_customer_flight": "lookup_customer_flight",
+                "flight_details": "flight_details",
+                "all_flights": "all_flights",
+                "find_connections": "find_connections",
+                "book_flight": "book_flight",
+                "lookup_customer_hotel": "lookup_customer_hotel",
+                "hotel_details": "hotel_details",
+                "all_hotels": "all_hotels",
+                "book_hotel": "book_hotel",
+                END: END
             })
+    else:
+        workflow.add_node("detect_intent", as_runnable(intent_detect))
+        workflow.add_node("hotel_agent", as_runnable(hotel_agent.hotel_agent_orchestrator))
+        workflow.add_node("flight_agent", as_runnable(flight_agent.flight_agent_orchestraor))
+        workflow.set_entry_point("detect_intent")
+
+        workflow.add_conditional_edges(
+                "detect_intent",
+                route_to_agent,
+                {
+                    "disambiguation": "disambiguation",
+                    "flight_agent": "flight_agent",
+                    "hotel_agent": "hotel_agent",
+                    "set_variables": "set_variables",
+                    END: END # If the intent is not flight or hotel, end the workflow
 
-    workflow.add_conditional_edges(
-        "flight_agent",
-        route_flight_agent_output,
-        {
-            "lookup_customer_flight": "lookup_customer_flight",
-            "flight_details": "flight_details",
-            "all_flights": "all_flights",
-            "book_flight": "book_flight",
-            END: END, # If no specific action, just end for now
-        }
-    )
-
-    workflow.add_conditional_edges(
-        "hotel_agent",
-        route_hotel_agent_output,
-        {
-            "lookup_customer_hotel": "lookup_customer_hotel",
-            "hotel_details": "hotel_details",
-            "all_hotels": "all_hotels",
-            "book_hotel": "book_hotel",
-            END: END, # If no specific action, just end for now
-        }
-    )
+                })
+
+        workflow.add_conditional_edges(
+            "flight_agent",
+            route_flight_agent_output,
+            {
+                "lookup_customer_flight": "lookup_customer_flight",
+                "flight_details": "flight_details",
+                "all_flights": "all_flights",
+                "find_connections": "find_connections",
+                "book_flight": "book_flight",
+                END: END, # If no specific action, just end for now
+            }
+        )
+
+        workflow.add_conditional_edges(
+            "hotel_agent",
+            route_hotel_agent_output,
+            {
+                "lookup_customer_hotel": "lookup_customer_hotel",
+                "hotel_details": "hotel_details",
+                "all_hotels": "all_hotels",
+                "book_hotel": "book_hotel",
+                END: END, # If no specific action, just end for now
+            }
+        )
     
 
     # All tool nodes should lead to END once their action is completed
@@ -81,6 +159,7 @@ def create_support_graph():
     workflow.add_edge("lookup_customer_flight", 'respond_flight')
     workflow.add_edge("flight_details", 'respond_flight')
     workflow.add_edge("all_flights", 'respond_flight')
+    workflow.add_edge("find_connections", 'respond_flight')
     workflow.add_edge("lookup_customer_hotel", 'respond_hotel')
     workflow.add_edge("hotel_details", 'respond_hotel')
     workflow.add_edge("all_hotels", 'respond_hotel')
@@ -92,3 +171,33 @@ def create_support_graph():
     workflow.add_edge("respond_hotel", END)
 
     return workflow.compile()
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled_graph(combined_routing: bool):
+    return create_support_graph(combined_routing)
+
+
+def get_support_graph(combined_routing: bool = None):
+    """The compiled graph, built on first call and shared afterwards (one per routing mode)."""
+    if combined_routing is None:
+        combined_routing = os.getenv("COMBINED_ROUTING", "0") == "1"
+    return _compiled_graph(combined_routing)
+
+
+def warm_up(llm: bool = True):
+    """
+    Do the first-use work ahead of the first request: open and migrate the
+    database, prime the catalog lookups used for entity extraction, build the
+    LLM client and compile the graph. Servers call this at startup (WARM_UP=0
+    skips it); the CLI and tests leave everything to first use.
+
+    Args:
+        llm: Also create the LLM client (needs GROQ_KEY unless LLM_BACKEND=fake)
+    """
+    db = get_db()
+    db.get_airport_codes()
+    db.get_hotel_locations()
+    if llm:
+        get_llm()
+    return get_support_graph()
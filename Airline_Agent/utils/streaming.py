@@ -0,0 +1,102 @@
+"""
+Streaming a single conversation turn as events.
+
+Used by the /api/chat/stream endpoints (as server-sent events) and by the
+agent.py CLI. A turn produces:
+    node   {"node": name}          after each graph node finishes
+    token  {"text": chunk}         pieces of the final answer as the LLM writes them
+    done   {"response", "customer_id", "intent", "action"}
+    error  {"message": text}
+Answers that were not generated token by token (cached LLM responses, fixed
+replies such as set_variables, replayed idempotent requests) are sent as a
+single token event before done.
+"""
+import asyncio
+import json
+from typing import AsyncIterator, Callable, Dict, Iterator, Optional, Tuple
+
+from .state import get_turn_response
+
+# Nodes whose LLM output is the answer shown to the user
+ANSWER_NODES = {"respond_flight", "respond_hotel", "disambiguation"}
+
+STREAM_MODES = ["updates", "messages", "values"]
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one server-sent event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class _TurnEvents:
+    """Turns graph stream chunks into (event, data) pairs and tracks the final state."""
+
+    def __init__(self):
+        self.final_state = None
+        self.streamed_text = ""
+
+    def handle(self, mode: str, chunk) -> Iterator[Tuple[str, Dict]]:
+        if mode == "values":
+            self.final_state = chunk
+        elif mode == "updates":
+            for node in chunk:
+                yield "node", {"node": node}
+        elif mode == "messages":
+            message, metadata = chunk
+            if metadata.get("langgraph_node") in ANSWER_NODES and isinstance(message.content, str) \
+                    and message.content:
+                self.streamed_text += message.content
+                yield "token", {"text": message.content}
+
+    def finish(self) -> Iterator[Tuple[str, Dict]]:
+        done = get_turn_response(self.final_state or {})
+        if done["response"] and not self.streamed_text:
+            yield "token", {"text": done["response"]}
+        yield "done", done
+
+
+def replay_turn(response: Dict) -> Iterator[Tuple[str, Dict]]:
+    """Events for a turn answered from an earlier response (idempotent retry)."""
+    if response.get("response"):
+        yield "token", {"text": response["response"]}
+    yield "done", {key: response.get(key, "") for key in ("response", "customer_id", "intent", "action")}
+
+
+def stream_turn(graph, state: Dict,
+                on_complete: Optional[Callable[[Dict], None]] = None) -> Iterator[Tuple[str, Dict]]:
+    """
+    Run one turn with graph.stream, yielding (event, data) pairs.
+
+    Args:
+        graph: Compiled support graph
+        state: Session state with the new user message already appended
+        on_complete: Called with the final state once the turn finishes
+    """
+    events = _TurnEvents()
+    try:
+        for mode, chunk in graph.stream(state, stream_mode=STREAM_MODES):
+            yield from events.handle(mode, chunk)
+    except Exception as e:
+        yield "error", {"message": f"Error processing message: {str(e)}"}
+        return
+    if on_complete and events.final_state:
+        on_complete(events.final_state)
+    yield from events.finish()
+
+
+async def astream_turn(graph, state: Dict,
+                       on_complete: Optional[Callable[[Dict], None]] = None) -> AsyncIterator[Tuple[str, Dict]]:
+    """Async version of stream_turn, driving the graph with astream."""
+    events = _TurnEvents()
+    try:
+        async for mode, chunk in graph.astream(state, stream_mode=STREAM_MODES):
+            for item in events.handle(mode, chunk):
+                yield item
+    except Exception as e:
+        yield "error", {"message": f"Error processing message: {str(e)}"}
+        return
+    if on_complete and events.final_state:
+        # Typically saves the session, which may be a SQLite write
+        await asyncio.to_thread(on_complete, events.final_state)
+    for item in events.finish():
+        yield item
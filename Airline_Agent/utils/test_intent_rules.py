@@ -0,0 +1,46 @@
+"""
+Test script for the deterministic intent pre-classifier
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from Airline_Agent.utils.intent_rules import classify_intent
+
+# Threshold intent_detect applies before skipping the LLM (nodes.INTENT_RULES_THRESHOLD)
+THRESHOLD = 0.9
+
+
+def test_confident_intents():
+    """Messages whose intent is obvious clear the threshold"""
+    cases = {
+        "CUST123": "set_state_variables",
+        "my customer id is CUST123": "set_state_variables",
+        "book FLIGHT456": "book_flight",
+        "reserve HOTEL123": "book_hotel",
+        "show my flight details": "my_flight_details",
+        "where is my hotel": "my_hotel_details",
+        "flights from JFK": "all_flight_details",
+        "hotels in Chicago": "all_hotel_details",
+    }
+    for text, expected in cases.items():
+        intent, confidence = classify_intent(text)
+        print(f"{text!r}: {intent} ({confidence})")
+        assert intent == expected and confidence >= THRESHOLD, text
+
+
+def test_ambiguous_messages_go_to_llm():
+    """Messages carrying more than an ID, or asking to change a booking, stay below the threshold"""
+    for text in ["CUST123 wants to cancel", "CUST123 I need help", "cancel my flight",
+                 "I want to change my flight", "my flight was delayed", "cancel my hotel"]:
+        intent, confidence = classify_intent(text)
+        print(f"{text!r}: {intent} ({confidence})")
+        assert confidence < THRESHOLD, text
+
+
+if __name__ == "__main__":
+    test_confident_intents()
+    test_ambiguous_messages_go_to_llm()
+    print("\nAll intent rule tests completed!")
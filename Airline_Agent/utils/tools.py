@@ -7,14 +7,23 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..',
 from langchain.tools import tool
 from Data.database import (
     query_flight,
-    query_flights_departure,
-    query_flights_arrival,
-    query_flights_date_location,
-    query_hotels_location,
-    query_hotels_location_price,
-    add_customer,
-    add_flight_to_customer,
-    add_hotel_to_customer,
+    browse_flights,
+    search_itineraries,
+    query_hotel,
+    browse_hotels,
+    search_hotels,
+    register_customer,
+    reserve_flight,
+    reserve_hotel,
+    query_itinerary,
+    CREATED,
+    CUSTOMER_EXISTS,
+    BOOKING_FAILED,
+    BOOKED,
+    ALREADY_BOOKED,
+    SOLD_OUT,
+    UNKNOWN_ITEM,
+    UNKNOWN_CUSTOMER,
     db
 )
 
@@ -34,42 +43,89 @@ def get_flight_details(flight_id: str) -> str:
     else:
         return "Flight not found."
 
+def _page_result(page, kind: str, **search) -> str:
+    """
+    JSON for one page of a browse query: the matches shown, how many there are
+    in total and the offset of the next page, so the agent can offer "more".
+    """
+    try:
+        result = page(**search)
+    except ValueError as e:
+        return f"Invalid search: {e}"
+    return json.dumps({
+        "total": result["total"],
+        "offset": result["offset"],
+        "next_offset": result["next_offset"],
+        kind: result["items"],
+    })
+
 @tool
-def get_flights_by_departure(departure_airport: str) -> str:
-    """Get all flights departing from a specific airport.
+def get_flights_by_departure(departure_airport: str, limit: int = 10, offset: int = 0,
+                             sort: str = "departure_time") -> str:
+    """Get flights departing from a specific airport, one page at a time.
     Args:
         departure_airport: Airport code (e.g., JFK, LAX, ORD)
+        limit: Number of flights to return (max 100)
+        offset: Number of flights to skip (use next_offset from the previous page)
+        sort: "departure_time", "arrival_time" or "flight_id"
     Returns:
-        JSON string with list of flights
+        JSON string with the total number of matches, next_offset and a page of flights
     """
-    departure_airport = departure_airport.upper()
-    flights = query_flights_departure(departure_airport)
-    return json.dumps(flights)
+    return _page_result(browse_flights, "flights", departure_airport=departure_airport.upper(),
+                       limit=limit, offset=offset, sort=sort)
 
 @tool
-def get_flights_by_arrival(arrival_airport: str) -> str:
-    """Get all flights arriving at a specific airport.
+def get_flights_by_arrival(arrival_airport: str, limit: int = 10, offset: int = 0,
+                           sort: str = "arrival_time") -> str:
+    """Get flights arriving at a specific airport, one page at a time.
     Args:
         arrival_airport: Airport code (e.g., JFK, LAX, ORD)
+        limit: Number of flights to return (max 100)
+        offset: Number of flights to skip (use next_offset from the previous page)
+        sort: "departure_time", "arrival_time" or "flight_id"
     Returns:
-        JSON string with list of flights
+        JSON string with the total number of matches, next_offset and a page of flights
     """
-    arrival_airport = arrival_airport.upper()
-    flights = query_flights_arrival(arrival_airport)
-    return json.dumps(flights)
+    return _page_result(browse_flights, "flights", arrival_airport=arrival_airport.upper(),
+                       limit=limit, offset=offset, sort=sort)
 
 @tool
-def get_flights_by_date_and_departure(departure_airport: str, departure_date: str) -> str:
-    """Get all flights departing from a specific airport on a specific date.
+def get_flights_by_date_and_departure(departure_airport: str, departure_date: str, limit: int = 10,
+                                      offset: int = 0, sort: str = "departure_time") -> str:
+    """Get flights departing from a specific airport on a specific date, one page at a time.
     Args:
         departure_airport: Airport code (e.g., JFK, LAX, ORD)
         departure_date: Date in format YYYY-MM-DD (e.g., 2023-10-15)
+        limit: Number of flights to return (max 100)
+        offset: Number of flights to skip (use next_offset from the previous page)
+        sort: "departure_time", "arrival_time" or "flight_id"
+    Returns:
+        JSON string with the total number of matches, next_offset and a page of flights
+    """
+    return _page_result(browse_flights, "flights", departure_airport=departure_airport.upper(),
+                       departure_date=departure_date, limit=limit, offset=offset, sort=sort)
+
+@tool
+def find_connections(departure_airport: str, arrival_airport: str, departure_date: str = "",
+                     max_stops: int = 2, sort: str = "fastest") -> str:
+    """Find direct and connecting flight itineraries between two airports.
+    Args:
+        departure_airport: Origin airport code (e.g., ORD)
+        arrival_airport: Destination airport code (e.g., JFK)
+        departure_date: Earliest departure, YYYY-MM-DD (optional; empty searches from the first flight)
+        max_stops: Maximum number of connections (0 for direct flights only)
+        sort: "fastest" (shortest total travel time) or "fewest_stops"
     Returns:
-        JSON string with list of flights
+        JSON string with a list of itineraries (legs, stops, layover and total minutes) or a message
     """
-    departure_airport = departure_airport.upper()
-    flights = query_flights_date_location(departure_airport, departure_date)
-    return json.dumps(flights)
+    try:
+        itineraries = search_itineraries(departure_airport, arrival_airport, departure_date or None,
+                                         max_stops, sort)
+    except ValueError as e:
+        return f"Invalid search: {e}"
+    if not itineraries:
+        return f"No itineraries found from {departure_airport.upper()} to {arrival_airport.upper()}."
+    return json.dumps(itineraries)
 
 # ==================== Hotel Tools ====================
 
@@ -81,35 +137,54 @@ def get_hotel_details(hotel_id: str) -> str:
     Returns:
         JSON string with hotel details or error message
     """
-    hotels = db.get_all_hotels()
-    hotel = next((h for h in hotels if h["hotel_id"] == hotel_id), None)
+    hotel = query_hotel(hotel_id)
     if hotel:
         return json.dumps(hotel)
     else:
         return "Hotel not found."
 
 @tool
-def get_hotels_by_location(location: str) -> str:
-    """Get all hotels in a specific location.
+def get_hotels_by_location(location: str, limit: int = 10, offset: int = 0, sort: str = "price") -> str:
+    """Get hotels in a specific location, one page at a time.
     Args:
         location: City or location name (e.g., New York, Chicago)
+        limit: Number of hotels to return (max 100)
+        offset: Number of hotels to skip (use next_offset from the previous page)
+        sort: "price", "price_desc" or "name"
     Returns:
-        JSON string with list of hotels
+        JSON string with the total number of matches, next_offset and a page of hotels
     """
-    hotels = query_hotels_location(location)
-    return json.dumps(hotels)
+    return _page_result(browse_hotels, "hotels", location=location, limit=limit, offset=offset, sort=sort)
 
 @tool
-def get_hotels_by_location_and_price(location: str, min_price: float, max_price: float) -> str:
-    """Get all hotels in a specific location within a price range.
+def get_hotels_by_location_and_price(location: str, min_price: float, max_price: float, limit: int = 10,
+                                     offset: int = 0, sort: str = "price") -> str:
+    """Get hotels in a specific location within a price range, one page at a time.
     Args:
         location: City or location name (e.g., New York, Chicago)
         min_price: Minimum price per night
         max_price: Maximum price per night
+        limit: Number of hotels to return (max 100)
+        offset: Number of hotels to skip (use next_offset from the previous page)
+        sort: "price", "price_desc" or "name"
+    Returns:
+        JSON string with the total number of matches, next_offset and a page of hotels
+    """
+    return _page_result(browse_hotels, "hotels", location=location, min_price=min_price,
+                       max_price=max_price, limit=limit, offset=offset, sort=sort)
+
+@tool
+def find_hotels(query: str, limit: int = 10) -> str:
+    """Search hotels by name or location, tolerating misspellings (e.g., "hotels in chicgo", "luxery suites").
+    Args:
+        query: Free text naming a hotel, a city, or both
+        limit: Number of hotels to return (max 100)
     Returns:
-        JSON string with list of hotels
+        JSON string with matching hotels, best match first, or a message if none match
     """
-    hotels = query_hotels_location_price(location, min_price, max_price)
+    hotels = search_hotels(query, limit)
+    if not hotels:
+        return f"No hotels match '{query}'."
     return json.dumps(hotels)
 
 # ==================== Customer Tools ====================
@@ -128,6 +203,21 @@ def get_customer_details(customer_id: str) -> str:
     else:
         return "Customer not found."
 
+@tool
+def get_customer_itinerary(customer_id: str) -> str:
+    """Get every flight and hotel a customer has booked, with their details.
+    Args:
+        customer_id: Customer ID
+    Returns:
+        JSON string with the customer's bookings (oldest first) or a message
+    """
+    itinerary = query_itinerary(customer_id)
+    if itinerary:
+        return json.dumps(itinerary)
+    if db.get_customer(customer_id):
+        return f"Customer {customer_id} has no bookings."
+    return "Customer not found."
+
 @tool
 def create_customer(customer_id: str, flight_id: str = None, hotel_id: str = None) -> str:
     """Create a new customer with optional flight and hotel bookings.
@@ -136,43 +226,60 @@ def create_customer(customer_id: str, flight_id: str = None, hotel_id: str = Non
         flight_id: Optional flight ID for booking
         hotel_id: Optional hotel ID for booking
     Returns:
-        Success or error message
+        Success or error message (existing customer, or a booking that failed)
     """
-    success = add_customer(customer_id, flight_id, hotel_id)
-    if success:
-        return f"Customer {customer_id} created successfully."
-    else:
-        return f"Failed to create customer {customer_id}. Customer may already exist."
+    outcome = register_customer(customer_id, flight_id, hotel_id)
+    bookings = outcome["bookings"]
+    if outcome["status"] == CREATED:
+        return " ".join([f"Customer {customer_id} created successfully."] +
+                        [booking_message(kind, booking) for kind, booking in bookings.items()])
+    if outcome["status"] == CUSTOMER_EXISTS:
+        return f"Failed to create customer {customer_id}. Customer already exists."
+    if outcome["status"] == BOOKING_FAILED:
+        # The customer is only created together with every requested booking
+        failed = [booking_message(kind, booking) for kind, booking in bookings.items() if booking["status"] != BOOKED]
+        return " ".join([f"Customer {customer_id} was not created."] + failed)
+    return f"Failed to create customer {customer_id} because of a database error. Please try again."
+
+def booking_message(kind: str, booking: dict) -> str:
+    """Result line for a reserve_flight / reserve_hotel outcome ("flight" or "hotel")."""
+    item_id, customer_id = booking[f"{kind}_id"], booking["customer_id"]
+    status = booking["status"]
+    if status == BOOKED:
+        units = "seats" if kind == "flight" else "rooms"
+        return f"Successfully booked {kind} {item_id} for customer {customer_id} ({booking['available']} {units} left)"
+    if status == ALREADY_BOOKED:
+        return f"Customer {customer_id} already has {kind} {item_id} booked"
+    if status == SOLD_OUT:
+        full = "sold out" if kind == "flight" else "fully booked"
+        return f"Could not book {kind} {item_id}: it is {full}. Please choose another {kind}."
+    if status == UNKNOWN_ITEM:
+        return f"Could not book {kind} {item_id}: no such {kind} exists."
+    if status == UNKNOWN_CUSTOMER:
+        return f"Failed to book {kind} {item_id}. Customer {customer_id} may not exist in the database."
+    return f"Failed to book {kind} {item_id} because of a database error. Please try again."
 
 @tool
 def book_flight_for_customer(customer_id: str, flight_id: str) -> str:
-    """Book a flight for an existing customer.
+    """Book a seat on a flight for an existing customer.
     Args:
         customer_id: Customer ID
         flight_id: Flight ID to book
     Returns:
-        Success or error message
+        Success or error message (sold out, unknown flight or customer)
     """
-    success = add_flight_to_customer(customer_id, flight_id)
-    if success:
-        return f"Flight {flight_id} booked for customer {customer_id}."
-    else:
-        return f"Failed to book flight. Customer {customer_id} may not exist."
+    return booking_message("flight", reserve_flight(customer_id, flight_id))
 
 @tool
 def book_hotel_for_customer(customer_id: str, hotel_id: str) -> str:
-    """Book a hotel for an existing customer.
+    """Book a room in a hotel for an existing customer.
     Args:
         customer_id: Customer ID
         hotel_id: Hotel ID to book
     Returns:
-        Success or error message
+        Success or error message (fully booked, unknown hotel or customer)
     """
-    success = add_hotel_to_customer(customer_id, hotel_id)
-    if success:
-        return f"Hotel {hotel_id} booked for customer {customer_id}."
-    else:
-        return f"Failed to book hotel. Customer {customer_id} may not exist."
+    return booking_message("hotel", reserve_hotel(customer_id, hotel_id))
 
 # ==================== Backward Compatibility Aliases ====================
 
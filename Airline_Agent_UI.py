@@ -1,5 +1,6 @@
 import streamlit as st
 import requests
+import json
 import uuid
 from datetime import datetime
 
@@ -120,22 +121,55 @@ def end_conversation():
         return False
 
 
-def send_message(user_message):
-    """Send a message to the agent API."""
+def stream_message(user_message, placeholder, idempotency_key, retries=1):
+    """
+    Send a message to the streaming endpoint, rendering the answer as it arrives.
+
+    Reads the server-sent events from /api/chat/stream: node progress is shown
+    until the first answer token, then the answer grows token by token.
+    A timed-out or dropped request is retried with the same idempotency key,
+    so the server replays the answer instead of running the turn twice.
+    """
+    response_text = ""
     try:
-        response = requests.post(
-            f"{API_URL}/api/chat",
+        with requests.post(
+            f"{API_URL}/api/chat/stream",
             json={
                 'message': user_message,
-                'session_id': st.session_state.session_id
+                'session_id': st.session_state.session_id,
+                'idempotency_key': idempotency_key
             },
+            stream=True,
             timeout=30
-        )
-
-        if response.status_code == 200:
-            data = response.json()
-            if data['status'] == 'success':
-                return data['response'], data.get('customer_id', '')
+        ) as response:
+            if response.status_code != 200:
+                return None, None
+
+            event = None
+            for line in response.iter_lines(decode_unicode=True):
+                if line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                    continue
+                if not line.startswith("data:"):
+                    continue
+                data = json.loads(line[len("data:"):])
+
+                if event == "node" and not response_text:
+                    placeholder.markdown(f"_Agent is thinking... ({data['node'].replace('_', ' ')})_")
+                elif event == "token":
+                    response_text += data['text']
+                    placeholder.markdown(response_text + " ▌")
+                elif event == "done":
+                    placeholder.markdown(data['response'])
+                    return data['response'], data.get('customer_id', '')
+                elif event == "error":
+                    st.error(data['message'])
+                    return None, None
+        return (response_text or None), None
+    except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+        if retries > 0:
+            return stream_message(user_message, placeholder, idempotency_key, retries - 1)
+        st.error(f"Error sending message: {str(e)}")
         return None, None
     except Exception as e:
         st.error(f"Error sending message: {str(e)}")
@@ -232,9 +266,11 @@ if st.session_state.conversation_active:
             'timestamp': datetime.now().strftime("%H:%M:%S")
         })
 
-        # Get agent response
-        with st.spinner("Agent is thinking..."):
-            agent_response, customer_id = send_message(user_input)
+        # Stream the agent response into a placeholder as it is generated
+        with st.chat_message("assistant"):
+            placeholder = st.empty()
+            placeholder.markdown("_Agent is thinking..._")
+            agent_response, customer_id = stream_message(user_input, placeholder, str(uuid.uuid4()))
 
             if agent_response:
                 # Update customer ID if provided
@@ -0,0 +1,280 @@
+"""
+Streaming bulk importer for flight and hotel catalogs
+
+Rows are read lazily from CSV or JSONL files, validated one at a time and
+written in chunked executemany transactions with upsert semantics, so memory
+use stays flat and each chunk costs a single commit regardless of file size.
+
+Usage:
+    python Data/bulk_import.py flights schedule.csv
+    python Data/bulk_import.py hotels hotels.jsonl --chunk-size 10000
+"""
+
+import csv
+import json
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+DEFAULT_CHUNK_SIZE = 5000
+
+# Keep at most this many row errors in the report
+MAX_REPORTED_ERRORS = 20
+
+FLIGHT_FIELDS = ("flight_id", "departure_airport", "arrival_airport", "departure_time", "arrival_time")
+HOTEL_FIELDS = ("hotel_id", "name", "location", "price_per_night")
+
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Upserts only touch rows whose values actually changed
+UPSERT_SQL = {
+    "flights": '''
+        INSERT INTO flights (flight_id, departure_airport, arrival_airport, departure_time, arrival_time)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT(flight_id) DO UPDATE SET
+            departure_airport = excluded.departure_airport,
+            arrival_airport = excluded.arrival_airport,
+            departure_time = excluded.departure_time,
+            arrival_time = excluded.arrival_time
+        WHERE flights.departure_airport IS NOT excluded.departure_airport
+           OR flights.arrival_airport IS NOT excluded.arrival_airport
+           OR flights.departure_time IS NOT excluded.departure_time
+           OR flights.arrival_time IS NOT excluded.arrival_time
+    ''',
+    "hotels": '''
+        INSERT INTO hotels (hotel_id, name, location, price_per_night)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(hotel_id) DO UPDATE SET
+            name = excluded.name,
+            location = excluded.location,
+            price_per_night = excluded.price_per_night
+        WHERE hotels.name IS NOT excluded.name
+           OR hotels.location IS NOT excluded.location
+           OR hotels.price_per_night IS NOT excluded.price_per_night
+    ''',
+}
+
+# Keep existing rows untouched (same semantics as add_flight/add_hotel)
+INSERT_IGNORE_SQL = {
+    "flights": '''
+        INSERT OR IGNORE INTO flights (flight_id, departure_airport, arrival_airport, departure_time, arrival_time)
+        VALUES (?, ?, ?, ?, ?)
+    ''',
+    "hotels": '''
+        INSERT OR IGNORE INTO hotels (hotel_id, name, location, price_per_night)
+        VALUES (?, ?, ?, ?)
+    ''',
+}
+
+
+# ==================== Readers ====================
+
+def read_csv_rows(path: str) -> Iterator[Dict]:
+    """Yield rows from a CSV file with a header line"""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield row
+
+
+def read_jsonl_rows(path: str) -> Iterator[Dict]:
+    """Yield one JSON object per non-empty line of a JSONL file"""
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as e:
+                # Surface as an invalid row instead of aborting the import
+                yield {"_error": f"line {line_number}: invalid JSON ({e.msg})"}
+
+
+def read_rows(path: str) -> Iterator[Dict]:
+    """Pick a reader based on the file extension (.csv, .jsonl, .ndjson)"""
+    lower = path.lower()
+    if lower.endswith(".csv"):
+        return read_csv_rows(path)
+    if lower.endswith((".jsonl", ".ndjson")):
+        return read_jsonl_rows(path)
+    raise ValueError(f"Unsupported file type: {path} (expected .csv or .jsonl)")
+
+
+# ==================== Validation ====================
+
+def _required(row: Dict, field: str) -> str:
+    value = row.get(field)
+    if value is None or str(value).strip() == "":
+        raise ValueError(f"missing {field}")
+    return str(value).strip()
+
+
+def _timestamp(row: Dict, field: str) -> str:
+    value = _required(row, field).replace("T", " ")
+    try:
+        return datetime.strptime(value, TIME_FORMAT).strftime(TIME_FORMAT)
+    except ValueError:
+        raise ValueError(f"{field} must be YYYY-MM-DD HH:MM:SS, got {value!r}")
+
+
+def _airport(row: Dict, field: str) -> str:
+    value = _required(row, field).upper()
+    if len(value) != 3 or not value.isalpha():
+        raise ValueError(f"{field} must be a 3-letter airport code, got {value!r}")
+    return value
+
+
+def validate_flight(row: Dict) -> Tuple:
+    """Validate and normalize a flight row into an insert tuple"""
+    if "_error" in row:
+        raise ValueError(row["_error"])
+    return (
+        _required(row, "flight_id").upper(),
+        _airport(row, "departure_airport"),
+        _airport(row, "arrival_airport"),
+        _timestamp(row, "departure_time"),
+        _timestamp(row, "arrival_time"),
+    )
+
+
+def validate_hotel(row: Dict) -> Tuple:
+    """Validate and normalize a hotel row into an insert tuple"""
+    if "_error" in row:
+        raise ValueError(row["_error"])
+    raw_price = _required(row, "price_per_night")
+    try:
+        price = float(raw_price)
+    except ValueError:
+        raise ValueError(f"price_per_night must be a number, got {raw_price!r}")
+    if price < 0:
+        raise ValueError("price_per_night must not be negative")
+    return (
+        _required(row, "hotel_id").upper(),
+        _required(row, "name"),
+        _required(row, "location"),
+        price,
+    )
+
+
+VALIDATORS = {
+    "flights": validate_flight,
+    "hotels": validate_hotel,
+}
+
+
+# ==================== Import Pipeline ====================
+
+def _chunks(iterable: Iterable, size: int) -> Iterator[List]:
+    """Split an iterable into lists of at most size items"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def import_records(db, kind: str, records: Iterable[Dict], chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   progress: Optional[Callable[[Dict], None]] = None, upsert: bool = True) -> Dict:
+    """
+    Validate and upsert records into the flights or hotels table
+
+    Args:
+        db: BookingDatabase to write into
+        kind: "flights" or "hotels"
+        records: Iterable of row dictionaries (consumed lazily)
+        chunk_size: Rows per executemany transaction
+        progress: Optional callback receiving the report after each chunk
+        upsert: Update existing rows (True) or leave them untouched (False)
+
+    Returns:
+        Report dictionary with row counts, errors and throughput
+    """
+    if kind not in UPSERT_SQL:
+        raise ValueError(f"Unknown catalog kind: {kind} (expected 'flights' or 'hotels')")
+
+    sql = UPSERT_SQL[kind] if upsert else INSERT_IGNORE_SQL[kind]
+    validate = VALIDATORS[kind]
+    report = {
+        "kind": kind,
+        "rows_read": 0,
+        "rows_written": 0,
+        "rows_unchanged": 0,
+        "rows_invalid": 0,
+        "chunks": 0,
+        "errors": [],
+        "elapsed_seconds": 0.0,
+        "rows_per_second": 0.0,
+    }
+    start = time.perf_counter()
+
+    def valid_rows():
+        for row in records:
+            report["rows_read"] += 1
+            try:
+                yield validate(row)
+            except ValueError as e:
+                report["rows_invalid"] += 1
+                if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                    report["errors"].append(f"row {report['rows_read']}: {e}")
+
+    for chunk in _chunks(valid_rows(), chunk_size):
+        # One write transaction (or group-commit unit) per chunk
+        written = db.write_transaction(lambda conn: conn.executemany(sql, chunk).rowcount, f"import_{kind}")
+        if written:
+            db.invalidate_cache(kind)
+
+        report["chunks"] += 1
+        report["rows_written"] += written
+        report["rows_unchanged"] += len(chunk) - written
+
+        elapsed = time.perf_counter() - start
+        report["elapsed_seconds"] = round(elapsed, 3)
+        report["rows_per_second"] = round(report["rows_read"] / elapsed, 1) if elapsed else 0.0
+        if progress:
+            progress(report)
+
+    elapsed = time.perf_counter() - start
+    report["elapsed_seconds"] = round(elapsed, 3)
+    report["rows_per_second"] = round(report["rows_read"] / elapsed, 1) if elapsed else 0.0
+    return report
+
+
+def import_file(db, kind: str, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """Stream a CSV/JSONL file into the flights or hotels table"""
+    report = import_records(db, kind, read_rows(path), chunk_size=chunk_size, progress=progress)
+    report["source"] = path
+    return report
+
+
+def print_progress(report: Dict):
+    """Progress callback that prints one line per chunk"""
+    print(f"  {report['kind']}: {report['rows_read']:,} read, {report['rows_written']:,} written, "
+          f"{report['rows_invalid']:,} invalid ({report['rows_per_second']:,.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from database import db
+
+    parser = argparse.ArgumentParser(description="Bulk import flight or hotel catalogs")
+    parser.add_argument("kind", choices=sorted(UPSERT_SQL))
+    parser.add_argument("path", help="CSV or JSONL file")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    print(f"Importing {args.kind} from {args.path}...")
+    result = import_file(db, args.kind, args.path, chunk_size=args.chunk_size, progress=print_progress)
+
+    print(f"\n{'='*60}")
+    print(f"Rows read:      {result['rows_read']:,}")
+    print(f"Rows written:   {result['rows_written']:,}")
+    print(f"Rows unchanged: {result['rows_unchanged']:,}")
+    print(f"Rows invalid:   {result['rows_invalid']:,}")
+    print(f"Elapsed:        {result['elapsed_seconds']}s ({result['rows_per_second']:,.0f} rows/s)")
+    for error in result["errors"]:
+        print(f"  - {error}")
+    print(f"{'='*60}\n")
@@ -0,0 +1,149 @@
+"""
+In-process read-through cache for flight and hotel catalog queries
+
+Entries are evicted least-recently-used once max_entries is reached and
+expire after ttl_seconds. Writes in this process invalidate their namespace
+immediately; the TTL bounds staleness for writes made by other processes.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Tuple
+
+
+class CatalogCache:
+    """Thread-safe LRU cache with per-entry TTL, grouped by namespace"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        """
+        Args:
+            max_entries: Maximum number of cached query results
+            ttl_seconds: Seconds before a cached result expires
+        """
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries = OrderedDict()  # key -> (expires_at, namespace, value)
+        self._generations = {}  # namespace -> invalidation counter
+        self._global_generation = 0  # bumped when everything is invalidated
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0, "invalidations": 0}
+
+    def generation(self, namespace: str) -> Tuple[int, int]:
+        """Current invalidation counters (global, namespace) for a namespace"""
+        with self._lock:
+            return self._global_generation, self._generations.get(namespace, 0)
+
+    def get(self, key: Hashable) -> Tuple[bool, Any]:
+        """
+        Look up a cached value
+
+        Returns:
+            (True, value) on a hit, (False, None) on a miss or expired entry
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats["misses"] += 1
+                return False, None
+
+            expires_at, _, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                self.stats["expirations"] += 1
+                self.stats["misses"] += 1
+                return False, None
+
+            self._entries.move_to_end(key)
+            self.stats["hits"] += 1
+            return True, value
+
+    def set(self, key: Hashable, namespace: str, value: Any, generation: Tuple[int, int] = None):
+        """
+        Store a value, evicting the least recently used entries if full
+
+        If generation is given and the namespace was invalidated since it was
+        read, the value is stale and is not stored.
+        """
+        with self._lock:
+            current = (self._global_generation, self._generations.get(namespace, 0))
+            if generation is not None and generation != current:
+                return
+
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, namespace, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+
+    def invalidate(self, namespace: str = None):
+        """Drop all entries in a namespace, or everything if namespace is None"""
+        with self._lock:
+            if namespace is None:
+                self._entries.clear()
+                self._global_generation += 1
+            else:
+                for key in [k for k, entry in self._entries.items() if entry[1] == namespace]:
+                    del self._entries[key]
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+            self.stats["invalidations"] += 1
+
+    def get_stats(self) -> dict:
+        """Snapshot of cache counters"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0,
+            }
+
+
+def _freeze(value):
+    """Make list and set arguments usable as part of a cache key"""
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, set):
+        # Equal sets iterate in different orders; a frozenset key does not depend on it
+        return frozenset(value)
+    return value
+
+
+def _copy_result(value):
+    """Copy cached results (pages, rows, nested lists) so callers cannot mutate the cached value"""
+    if isinstance(value, list):
+        return [_copy_result(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _copy_result(item) for key, item in value.items()}
+    return value
+
+
+def cached_query(namespace: str):
+    """
+    Decorator for BookingDatabase read methods
+
+    Results are cached in self.cache under the given namespace ("flights" or
+    "hotels"); the method runs normally when self.cache is None.
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.cache
+            if cache is None:
+                return method(self, *args, **kwargs)
+
+            key = (namespace, method.__name__,
+                   tuple(_freeze(a) for a in args),
+                   tuple(sorted((k, _freeze(v)) for k, v in kwargs.items())))
+            hit, value = cache.get(key)
+            if hit:
+                return _copy_result(value)
+
+            generation = cache.generation(namespace)
+            value = method(self, *args, **kwargs)
+            cache.set(key, namespace, value, generation)
+            return _copy_result(value)
+        return wrapper
+    return decorator
@@ -0,0 +1,183 @@
+"""
+Thread-safe pool of reusable SQLite connections used by BookingDatabase
+"""
+
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+try:
+    from .metrics import DB_POOL_WAIT_SECONDS
+except ImportError:
+    from metrics import DB_POOL_WAIT_SECONDS
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared across request threads"""
+
+    def __init__(self, db_path: str, pool_size: int = 5, timeout: float = 10.0,
+                 busy_timeout_ms: int = 10000):
+        """
+        Create an empty pool. Connections are opened lazily on first use.
+
+        Args:
+            db_path: Path to the SQLite database file
+            pool_size: Maximum number of open connections
+            timeout: Seconds to wait for a free connection before giving up
+            busy_timeout_ms: SQLite busy_timeout applied to every connection
+        """
+        if pool_size < 1:
+            raise ValueError("pool_size must be at least 1")
+
+        self.db_path = db_path
+        self.pool_size = pool_size
+        self.timeout = timeout
+        self.busy_timeout_ms = busy_timeout_ms
+
+        # LIFO so the most recently used (warmest page cache) connection is reused first
+        self._idle = queue.LifoQueue(maxsize=pool_size)
+        self._lock = threading.Lock()
+        self._open_count = 0
+        self._closed = False
+        self.stats = {"created": 0, "reused": 0, "discarded": 0, "waits": 0}
+
+    # ==================== Connection Lifecycle ====================
+
+    def _create_connection(self) -> sqlite3.Connection:
+        """Open a new connection with the per-connection settings applied"""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000,
+            check_same_thread=False  # Connections move between threads via the pool
+        )
+        conn.row_factory = sqlite3.Row  # Enable dictionary-like access
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        return conn
+
+    def _reserve_slot(self) -> bool:
+        """Reserve capacity for a new connection if the pool is not full"""
+        with self._lock:
+            if self._open_count < self.pool_size:
+                self._open_count += 1
+                return True
+            return False
+
+    def _discard(self, conn: sqlite3.Connection):
+        """Close a connection and free its slot"""
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._open_count -= 1
+            self.stats["discarded"] += 1
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        """Cheap liveness check run before handing out an idle connection"""
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _new_connection(self) -> sqlite3.Connection:
+        """Open a connection for an already reserved slot"""
+        try:
+            conn = self._create_connection()
+        except Exception:
+            with self._lock:
+                self._open_count -= 1
+            raise
+        with self._lock:
+            self.stats["created"] += 1
+        return conn
+
+    def acquire(self) -> sqlite3.Connection:
+        """
+        Borrow a connection from the pool
+
+        Returns:
+            An open sqlite3 connection; give it back with release()
+
+        Raises:
+            RuntimeError: If the pool has been closed
+            TimeoutError: If no connection became free within the timeout
+        """
+        if self._closed:
+            raise RuntimeError("Connection pool is closed")
+
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            if self._reserve_slot():
+                return self._new_connection()
+            with self._lock:
+                self.stats["waits"] += 1
+            with DB_POOL_WAIT_SECONDS.time(os.path.basename(self.db_path)):
+                try:
+                    conn = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise TimeoutError(
+                        f"No database connection available after {self.timeout}s "
+                        f"(pool_size={self.pool_size})"
+                    )
+
+        if not self._is_healthy(conn):
+            self._discard(conn)
+            if not self._reserve_slot():
+                # Another thread took the freed slot; wait for a connection normally
+                return self.acquire()
+            return self._new_connection()
+
+        with self._lock:
+            self.stats["reused"] += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection):
+        """Return a borrowed connection, rolling back any unfinished transaction"""
+        if self._closed:
+            self._discard(conn)
+            return
+
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for the duration of a with-block"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close all idle connections; borrowed ones are closed when released"""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def get_stats(self) -> dict:
+        """Snapshot of pool counters"""
+        with self._lock:
+            return {
+                **self.stats,
+                "open": self._open_count,
+                "idle": self._idle.qsize(),
+                "pool_size": self.pool_size,
+            }
@@ -18,3 +18,24 @@ CUSTOMER_DATA= [
         "HOTEL_ID": ""
     }
 ]
+
+
+def load_customer_data():
+    """Load CUSTOMER_DATA into the customers table, skipping existing customers"""
+    try:
+        from .database import db
+    except ImportError:
+        # Fallback for direct execution
+        from database import db
+
+    customer_count = 0
+    for customer in CUSTOMER_DATA:
+        if db.add_customer(customer["customer_id"]):
+            customer_count += 1
+            # Seeded bookings take a seat / room like any other booking
+            if customer["FLIGHT_ID"]:
+                db.reserve_flight(customer["customer_id"], customer["FLIGHT_ID"])
+            if customer["HOTEL_ID"]:
+                db.reserve_hotel(customer["customer_id"], customer["HOTEL_ID"])
+
+    return customer_count
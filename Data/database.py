@@ -1,105 +1,360 @@
 import sqlite3
 import os
+import asyncio
+import atexit
+import functools
+import random
+import threading
+import time
 from typing import List, Dict, Optional
-from datetime import datetime
+from datetime import datetime, timedelta
 
 # Import existing data
 try:
     from .flight_data import FLIGHT_DATA
     from .hotel_data import HOTEL_DATA
+    from .connection_pool import ConnectionPool
+    from .migrations import migrate, get_schema_version, create_hotel_search_index
+    from .bulk_import import import_records, import_file, DEFAULT_CHUNK_SIZE
+    from .cache import CatalogCache, cached_query
+    from .metrics import metrics, timed_query, BOOKINGS, DB_BUSY_RETRIES
+    from .write_queue import WriteQueue, is_busy
+    from .routes import RouteIndex, DEFAULT_MAX_STOPS
+    from .hotel_search import search_terms, match_expression, rank_hotels, SEARCH_CANDIDATES
 except ImportError:
     # Fallback for direct execution
     from flight_data import FLIGHT_DATA
     from hotel_data import HOTEL_DATA
+    from connection_pool import ConnectionPool
+    from migrations import migrate, get_schema_version, create_hotel_search_index
+    from bulk_import import import_records, import_file, DEFAULT_CHUNK_SIZE
+    from cache import CatalogCache, cached_query
+    from metrics import metrics, timed_query, BOOKINGS, DB_BUSY_RETRIES
+    from write_queue import WriteQueue, is_busy
+    from routes import RouteIndex, DEFAULT_MAX_STOPS
+    from hotel_search import search_terms, match_expression, rank_hotels, SEARCH_CANDIDATES
 
 # Database file path
 DB_PATH = os.path.join(os.path.dirname(__file__), "booking_system.db")
 
+# Maximum number of pooled connections per BookingDatabase
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+
+# Catalog read cache size (0 disables caching) and entry lifetime in seconds
+CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "1024"))
+CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "300"))
+
+# Seconds before the connection-search index is rebuilt to pick up writes from other processes
+ROUTE_INDEX_TTL = float(os.getenv("ROUTE_INDEX_TTL", str(CATALOG_CACHE_TTL)))
+
+# Attempts after the first for a write transaction that hits SQLITE_BUSY, and the base backoff (seconds)
+WRITE_MAX_RETRIES = int(os.getenv("WRITE_MAX_RETRIES", "5"))
+WRITE_RETRY_BACKOFF = 0.005
+
+# Group commit: write transactions are batched by one writer thread (WRITE_QUEUE=0 commits each on its own).
+# The writer waits WRITE_QUEUE_WINDOW_MS for more work after the first unit of a batch.
+WRITE_QUEUE_ENABLED = os.getenv("WRITE_QUEUE", "1") == "1"
+WRITE_QUEUE_WINDOW = float(os.getenv("WRITE_QUEUE_WINDOW_MS", "1")) / 1000
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "256"))
+
+# Booking outcomes (see BookingDatabase.reserve_flight / reserve_hotel)
+BOOKED = "booked"
+ALREADY_BOOKED = "already_booked"
+SOLD_OUT = "sold_out"
+UNKNOWN_ITEM = "unknown_item"
+UNKNOWN_CUSTOMER = "unknown_customer"
+
+# Customer creation outcomes (see BookingDatabase.register_customer)
+CREATED = "created"
+CUSTOMER_EXISTS = "customer_exists"
+BOOKING_FAILED = "booking_failed"
+
+# Booking row states
+CONFIRMED = "confirmed"
+CANCELLED = "cancelled"
+
+# kind -> (customers column / item key, inventory table, available column, total column)
+INVENTORY = {
+    "flight": ("flight_id", "flight_inventory", "seats_available", "seats_total"),
+    "hotel": ("hotel_id", "hotel_inventory", "rooms_available", "rooms_total"),
+}
+
+# IDs per IN (...) query, well below SQLite's bound-parameter limit
+ID_BATCH_SIZE = 500
+
+FLIGHT_COLUMNS = "flight_id, departure_airport, arrival_airport, departure_time, arrival_time"
+HOTEL_COLUMNS = "hotel_id, name, location, price_per_night"
+BOOKING_COLUMNS = "booking_id, customer_id, item_type, item_id, status, created_at, updated_at"
+
+# Rows per page for browse queries, and the largest page a caller can ask for
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", "10"))
+MAX_PAGE_SIZE = 100
+
+# Sort option -> ORDER BY; each order ends on the primary key so pages never overlap.
+# The first entry is the default.
+FLIGHT_SORTS = {
+    "departure_time": "departure_time, flight_id",
+    "arrival_time": "arrival_time, flight_id",
+    "flight_id": "flight_id",
+}
+HOTEL_SORTS = {
+    "price": "price_per_night, hotel_id",
+    "price_desc": "price_per_night DESC, hotel_id",
+    "name": "name, hotel_id",
+}
+
+
+def _page_clause(sorts: Dict[str, str], sort: str = None, limit: int = None, offset: int = 0):
+    """
+    ORDER BY / LIMIT / OFFSET tail for a catalog query
+
+    Returns ("", ()) when no sort, limit or offset is asked for, so unpaged
+    queries are unchanged; otherwise (sql, params).
+
+    Raises:
+        ValueError: If sort is not one of the given sort options
+    """
+    if sort is None and limit is None and not offset:
+        return "", ()
+    sort = sort or next(iter(sorts))
+    if sort not in sorts:
+        raise ValueError(f"sort must be one of {tuple(sorts)}")
+    # LIMIT -1 is SQLite for "no limit"
+    return f" ORDER BY {sorts[sort]} LIMIT ? OFFSET ?", (-1 if limit is None else limit, max(offset, 0))
+
+
+class _RollBack(Exception):
+    """Raised inside write_transaction work to undo it; carries the result to return instead"""
+
+    def __init__(self, result):
+        super().__init__(result)
+        self.result = result
+
+
+def _next_day(date: str) -> Optional[str]:
+    """The day after a YYYY-MM-DD date, or None if it is not one"""
+    try:
+        return (datetime.strptime(date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
 
 class BookingDatabase:
     """SQLite database manager for airline and hotel booking system"""
 
-    def __init__(self, db_path: str = DB_PATH):
-        """Initialize database connection and create tables if needed"""
+    def __init__(self, db_path: str = DB_PATH, pool_size: int = DB_POOL_SIZE,
+                 cache_size: int = CATALOG_CACHE_SIZE, cache_ttl: float = CATALOG_CACHE_TTL,
+                 group_commit: bool = WRITE_QUEUE_ENABLED):
+        """Initialize the connection pool and create tables if needed"""
         self.db_path = db_path
+        # Pooled connections carry busy_timeout (10 seconds) for every query
+        self.pool = ConnectionPool(db_path, pool_size=pool_size, busy_timeout_ms=10000)
+        # Read-through cache for flight/hotel catalog queries (None disables it)
+        self.cache = CatalogCache(cache_size, cache_ttl) if cache_size > 0 else None
+        # Connection-search index over all flights, built on first itinerary search
+        self._route_index = None  # (flights generation, built_at, RouteIndex)
+        self._route_index_lock = threading.Lock()
+        # Catalog writes made through this instance per namespace; counted even when the cache is disabled
+        self._catalog_writes = {"flights": 0, "hotels": 0}
+        self._catalog_writes_lock = threading.Lock()
+        # Write transactions go through the group-commit writer, or (without it)
+        # queue on this lock instead of in SQLite's busy handler
+        self.write_queue = WriteQueue(self.get_connection, window=WRITE_QUEUE_WINDOW,
+                                      max_batch=WRITE_QUEUE_MAX_BATCH, max_retries=WRITE_MAX_RETRIES,
+                                      retry_backoff=WRITE_RETRY_BACKOFF) if group_commit else None
+        self._write_lock = threading.Lock()
         self.init_database()
 
     def get_connection(self):
-        """Get a database connection"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row  # Enable dictionary-like access
-        return conn
+        """Borrow a pooled database connection (use as a context manager)"""
+        return self.pool.connection()
+
+    def close(self):
+        """Commit queued writes, then close all pooled connections"""
+        if self.write_queue is not None:
+            self.write_queue.close()
+        self.pool.close()
+
+    def invalidate_cache(self, namespace: str = None):
+        """Drop cached catalog results for "flights", "hotels" or everything"""
+        self._record_catalog_write(namespace)
+        if self.cache is not None:
+            self.cache.invalidate(namespace)
+
+    def _record_catalog_write(self, namespace: str = None):
+        with self._catalog_writes_lock:
+            for name in ([namespace] if namespace else list(self._catalog_writes)):
+                self._catalog_writes[name] += 1
+
+    def catalog_generation(self, namespace: str) -> int:
+        """
+        Writes to "flights" or "hotels" made through this instance
+
+        Structures derived from the catalog (route index, place vocabularies)
+        rebuild when this changes; writes from other processes need a TTL.
+        """
+        with self._catalog_writes_lock:
+            return self._catalog_writes[namespace]
 
     def init_database(self):
-        """Initialize the database and create all tables"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Enable WAL mode for better concurrent access
-        cursor.execute('PRAGMA journal_mode=WAL')
-
-        # Set timeout for locks (10 seconds)
-        conn.execute('PRAGMA busy_timeout = 10000')
-
-        # Create customers table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS customers (
-                customer_id TEXT PRIMARY KEY,
-                flight_id TEXT,
-                hotel_id TEXT
-            )
-        ''')
-
-        # Create flights table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS flights (
-                flight_id TEXT PRIMARY KEY,
-                departure_airport TEXT NOT NULL,
-                arrival_airport TEXT NOT NULL,
-                departure_time TEXT NOT NULL,
-                arrival_time TEXT NOT NULL
-            )
-        ''')
-
-        # Create hotels table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS hotels (
-                hotel_id TEXT PRIMARY KEY,
-                name TEXT NOT NULL,
-                location TEXT NOT NULL,
-                price_per_night REAL NOT NULL
-            )
-        ''')
+        """Initialize the database and upgrade the schema to the latest version"""
+        with self.get_connection() as conn:
+            # Enable WAL mode for better concurrent access (persistent for the database file)
+            conn.execute('PRAGMA journal_mode=WAL')
+
+            # Create tables and indexes; already-applied migrations are skipped
+            applied = migrate(conn)
+            if applied:
+                print(f"Applied database migrations: {applied}")
+            # Migration 5 skips the index when this SQLite build has no FTS5 trigram tokenizer
+            self.hotel_search_indexed = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'hotels_fts'"
+            ).fetchone() is not None
+
+    def rebuild_hotel_search_index(self) -> bool:
+        """
+        Create or refill the hotel full-text index from the hotels table
+
+        For databases migrated by a SQLite build without FTS5, or after a
+        VACUUM (which may renumber the hotel rowids the index is keyed on).
 
-        conn.commit()
-        conn.close()
+        Returns:
+            True if the index exists now, False if FTS5 is unavailable
+        """
+        def work(conn):
+            return create_hotel_search_index(conn)
+
+        self.hotel_search_indexed = self.write_transaction(work, "rebuild_hotel_search_index")
+        self.invalidate_cache("hotels")
+        return self.hotel_search_indexed
+
+    def get_schema_version(self) -> int:
+        """Get the current schema version of the database"""
+        with self.get_connection() as conn:
+            return get_schema_version(conn)
 
     def load_initial_data(self):
         """Load all existing data from flight_data.py and hotel_data.py into the database"""
-        # Load flights
-        flight_count = 0
-        for flight in FLIGHT_DATA:
-            if self.add_flight(
-                flight["flight_id"],
-                flight["departure_airport"],
-                flight["arrival_airport"],
-                flight["departure_time"],
-                flight["arrival_time"]
-            ):
-                flight_count += 1
-
-        # Load hotels
-        hotel_count = 0
-        for hotel in HOTEL_DATA:
-            if self.add_hotel(
-                hotel["hotel_id"],
-                hotel["name"],
-                hotel["location"],
-                hotel["price_per_night"]
-            ):
-                hotel_count += 1
-
-        return {"flights_loaded": flight_count, "hotels_loaded": hotel_count}
+        # Seed data never overwrites existing rows
+        flights = import_records(self, "flights", FLIGHT_DATA, upsert=False)
+        hotels = import_records(self, "hotels", HOTEL_DATA, upsert=False)
+
+        return {"flights_loaded": flights["rows_written"], "hotels_loaded": hotels["rows_written"]}
+
+    def import_catalog_file(self, kind: str, path: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                            progress=None) -> Dict:
+        """
+        Stream a CSV/JSONL catalog file into the flights or hotels table
+
+        Args:
+            kind: "flights" or "hotels"
+            path: Path to a .csv or .jsonl file
+            chunk_size: Rows per transaction
+            progress: Optional callback receiving the report after each chunk
+
+        Returns:
+            Import report with row counts, errors and throughput
+        """
+        return import_file(self, kind, path, chunk_size=chunk_size, progress=progress)
+
+    def _query_by_ids(self, table: str, key: str, columns: str, ids: List[str]) -> List[Dict]:
+        """
+        Fetch many rows by primary key using batched IN (...) lookups
+
+        Returns rows in the order of the requested IDs; unknown IDs are skipped
+        """
+        unique_ids = list(dict.fromkeys(ids))
+        found = {}
+
+        with self.get_connection() as conn:
+            for start in range(0, len(unique_ids), ID_BATCH_SIZE):
+                batch = unique_ids[start:start + ID_BATCH_SIZE]
+                placeholders = ", ".join("?" for _ in batch)
+                rows = conn.execute(
+                    f'SELECT {columns} FROM {table} WHERE {key} IN ({placeholders})', batch
+                ).fetchall()
+                for row in rows:
+                    found[row[key]] = dict(row)
+
+        return [found[i] for i in unique_ids if i in found]
+
+    def _query_page(self, table: str, columns: str, sorts: Dict[str, str], conditions: List[str],
+                    params: List, sort: str, limit: int, offset: int) -> Dict:
+        """
+        Count the rows matching all conditions and fetch one sorted page of them
+
+        Both statements run on one connection; the sort orders follow the
+        covering indexes, so the count and the skipped rows come from the index.
+        """
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        offset = max(offset, 0)
+        page_sql, page_params = _page_clause(sorts, sort, limit, offset)
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self.get_connection() as conn:
+            total = conn.execute(f'SELECT COUNT(*) FROM {table}{where}', params).fetchone()[0]
+            rows = conn.execute(f'SELECT {columns} FROM {table}{where}{page_sql}',
+                                tuple(params) + page_params).fetchall() if offset < total else []
+
+        return {
+            "total": total,
+            "offset": offset,
+            "limit": limit,
+            "next_offset": offset + limit if offset + limit < total else None,
+            "items": [dict(row) for row in rows],
+        }
+
+    def write_transaction(self, work, operation: str = "write"):
+        """
+        Run work(conn) in a BEGIN IMMEDIATE transaction and commit it
+
+        IMMEDIATE takes SQLite's write lock before anything is read, so the
+        reads inside work() see data no other writer can change before the
+        commit. Lock waits are covered by the connection's busy_timeout;
+        if SQLITE_BUSY still surfaces, the whole transaction is retried up
+        to WRITE_MAX_RETRIES times with jittered exponential backoff.
+
+        With group commit on, work() is handed to the write queue and runs in
+        a SAVEPOINT inside a batch transaction shared with other callers; the
+        call still returns only once that transaction has committed.
+
+        Args:
+            work: Callable taking the connection; its return value is returned
+            operation: Label for db_busy_retries_total (batch re-runs count as "write_batch")
+
+        Raises:
+            sqlite3.OperationalError: If the database stays busy after all retries
+        """
+        if self.write_queue is not None:
+            return self.write_queue.run(work)
+
+        for attempt in range(WRITE_MAX_RETRIES + 1):
+            try:
+                with self._write_lock, self.get_connection() as conn:
+                    conn.execute('BEGIN IMMEDIATE')
+                    try:
+                        result = work(conn)
+                        conn.commit()
+                    except BaseException:
+                        conn.rollback()
+                        raise
+                return result
+            except sqlite3.OperationalError as e:
+                if not is_busy(e) or attempt == WRITE_MAX_RETRIES:
+                    raise
+                DB_BUSY_RETRIES.inc(operation)
+                time.sleep(random.uniform(0, WRITE_RETRY_BACKOFF * 2 ** attempt))
+
+    async def awrite_transaction(self, work, operation: str = "write"):
+        """
+        write_transaction for async callers
+
+        With group commit on, the event loop awaits the writer's future
+        directly; otherwise the transaction runs in a worker thread.
+        """
+        if self.write_queue is not None:
+            return await self.write_queue.run_async(work)
+        return await asyncio.to_thread(self.write_transaction, work, operation)
 
     # ==================== Customer Functions ====================
 
@@ -109,91 +364,357 @@ class BookingDatabase:
 
         Args:
             customer_id: Unique customer identifier
-            flight_id: Flight booking ID (optional)
-            hotel_id: Hotel booking ID (optional)
+            flight_id: Flight to book for the new customer (optional)
+            hotel_id: Hotel to book for the new customer (optional)
 
         Returns:
-            True if successful, False otherwise
+            True if the customer was created with the requested bookings,
+            False otherwise (see register_customer for the reason)
         """
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+        return self.register_customer(customer_id, flight_id, hotel_id)["status"] == CREATED
 
-            cursor.execute('''
-                INSERT OR IGNORE INTO customers (customer_id, flight_id, hotel_id)
-                VALUES (?, ?, ?)
-            ''', (customer_id, flight_id, hotel_id))
-
-            success = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
-            return success
-        except Exception as e:
+    @timed_query
+    def register_customer(self, customer_id: str, flight_id: str = None, hotel_id: str = None) -> Dict:
+        """
+        Add a new customer together with their initial bookings, all or nothing
+
+        The insert and the reservations run in one write transaction: if the
+        customer exists or a requested flight / hotel cannot be booked,
+        nothing is written.
+
+        Returns:
+            Dict with status (CREATED, CUSTOMER_EXISTS, BOOKING_FAILED or
+            "error"), customer_id and bookings: kind -> reserve result for
+            each requested item (the failed one's status says why)
+        """
+        requested = [(kind, item_id) for kind, item_id in (("flight", flight_id), ("hotel", hotel_id)) if item_id]
+        outcome = {"status": "error", "customer_id": customer_id, "bookings": {}}
+
+        def work(conn):
+            inserted = conn.execute('''
+                INSERT OR IGNORE INTO customers (customer_id)
+                VALUES (?)
+            ''', (customer_id,)).rowcount > 0
+            if not inserted:
+                return {**outcome, "status": CUSTOMER_EXISTS}
+            # Initial bookings take a seat / room and get a bookings row like any other
+            bookings = {}
+            for kind, item_id in requested:
+                bookings[kind] = self._book(conn, kind, customer_id, item_id)
+                if bookings[kind]["status"] != BOOKED:
+                    raise _RollBack({**outcome, "status": BOOKING_FAILED, "bookings": bookings})
+            return {**outcome, "status": CREATED, "bookings": bookings}
+
+        try:
+            outcome = self.write_transaction(work, "add_customer")
+        except _RollBack as e:
+            outcome = e.result
+        except sqlite3.Error as e:
             print(f"Error adding customer: {e}")
-            return False
+            return outcome
+
+        for kind, booking in outcome["bookings"].items():
+            # Bookings undone with a failed one are not counted
+            if outcome["status"] == CREATED or booking["status"] != BOOKED:
+                BOOKINGS.inc(kind, booking["status"])
+        return outcome
 
     def add_flight_to_customer(self, customer_id: str, flight_id: str) -> bool:
         """
-        Add a flight_id to an existing customer
+        Book a flight for an existing customer, taking a seat on it
 
         Args:
             customer_id: Customer identifier
             flight_id: Flight booking ID
 
         Returns:
-            True if successful, False otherwise
+            True if the customer now holds the flight, False otherwise
+            (unknown customer or flight, sold out, or a database error)
         """
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
-                UPDATE customers
-                SET flight_id = ?
-                WHERE customer_id = ?
-            ''', (flight_id, customer_id))
-
-            conn.commit()
-            success = cursor.rowcount > 0
-            conn.close()
-            return success
-        except Exception as e:
-            print(f"Error adding flight to customer: {e}")
-            return False
+        return self.reserve_flight(customer_id, flight_id)["status"] in (BOOKED, ALREADY_BOOKED)
 
     def add_hotel_to_customer(self, customer_id: str, hotel_id: str) -> bool:
         """
-        Add a hotel_id to an existing customer
+        Book a hotel for an existing customer, taking a room in it
 
         Args:
             customer_id: Customer identifier
             hotel_id: Hotel booking ID
 
         Returns:
-            True if successful, False otherwise
+            True if the customer now holds the hotel, False otherwise
+            (unknown customer or hotel, fully booked, or a database error)
+        """
+        return self.reserve_hotel(customer_id, hotel_id)["status"] in (BOOKED, ALREADY_BOOKED)
+
+    # ==================== Inventory and Bookings ====================
+
+    @timed_query
+    def reserve_flight(self, customer_id: str, flight_id: str) -> Dict:
+        """
+        Book a seat on a flight for a customer in one transaction
+
+        Returns:
+            Dict with status (BOOKED, ALREADY_BOOKED, SOLD_OUT, UNKNOWN_ITEM,
+            UNKNOWN_CUSTOMER or "error"), customer_id, flight_id, available seats
+            and the booking_id of the customer's booking (None unless booked)
         """
+        return self._reserve("flight", customer_id, flight_id)
+
+    @timed_query
+    def reserve_hotel(self, customer_id: str, hotel_id: str) -> Dict:
+        """
+        Book a room in a hotel for a customer in one transaction
+
+        Returns:
+            Dict with status (BOOKED, ALREADY_BOOKED, SOLD_OUT, UNKNOWN_ITEM,
+            UNKNOWN_CUSTOMER or "error"), customer_id, hotel_id, available rooms
+            and the booking_id of the customer's booking (None unless booked)
+        """
+        return self._reserve("hotel", customer_id, hotel_id)
+
+    @timed_query
+    async def areserve_flight(self, customer_id: str, flight_id: str) -> Dict:
+        """reserve_flight for async callers (awaits the write instead of blocking)"""
+        return await self._areserve("flight", customer_id, flight_id)
+
+    @timed_query
+    async def areserve_hotel(self, customer_id: str, hotel_id: str) -> Dict:
+        """reserve_hotel for async callers (awaits the write instead of blocking)"""
+        return await self._areserve("hotel", customer_id, hotel_id)
+
+    def _reserve(self, kind: str, customer_id: str, item_id: str) -> Dict:
+        """Take one unit of an item's inventory for a customer in its own write transaction"""
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
+            result = self.write_transaction(lambda conn: self._book(conn, kind, customer_id, item_id),
+                                            f"reserve_{kind}")
+        except sqlite3.Error as e:
+            result = self._booking_error(kind, customer_id, item_id, e)
+        BOOKINGS.inc(kind, result["status"])
+        return result
+
+    async def _areserve(self, kind: str, customer_id: str, item_id: str) -> Dict:
+        try:
+            result = await self.awrite_transaction(lambda conn: self._book(conn, kind, customer_id, item_id),
+                                                   f"reserve_{kind}")
+        except sqlite3.Error as e:
+            result = self._booking_error(kind, customer_id, item_id, e)
+        BOOKINGS.inc(kind, result["status"])
+        return result
+
+    @staticmethod
+    def _booking_error(kind: str, customer_id: str, item_id: str, error: sqlite3.Error) -> Dict:
+        print(f"Error booking {kind} {item_id} for customer {customer_id}: {error}")
+        return {"status": "error", "customer_id": customer_id, INVENTORY[kind][0]: item_id,
+                "available": None, "booking_id": None}
+
+    def _book(self, conn, kind: str, customer_id: str, item_id: str) -> Dict:
+        """
+        Take one unit of an item's inventory and record a booking for the customer
 
-            cursor.execute('''
-                UPDATE customers
-                SET hotel_id = ?
-                WHERE customer_id = ?
-            ''', (hotel_id, customer_id))
-
-            conn.commit()
-            success = cursor.rowcount > 0
-            conn.close()
-            return success
-        except Exception as e:
-            print(f"Error adding hotel to customer: {e}")
+        Runs inside the caller's write transaction. The decrement is guarded
+        (available > 0) and shares the BEGIN IMMEDIATE transaction with the
+        bookings insert, so concurrent bookings of the last seat cannot both
+        succeed. Earlier bookings are kept; the customer's flight_id /
+        hotel_id column points at the latest.
+        """
+        key, inventory, available, total = INVENTORY[kind]
+        result = {"status": "error", "customer_id": customer_id, key: item_id, "available": None,
+                  "booking_id": None}
+
+        customer = conn.execute(
+            'SELECT 1 FROM customers WHERE customer_id = ?', (customer_id,)
+        ).fetchone()
+        stock = conn.execute(
+            f'SELECT {available} FROM {inventory} WHERE {key} = ?', (item_id,)
+        ).fetchone()
+        if customer is None:
+            return {**result, "status": UNKNOWN_CUSTOMER}
+        if stock is None:
+            return {**result, "status": UNKNOWN_ITEM}
+        booking = conn.execute(
+            'SELECT booking_id FROM bookings WHERE customer_id = ? AND item_type = ? AND item_id = ? '
+            'AND status = ?', (customer_id, kind, item_id, CONFIRMED)
+        ).fetchone()
+        if booking:
+            return {**result, "status": ALREADY_BOOKED, "available": stock[0], "booking_id": booking[0]}
+
+        taken = conn.execute(
+            f'UPDATE {inventory} SET {available} = {available} - 1 WHERE {key} = ? AND {available} > 0',
+            (item_id,)
+        ).rowcount
+        if not taken:
+            return {**result, "status": SOLD_OUT, "available": 0}
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        booking_id = conn.execute(
+            'INSERT INTO bookings (customer_id, item_type, item_id, status, created_at, updated_at) '
+            'VALUES (?, ?, ?, ?, ?, ?)', (customer_id, kind, item_id, CONFIRMED, now, now)
+        ).lastrowid
+        conn.execute(f'UPDATE customers SET {key} = ? WHERE customer_id = ?', (item_id, customer_id))
+        return {**result, "status": BOOKED, "available": stock[0] - 1, "booking_id": booking_id}
+
+    @timed_query
+    def cancel_booking(self, customer_id: str, kind: str, item_id: str) -> bool:
+        """
+        Cancel a customer's confirmed booking of a flight or hotel
+
+        The seat / room goes back to the inventory, and the customer's
+        flight_id / hotel_id column falls back to their latest remaining
+        booking of that kind, all in one transaction.
+
+        Args:
+            customer_id: Customer identifier
+            kind: "flight" or "hotel"
+            item_id: Flight or hotel ID
+
+        Returns:
+            True if a confirmed booking was cancelled, False otherwise
+        """
+        key, inventory, available, total = INVENTORY[kind]
+
+        def work(conn):
+            now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            cancelled = conn.execute(
+                'UPDATE bookings SET status = ?, updated_at = ? '
+                'WHERE customer_id = ? AND item_type = ? AND item_id = ? AND status = ?',
+                (CANCELLED, now, customer_id, kind, item_id, CONFIRMED)
+            ).rowcount
+            if not cancelled:
+                return False
+            conn.execute(
+                f'UPDATE {inventory} SET {available} = {available} + 1 WHERE {key} = ? AND {available} < {total}',
+                (item_id,)
+            )
+            conn.execute(
+                f'UPDATE customers SET {key} = ('
+                f'    SELECT item_id FROM bookings WHERE customer_id = ? AND status = ? AND item_type = ?'
+                f'    ORDER BY booking_id DESC LIMIT 1'
+                f') WHERE customer_id = ? AND {key} = ?',
+                (customer_id, CONFIRMED, kind, customer_id, item_id)
+            )
+            return True
+
+        try:
+            cancelled = self.write_transaction(work, f"cancel_{kind}")
+        except sqlite3.Error as e:
+            print(f"Error cancelling {kind} {item_id} for customer {customer_id}: {e}")
             return False
+        if cancelled:
+            BOOKINGS.inc(kind, CANCELLED)
+        return cancelled
+
+    @timed_query
+    def get_bookings(self, customer_id: str, include_cancelled: bool = False) -> List[Dict]:
+        """
+        A customer's booking rows, oldest first
+
+        Args:
+            customer_id: Customer identifier
+            include_cancelled: Also return cancelled bookings
+
+        Returns:
+            List of booking dicts (booking_id, item_type, item_id, status, timestamps)
+        """
+        # Both forms are an idx_bookings_customer range; only the customer's own rows are sorted
+        condition, params = ('', (customer_id,)) if include_cancelled else (' AND status = ?', (customer_id, CONFIRMED))
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                f'SELECT {BOOKING_COLUMNS} FROM bookings WHERE customer_id = ?{condition} ORDER BY booking_id',
+                params
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+    @timed_query
+    def get_itinerary(self, customer_id: str) -> List[Dict]:
+        """
+        A customer's confirmed bookings with their flight or hotel details, oldest first
+
+        One query: the customer's rows come from idx_bookings_customer and
+        each is joined to its flight or hotel by primary key, so the cost
+        grows with the customer's bookings, not with the table.
+
+        Returns:
+            List of dicts with booking_id, item_type, item_id, created_at and
+            the flight's (airports, times) or hotel's (name, location, price) fields
+        """
+        with self.get_connection() as conn:
+            rows = conn.execute('''
+                SELECT b.booking_id, b.customer_id, b.item_type, b.item_id, b.created_at,
+                       f.departure_airport, f.arrival_airport, f.departure_time, f.arrival_time,
+                       h.name, h.location, h.price_per_night
+                FROM bookings b
+                LEFT JOIN flights f ON b.item_type = 'flight' AND f.flight_id = b.item_id
+                LEFT JOIN hotels h ON b.item_type = 'hotel' AND h.hotel_id = b.item_id
+                WHERE b.customer_id = ? AND b.status = ?
+                ORDER BY b.booking_id
+            ''', (customer_id, CONFIRMED)).fetchall()
+
+        details = {
+            "flight": ("departure_airport", "arrival_airport", "departure_time", "arrival_time"),
+            "hotel": ("name", "location", "price_per_night"),
+        }
+        itinerary = []
+        for row in rows:
+            entry = {key: row[key] for key in ("booking_id", "customer_id", "item_type", "item_id", "created_at")}
+            entry.update((key, row[key]) for key in details[row["item_type"]])
+            itinerary.append(entry)
+        return itinerary
+
+    @timed_query
+    def get_item_bookings(self, kind: str, item_id: str) -> List[str]:
+        """IDs of the customers holding a confirmed booking of a flight or hotel (from idx_bookings_item)"""
+        with self.get_connection() as conn:
+            rows = conn.execute(
+                'SELECT customer_id FROM bookings WHERE item_type = ? AND item_id = ? AND status = ?',
+                (kind, item_id, CONFIRMED)
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_flight_inventory(self, flight_id: str) -> Optional[Dict]:
+        """Seats total/available for a flight, or None if it has no inventory row"""
+        return self._get_inventory("flight", flight_id)
+
+    def get_hotel_inventory(self, hotel_id: str) -> Optional[Dict]:
+        """Rooms total/available for a hotel, or None if it has no inventory row"""
+        return self._get_inventory("hotel", hotel_id)
+
+    def _get_inventory(self, kind: str, item_id: str) -> Optional[Dict]:
+        key, inventory, available, total = INVENTORY[kind]
+        with self.get_connection() as conn:
+            row = conn.execute(
+                f'SELECT {key}, {total}, {available} FROM {inventory} WHERE {key} = ?', (item_id,)
+            ).fetchone()
+        return dict(row) if row else None
+
+    @timed_query
+    def set_capacity(self, kind: str, item_id: str, capacity: int) -> bool:
+        """
+        Set the seats ("flight") or rooms ("hotel") of an item
+
+        Units already booked stay booked: availability moves by the change in
+        capacity and never goes below zero.
+
+        Returns:
+            True if the item has an inventory row, False otherwise
+        """
+        key, inventory, available, total = INVENTORY[kind]
+
+        def work(conn):
+            return conn.execute(
+                f'UPDATE {inventory} SET {available} = MAX(0, MIN(?, {available} + ? - {total})), {total} = ? '
+                f'WHERE {key} = ?', (capacity, capacity, capacity, item_id)
+            ).rowcount > 0
+
+        updated = self.write_transaction(work, "set_capacity")
+        if updated and kind == "flight":
+            self._record_catalog_write("flights")
+        return updated
 
     # ==================== Flight Functions ====================
 
+    @timed_query
     def add_flight(self, flight_id: str, departure_airport: str, arrival_airport: str,
-                   departure_time: str, arrival_time: str) -> bool:
+                   departure_time: str, arrival_time: str, seats: int = None) -> bool:
         """
         Add a new flight to the database
 
@@ -203,28 +724,35 @@ class BookingDatabase:
             arrival_airport: Arrival airport code
             departure_time: Departure time (format: YYYY-MM-DD HH:MM:SS)
             arrival_time: Arrival time (format: YYYY-MM-DD HH:MM:SS)
+            seats: Seat capacity (default: migrations.DEFAULT_FLIGHT_SEATS)
 
         Returns:
             True if successful, False otherwise
         """
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
+        def work(conn):
+            inserted = conn.execute('''
                 INSERT OR IGNORE INTO flights (flight_id, departure_airport, arrival_airport,
                                    departure_time, arrival_time)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (flight_id, departure_airport, arrival_airport, departure_time, arrival_time))
+            ''', (flight_id, departure_airport, arrival_airport, departure_time, arrival_time)).rowcount > 0
+            if inserted and seats is not None:
+                conn.execute(
+                    'UPDATE flight_inventory SET seats_total = ?, seats_available = ? WHERE flight_id = ?',
+                    (seats, seats, flight_id)
+                )
+            return inserted
 
-            success = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
-            return success
-        except Exception as e:
+        try:
+            success = self.write_transaction(work, "add_flight")
+        except sqlite3.Error as e:
             print(f"Error adding flight: {e}")
             return False
+        if success:
+            self.invalidate_cache("flights")
+        return success
 
+    @cached_query("flights")
+    @timed_query
     def query_flight_by_id(self, flight_id: str) -> Optional[Dict]:
         """
         Query flight by flight_id
@@ -235,100 +763,179 @@ class BookingDatabase:
         Returns:
             Dictionary with flight data or None if not found
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
-            FROM flights
-            WHERE flight_id = ?
-        ''', (flight_id,))
+            cursor.execute('''
+                SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
+                FROM flights
+                WHERE flight_id = ?
+            ''', (flight_id,))
 
-        row = cursor.fetchone()
-        conn.close()
+            row = cursor.fetchone()
 
         if row:
             return dict(row)
         return None
 
-    def query_flights_by_departure(self, departure_airport: str) -> List[Dict]:
+    @cached_query("flights")
+    @timed_query
+    def get_flights_by_ids(self, flight_ids: List[str]) -> List[Dict]:
+        """
+        Query many flights by flight_id in one round trip
+
+        Args:
+            flight_ids: Flight identifiers
+
+        Returns:
+            List of flight dictionaries in the requested order (missing IDs skipped)
+        """
+        return self._query_by_ids("flights", "flight_id", FLIGHT_COLUMNS, flight_ids)
+
+    @cached_query("flights")
+    @timed_query
+    def query_flights_by_departure(self, departure_airport: str, sort: str = None,
+                                   limit: int = None, offset: int = 0) -> List[Dict]:
         """
         Query all flights by departure location
 
         Args:
             departure_airport: Departure airport code
+            sort: One of FLIGHT_SORTS (default: unordered unless limit/offset is given)
+            limit: Most rows returned (None for all)
+            offset: Rows skipped before the first one returned
 
         Returns:
             List of dictionaries containing flight data
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        page_sql, page_params = _page_clause(FLIGHT_SORTS, sort, limit, offset)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
-            FROM flights
-            WHERE departure_airport = ?
-        ''', (departure_airport,))
+            cursor.execute('''
+                SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
+                FROM flights
+                WHERE departure_airport = ?
+            ''' + page_sql, (departure_airport,) + page_params)
 
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
 
         return [dict(row) for row in rows]
 
-    def query_flights_by_arrival(self, arrival_airport: str) -> List[Dict]:
+    @cached_query("flights")
+    @timed_query
+    def query_flights_by_arrival(self, arrival_airport: str, sort: str = None,
+                                 limit: int = None, offset: int = 0) -> List[Dict]:
         """
         Query all flights by arrival location
 
         Args:
             arrival_airport: Arrival airport code
+            sort: One of FLIGHT_SORTS (default: unordered unless limit/offset is given)
+            limit: Most rows returned (None for all)
+            offset: Rows skipped before the first one returned
 
         Returns:
             List of dictionaries containing flight data
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        page_sql, page_params = _page_clause(FLIGHT_SORTS, sort, limit, offset)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
-            FROM flights
-            WHERE arrival_airport = ?
-        ''', (arrival_airport,))
+            cursor.execute('''
+                SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
+                FROM flights
+                WHERE arrival_airport = ?
+            ''' + page_sql, (arrival_airport,) + page_params)
 
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
 
         return [dict(row) for row in rows]
 
-    def query_flights_by_departure_date_location(self, departure_airport: str,
-                                                  departure_date: str) -> List[Dict]:
+    @cached_query("flights")
+    @timed_query
+    def query_flights_by_departure_date_location(self, departure_airport: str, departure_date: str,
+                                                  sort: str = None, limit: int = None,
+                                                  offset: int = 0) -> List[Dict]:
         """
         Query all flights by departure date and location
 
         Args:
             departure_airport: Departure airport code
             departure_date: Departure date (format: YYYY-MM-DD)
+            sort: One of FLIGHT_SORTS (default: unordered unless limit/offset is given)
+            limit: Most rows returned (None for all)
+            offset: Rows skipped before the first one returned
 
         Returns:
             List of dictionaries containing flight data
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
-
-        # Match flights where departure_time starts with the given date
-        cursor.execute('''
-            SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
-            FROM flights
-            WHERE departure_airport = ? AND departure_time LIKE ?
-        ''', (departure_airport, f"{departure_date}%"))
+        page_sql, page_params = _page_clause(FLIGHT_SORTS, sort, limit, offset)
+        next_date = _next_day(departure_date)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        rows = cursor.fetchall()
-        conn.close()
+            if next_date:
+                # Half-open range on departure_time so the departure index is used
+                cursor.execute('''
+                    SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
+                    FROM flights
+                    WHERE departure_airport = ? AND departure_time >= ? AND departure_time < ?
+                ''' + page_sql, (departure_airport, departure_date, next_date) + page_params)
+            else:
+                # Not a YYYY-MM-DD date: match flights where departure_time starts with it
+                cursor.execute('''
+                    SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time
+                    FROM flights
+                    WHERE departure_airport = ? AND departure_time LIKE ?
+                ''' + page_sql, (departure_airport, f"{departure_date}%") + page_params)
+
+            rows = cursor.fetchall()
 
         return [dict(row) for row in rows]
 
+    @cached_query("flights")
+    @timed_query
+    def page_flights(self, departure_airport: str = None, arrival_airport: str = None,
+                     departure_date: str = None, sort: str = "departure_time",
+                     limit: int = CATALOG_PAGE_SIZE, offset: int = 0) -> Dict:
+        """
+        One page of matching flights plus the total number of matches
+
+        Args:
+            departure_airport: Departure airport code (optional)
+            arrival_airport: Arrival airport code (optional)
+            departure_date: Departure date, YYYY-MM-DD (optional)
+            sort: One of FLIGHT_SORTS
+            limit: Page size, capped at MAX_PAGE_SIZE
+            offset: Matches skipped before the page
+
+        Returns:
+            Page dict: total, offset, limit, next_offset (None on the last page) and items
+        """
+        conditions, params = [], []
+        if departure_airport:
+            conditions.append("departure_airport = ?")
+            params.append(departure_airport)
+        if arrival_airport:
+            conditions.append("arrival_airport = ?")
+            params.append(arrival_airport)
+        if departure_date:
+            next_date = _next_day(departure_date)
+            if next_date:
+                conditions.append("departure_time >= ? AND departure_time < ?")
+                params += [departure_date, next_date]
+            else:
+                conditions.append("departure_time LIKE ?")
+                params.append(f"{departure_date}%")
+        return self._query_page("flights", FLIGHT_COLUMNS, FLIGHT_SORTS, conditions, params,
+                                sort, limit, offset)
+
     # ==================== Hotel Functions ====================
 
-    def add_hotel(self, hotel_id: str, name: str, location: str, price_per_night: float) -> bool:
+    @timed_query
+    def add_hotel(self, hotel_id: str, name: str, location: str, price_per_night: float,
+                  rooms: int = None) -> bool:
         """
         Add a new hotel to the database
 
@@ -337,54 +944,109 @@ class BookingDatabase:
             name: Hotel name
             location: Hotel location/city
             price_per_night: Price per night
+            rooms: Room capacity (default: migrations.DEFAULT_HOTEL_ROOMS)
 
         Returns:
             True if successful, False otherwise
         """
-        try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-
-            cursor.execute('''
+        def work(conn):
+            inserted = conn.execute('''
                 INSERT OR IGNORE INTO hotels (hotel_id, name, location, price_per_night)
                 VALUES (?, ?, ?, ?)
-            ''', (hotel_id, name, location, price_per_night))
+            ''', (hotel_id, name, location, price_per_night)).rowcount > 0
+            if inserted and rooms is not None:
+                conn.execute(
+                    'UPDATE hotel_inventory SET rooms_total = ?, rooms_available = ? WHERE hotel_id = ?',
+                    (rooms, rooms, hotel_id)
+                )
+            return inserted
 
-            success = cursor.rowcount > 0
-            conn.commit()
-            conn.close()
-            return success
-        except Exception as e:
+        try:
+            success = self.write_transaction(work, "add_hotel")
+        except sqlite3.Error as e:
             print(f"Error adding hotel: {e}")
             return False
+        if success:
+            self.invalidate_cache("hotels")
+        return success
+
+    @cached_query("hotels")
+    @timed_query
+    def query_hotel_by_id(self, hotel_id: str) -> Optional[Dict]:
+        """
+        Query hotel by hotel_id
+
+        Args:
+            hotel_id: Hotel identifier
+
+        Returns:
+            Dictionary with hotel data or None if not found
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                SELECT hotel_id, name, location, price_per_night
+                FROM hotels
+                WHERE hotel_id = ?
+            ''', (hotel_id,))
+
+            row = cursor.fetchone()
+
+        if row:
+            return dict(row)
+        return None
+
+    @cached_query("hotels")
+    @timed_query
+    def get_hotels_by_ids(self, hotel_ids: List[str]) -> List[Dict]:
+        """
+        Query many hotels by hotel_id in one round trip
+
+        Args:
+            hotel_ids: Hotel identifiers
 
-    def query_hotels_by_location(self, location: str) -> List[Dict]:
+        Returns:
+            List of hotel dictionaries in the requested order (missing IDs skipped)
+        """
+        return self._query_by_ids("hotels", "hotel_id", HOTEL_COLUMNS, hotel_ids)
+
+    @cached_query("hotels")
+    @timed_query
+    def query_hotels_by_location(self, location: str, sort: str = None,
+                                 limit: int = None, offset: int = 0) -> List[Dict]:
         """
         Query all hotels by location
 
         Args:
             location: Hotel location/city
+            sort: One of HOTEL_SORTS (default: unordered unless limit/offset is given)
+            limit: Most rows returned (None for all)
+            offset: Rows skipped before the first one returned
 
         Returns:
             List of dictionaries containing hotel data
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        page_sql, page_params = _page_clause(HOTEL_SORTS, sort, limit, offset)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # Use case-insensitive search
-        cursor.execute('''
-            SELECT hotel_id, name, location, price_per_night
-            FROM hotels
-            WHERE LOWER(location) = LOWER(?)
-        ''', (location,))
+            # Case-insensitive match that can use idx_hotels_location_price
+            cursor.execute('''
+                SELECT hotel_id, name, location, price_per_night
+                FROM hotels
+                WHERE location = ? COLLATE NOCASE
+            ''' + page_sql, (location,) + page_params)
 
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
 
         return [dict(row) for row in rows]
 
-    def query_hotels_by_location_price_range(self, location: str,
-                                             min_price: float, max_price: float) -> List[Dict]:
+    @cached_query("hotels")
+    @timed_query
+    def query_hotels_by_location_price_range(self, location: str, min_price: float, max_price: float,
+                                             sort: str = None, limit: int = None,
+                                             offset: int = 0) -> List[Dict]:
         """
         Query all hotels by location and price range
 
@@ -392,70 +1054,269 @@ class BookingDatabase:
             location: Hotel location/city
             min_price: Minimum price per night
             max_price: Maximum price per night
+            sort: One of HOTEL_SORTS (default: unordered unless limit/offset is given)
+            limit: Most rows returned (None for all)
+            offset: Rows skipped before the first one returned
 
         Returns:
             List of dictionaries containing hotel data
         """
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        page_sql, page_params = _page_clause(HOTEL_SORTS, sort, limit, offset)
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        # Use case-insensitive search
-        cursor.execute('''
-            SELECT hotel_id, name, location, price_per_night
-            FROM hotels
-            WHERE LOWER(location) = LOWER(?) AND price_per_night BETWEEN ? AND ?
-        ''', (location, min_price, max_price))
+            # Case-insensitive match that can use idx_hotels_location_price
+            cursor.execute('''
+                SELECT hotel_id, name, location, price_per_night
+                FROM hotels
+                WHERE location = ? COLLATE NOCASE AND price_per_night BETWEEN ? AND ?
+            ''' + page_sql, (location, min_price, max_price) + page_params)
 
-        rows = cursor.fetchall()
-        conn.close()
+            rows = cursor.fetchall()
 
         return [dict(row) for row in rows]
 
+    @cached_query("hotels")
+    @timed_query
+    def page_hotels(self, location: str = None, min_price: float = None, max_price: float = None,
+                    sort: str = "price", limit: int = CATALOG_PAGE_SIZE, offset: int = 0) -> Dict:
+        """
+        One page of matching hotels plus the total number of matches
+
+        Args:
+            location: Hotel location/city, case-insensitive (optional)
+            min_price: Minimum price per night (optional)
+            max_price: Maximum price per night (optional)
+            sort: One of HOTEL_SORTS
+            limit: Page size, capped at MAX_PAGE_SIZE
+            offset: Matches skipped before the page
+
+        Returns:
+            Page dict: total, offset, limit, next_offset (None on the last page) and items
+        """
+        conditions, params = [], []
+        if location:
+            conditions.append("location = ? COLLATE NOCASE")
+            params.append(location)
+        if min_price is not None:
+            conditions.append("price_per_night >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            conditions.append("price_per_night <= ?")
+            params.append(max_price)
+        return self._query_page("hotels", HOTEL_COLUMNS, HOTEL_SORTS, conditions, params,
+                                sort, limit, offset)
+
+    @cached_query("hotels")
+    @timed_query
+    def search_hotels(self, query: str, limit: int = 10) -> List[Dict]:
+        """
+        Typo-tolerant search of hotel names and locations ("hotels in chicgo", "luxery suites")
+
+        Candidates come from the hotels_fts trigram index (all hotels if
+        FTS5 is unavailable) and are ranked by hotel_search.rank_hotels.
+
+        Args:
+            query: Free text; stopwords and words under 3 characters are ignored
+            limit: Most hotels returned, capped at MAX_PAGE_SIZE
+
+        Returns:
+            Hotel dicts with a "score" (0-1], best match first
+        """
+        terms = search_terms(query)
+        if not terms:
+            return []
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+
+        with self.get_connection() as conn:
+            rows = None
+            if self.hotel_search_indexed:
+                try:
+                    rows = conn.execute('''
+                        SELECT h.hotel_id, h.name, h.location, h.price_per_night
+                        FROM hotels_fts JOIN hotels h ON h.hotel_id = hotels_fts.hotel_id
+                        WHERE hotels_fts MATCH ?
+                        ORDER BY hotels_fts.rank
+                        LIMIT ?
+                    ''', (match_expression(terms), SEARCH_CANDIDATES)).fetchall()
+                except sqlite3.OperationalError as e:
+                    # e.g. a SQLite build without FTS5 opening a database indexed by one with it
+                    print(f"Hotel search index unavailable, scanning hotels: {e}")
+            if rows is None:
+                rows = conn.execute(f'SELECT {HOTEL_COLUMNS} FROM hotels').fetchall()
+
+        return rank_hotels(terms, (dict(row) for row in rows), limit)
+
     # ==================== Utility Functions ====================
 
+    @timed_query
     def get_customer(self, customer_id: str) -> Optional[Dict]:
         """Get customer by ID"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('''
-            SELECT customer_id, flight_id, hotel_id
-            FROM customers
-            WHERE customer_id = ?
-        ''', (customer_id,))
+            cursor.execute('''
+                SELECT customer_id, flight_id, hotel_id
+                FROM customers
+                WHERE customer_id = ?
+            ''', (customer_id,))
 
-        row = cursor.fetchone()
-        conn.close()
+            row = cursor.fetchone()
 
         if row:
             return dict(row)
         return None
 
+    @cached_query("flights")
+    @timed_query
     def get_all_flights(self) -> List[Dict]:
         """Get all flights"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time FROM flights')
-        rows = cursor.fetchall()
-        conn.close()
+            cursor.execute('SELECT flight_id, departure_airport, arrival_airport, departure_time, arrival_time FROM flights')
+            rows = cursor.fetchall()
 
         return [dict(row) for row in rows]
 
+    # ==================== Connection Search ====================
+
+    def get_route_index(self) -> RouteIndex:
+        """
+        Connection-search index over the flights table
+
+        Built on first use and rebuilt after flight writes in this process
+        (add_flight, set_capacity, bulk import) or ROUTE_INDEX_TTL seconds.
+        """
+        with self._route_index_lock:
+            generation = self.catalog_generation("flights")
+            current = self._route_index
+            if (current is None or current[0] != generation
+                    or time.monotonic() - current[1] > ROUTE_INDEX_TTL):
+                with self.get_connection() as conn:
+                    rows = conn.execute(f'SELECT {FLIGHT_COLUMNS} FROM flights')
+                    index = RouteIndex(dict(row) for row in rows)
+                current = self._route_index = (generation, time.monotonic(), index)
+            return current[2]
+
+    @timed_query
+    def search_itineraries(self, departure_airport: str, arrival_airport: str,
+                           departure_date: str = None, max_stops: int = DEFAULT_MAX_STOPS,
+                           sort: str = "fastest", limit: int = 5, **constraints) -> List[Dict]:
+        """
+        Find direct and connecting itineraries between two airports
+
+        Args:
+            departure_airport: Origin airport code
+            arrival_airport: Destination airport code
+            departure_date: First departure on or after this date/time (YYYY-MM-DD[ HH:MM:SS]);
+                None searches from the first flight out of the origin
+            max_stops: Most connections allowed
+            sort: "fastest" or "fewest_stops"
+            limit: Most itineraries returned
+            constraints: min_layover, max_layover, latest, max_duration (see RouteIndex.search)
+
+        Returns:
+            Itinerary dicts (legs, stops, layovers, total minutes), best first
+        """
+        return self.get_route_index().search(
+            departure_airport.upper(), arrival_airport.upper(), earliest=departure_date or None,
+            max_stops=max_stops, sort=sort, limit=limit, **constraints
+        )
+
+    @cached_query("hotels")
+    @timed_query
     def get_all_hotels(self) -> List[Dict]:
         """Get all hotels"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
 
-        cursor.execute('SELECT hotel_id, name, location, price_per_night FROM hotels')
-        rows = cursor.fetchall()
-        conn.close()
+            cursor.execute('SELECT hotel_id, name, location, price_per_night FROM hotels')
+            rows = cursor.fetchall()
 
         return [dict(row) for row in rows]
 
+    @cached_query("flights")
+    @timed_query
+    def get_airport_codes(self) -> List[str]:
+        """Get every airport code that appears as a departure or arrival"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            # Both halves are answered from the airport indexes
+            cursor.execute('''
+                SELECT departure_airport FROM flights
+                UNION
+                SELECT arrival_airport FROM flights
+            ''')
+            rows = cursor.fetchall()
+
+        return [row[0] for row in rows]
+
+    @cached_query("hotels")
+    @timed_query
+    def get_hotel_locations(self) -> List[str]:
+        """Get every distinct hotel location"""
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('SELECT DISTINCT location FROM hotels ORDER BY location')
+            rows = cursor.fetchall()
+
+        return [row[0] for row in rows]
+
+
+# Shared database instance, opened on first use so importing this module touches no files
+_db = None
+_db_lock = threading.Lock()
+
+
+def get_db() -> BookingDatabase:
+    """The shared BookingDatabase, created (and migrated) on first call"""
+    global _db
+    if _db is None:
+        with _db_lock:
+            if _db is None:
+                _db = BookingDatabase()
+                # Close pooled connections cleanly on interpreter shutdown
+                atexit.register(_db.close)
+    return _db
+
+
+class LazyDatabase:
+    """Stand-in for the shared instance that opens it on first use"""
+
+    def __getattr__(self, name):
+        method = getattr(BookingDatabase, name, None)
+        if _db is None and callable(method):
+            # Looking a method up (e.g. when LangChain inspects a node) must not open the database
+            @functools.wraps(method)
+            def call(*args, **kwargs):
+                return getattr(get_db(), name)(*args, **kwargs)
+            return call
+        return getattr(get_db(), name)
 
-# Initialize database instance
-db = BookingDatabase()
+    @property
+    def initialized(self) -> bool:
+        """Whether the shared instance has been created yet"""
+        return _db is not None
+
+
+db = LazyDatabase()
+
+# Pool and catalog cache counters, read when /api/metrics is scraped (empty until first use)
+metrics.gauge("db_pool_connections", "Pooled booking database connections by state",
+              lambda: {(state,): _db.pool.get_stats()[state] for state in ("open", "idle", "waits")}
+              if _db else {},
+              labels=("state",))
+metrics.gauge("db_write_queue", "Group-commit writer counters and current queue depth",
+              lambda: {(key,): value for key, value in _db.write_queue.get_stats().items()}
+              if _db and _db.write_queue else {},
+              labels=("stat",))
+metrics.gauge("catalog_cache_events", "Catalog read cache counters",
+              lambda: {(event,): value for event, value in _db.cache.get_stats().items()
+                       if event != "max_entries"} if _db and _db.cache else {},
+              labels=("event",))
 
 
 # ==================== Helper Functions for Easy Access ====================
@@ -464,6 +1325,10 @@ def add_customer(customer_id: str, flight_id: str = None, hotel_id: str = None)
     """Add a new customer"""
     return db.add_customer(customer_id, flight_id, hotel_id)
 
+def register_customer(customer_id: str, flight_id: str = None, hotel_id: str = None) -> Dict:
+    """Add a new customer with their initial bookings; returns the outcome"""
+    return db.register_customer(customer_id, flight_id, hotel_id)
+
 def add_flight_to_customer(customer_id: str, flight_id: str) -> bool:
     """Add flight to customer"""
     return db.add_flight_to_customer(customer_id, flight_id)
@@ -472,26 +1337,89 @@ def add_hotel_to_customer(customer_id: str, hotel_id: str) -> bool:
     """Add hotel to customer"""
     return db.add_hotel_to_customer(customer_id, hotel_id)
 
+def reserve_flight(customer_id: str, flight_id: str) -> Dict:
+    """Book a seat on a flight; returns the booking status"""
+    return db.reserve_flight(customer_id, flight_id)
+
+def reserve_hotel(customer_id: str, hotel_id: str) -> Dict:
+    """Book a room in a hotel; returns the booking status"""
+    return db.reserve_hotel(customer_id, hotel_id)
+
+async def areserve_flight(customer_id: str, flight_id: str) -> Dict:
+    """Book a seat on a flight from async code; returns the booking status"""
+    return await db.areserve_flight(customer_id, flight_id)
+
+async def areserve_hotel(customer_id: str, hotel_id: str) -> Dict:
+    """Book a room in a hotel from async code; returns the booking status"""
+    return await db.areserve_hotel(customer_id, hotel_id)
+
+def cancel_booking(customer_id: str, kind: str, item_id: str) -> bool:
+    """Cancel a confirmed flight or hotel booking"""
+    return db.cancel_booking(customer_id, kind, item_id)
+
+def search_hotels(query: str, limit: int = 10) -> List[Dict]:
+    """Typo-tolerant search of hotel names and locations"""
+    return db.search_hotels(query, limit)
+
+def query_itinerary(customer_id: str) -> List[Dict]:
+    """Query a customer's confirmed bookings with flight and hotel details"""
+    return db.get_itinerary(customer_id)
+
 def query_flight(flight_id: str) -> Optional[Dict]:
     """Query flight by ID"""
     return db.query_flight_by_id(flight_id)
 
-def query_flights_departure(departure_airport: str) -> List[Dict]:
+def query_flights_by_ids(flight_ids: List[str]) -> List[Dict]:
+    """Query many flights by ID"""
+    return db.get_flights_by_ids(flight_ids)
+
+def query_flights_departure(departure_airport: str, sort: str = None, limit: int = None,
+                            offset: int = 0) -> List[Dict]:
     """Query flights by departure location"""
-    return db.query_flights_by_departure(departure_airport)
+    return db.query_flights_by_departure(departure_airport, sort=sort, limit=limit, offset=offset)
 
-def query_flights_arrival(arrival_airport: str) -> List[Dict]:
+def query_flights_arrival(arrival_airport: str, sort: str = None, limit: int = None,
+                          offset: int = 0) -> List[Dict]:
     """Query flights by arrival location"""
-    return db.query_flights_by_arrival(arrival_airport)
+    return db.query_flights_by_arrival(arrival_airport, sort=sort, limit=limit, offset=offset)
 
-def query_flights_date_location(departure_airport: str, departure_date: str) -> List[Dict]:
+def query_flights_date_location(departure_airport: str, departure_date: str, sort: str = None,
+                                limit: int = None, offset: int = 0) -> List[Dict]:
     """Query flights by departure date and location"""
-    return db.query_flights_by_departure_date_location(departure_airport, departure_date)
-
-def query_hotels_location(location: str) -> List[Dict]:
+    return db.query_flights_by_departure_date_location(departure_airport, departure_date,
+                                                       sort=sort, limit=limit, offset=offset)
+
+def browse_flights(departure_airport: str = None, arrival_airport: str = None, departure_date: str = None,
+                   sort: str = "departure_time", limit: int = CATALOG_PAGE_SIZE, offset: int = 0) -> Dict:
+    """One page of matching flights plus the total count"""
+    return db.page_flights(departure_airport, arrival_airport, departure_date,
+                           sort=sort, limit=limit, offset=offset)
+
+def search_itineraries(departure_airport: str, arrival_airport: str, departure_date: str = None,
+                       max_stops: int = DEFAULT_MAX_STOPS, sort: str = "fastest") -> List[Dict]:
+    """Find direct and connecting itineraries between two airports"""
+    return db.search_itineraries(departure_airport, arrival_airport, departure_date, max_stops, sort)
+
+def query_hotel(hotel_id: str) -> Optional[Dict]:
+    """Query hotel by ID"""
+    return db.query_hotel_by_id(hotel_id)
+
+def query_hotels_by_ids(hotel_ids: List[str]) -> List[Dict]:
+    """Query many hotels by ID"""
+    return db.get_hotels_by_ids(hotel_ids)
+
+def query_hotels_location(location: str, sort: str = None, limit: int = None,
+                          offset: int = 0) -> List[Dict]:
     """Query hotels by location"""
-    return db.query_hotels_by_location(location)
+    return db.query_hotels_by_location(location, sort=sort, limit=limit, offset=offset)
 
-def query_hotels_location_price(location: str, min_price: float, max_price: float) -> List[Dict]:
+def query_hotels_location_price(location: str, min_price: float, max_price: float, sort: str = None,
+                                limit: int = None, offset: int = 0) -> List[Dict]:
     """Query hotels by location and price range"""
-    return db.query_hotels_by_location_price_range(location, min_price, max_price)
\ No newline at end of file
+    return db.query_hotels_by_location_price_range(location, min_price, max_price,
+                                                   sort=sort, limit=limit, offset=offset)
+
+def browse_hotels(location: str = None, min_price: float = None, max_price: float = None,
+                  sort: str = "price", limit: int = CATALOG_PAGE_SIZE, offset: int = 0) -> Dict:
+    """One page of matching hotels plus the total count"""
+    return db.page_hotels(location, min_price, max_price, sort=sort, limit=limit, offset=offset)
\ No newline at end of file
@@ -0,0 +1,76 @@
+"""
+Typo-tolerant hotel search by name and location
+
+Candidates come from the hotels_fts trigram index (see
+migrations.create_hotel_search_index). The MATCH expression ORs together
+every trigram of the search terms, so "chicgo" still reaches "Chicago"
+through the trigrams the two share, and bm25 puts the hotels sharing the
+most (and rarest) trigrams first. The candidates are then re-ranked here:
+each term is compared with the words of the hotel's name and location,
+and a hotel scores the summed similarity of the terms that match one of
+them closely enough. Without the index the same ranking runs over every
+hotel.
+"""
+
+import re
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List
+
+# Words that say nothing about which hotel is wanted ("hotels in ...", "find me a ...")
+SEARCH_STOPWORDS = frozenset("""
+    a an and any are at available book by can cheap find for from get have hotel hotels i in is
+    list me motel my near of on options place places please room rooms show some stay staying
+    the there to what where with would want need looking like
+""".split())
+
+# Similarity (difflib ratio) a term needs against one word of a hotel to count as a match
+MIN_TERM_SIMILARITY = 0.75
+
+# Candidates fetched from the index before re-ranking
+SEARCH_CANDIDATES = 200
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def search_terms(query: str) -> List[str]:
+    """Lowercase words of the query worth matching (3+ characters, not stopwords), in order"""
+    words = WORD_PATTERN.findall((query or "").lower())
+    return list(dict.fromkeys(word for word in words if len(word) >= 3 and word not in SEARCH_STOPWORDS))
+
+
+def match_expression(terms: Iterable[str]) -> str:
+    """FTS5 query matching any trigram of any term"""
+    trigrams = dict.fromkeys(term[i:i + 3] for term in terms for i in range(len(term) - 2))
+    return " OR ".join(f'"{trigram}"' for trigram in trigrams)
+
+
+def _term_score(matcher: SequenceMatcher, words: List[str]) -> float:
+    """Best similarity of the matcher's term (its seq2) to one of the words, or 0 below the threshold"""
+    best = 0.0
+    for word in words:
+        matcher.set_seq1(word)
+        # The quick ratios are upper bounds of ratio(); most words are rejected by them
+        if matcher.real_quick_ratio() >= MIN_TERM_SIMILARITY and matcher.quick_ratio() >= MIN_TERM_SIMILARITY:
+            best = max(best, matcher.ratio())
+    return best if best >= MIN_TERM_SIMILARITY else 0.0
+
+
+def rank_hotels(terms: List[str], candidates: Iterable[Dict], limit: int) -> List[Dict]:
+    """
+    Score candidates against the terms and return the best, highest score first
+
+    Returns:
+        Hotel dicts with an added "score": matched terms' similarity summed and
+        divided by the number of terms (1.0 = every term matched exactly)
+    """
+    # SequenceMatcher caches its analysis of seq2, so each term keeps one matcher
+    matchers = [SequenceMatcher(None, "", term, autojunk=False) for term in terms]
+    ranked = []
+    for position, hotel in enumerate(candidates):
+        words = WORD_PATTERN.findall(f"{hotel['name']} {hotel['location']}".lower())
+        score = sum(_term_score(matcher, words) for matcher in matchers) / len(terms)
+        if score > 0:
+            # Ties keep the index's bm25 order
+            ranked.append((-score, position, {**hotel, "score": round(score, 3)}))
+    ranked.sort(key=lambda entry: entry[:2])
+    return [hotel for _, _, hotel in ranked[:limit]]
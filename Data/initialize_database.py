@@ -1,14 +1,19 @@
 """
 Script to initialize the database with all data
-Run this once to set up the database with flights, hotels, and customers
+Run this to set up the database with flights, hotels, and customers.
+
+An existing database is upgraded in place (pending schema migrations are
+applied and missing records are added). Pass --rebuild to delete it and
+start from scratch.
 """
 
 import os
 import sys
 
-# Delete old database if it exists
 db_path = os.path.join(os.path.dirname(__file__), "booking_system.db")
-if os.path.exists(db_path):
+
+# Delete old database only when a full rebuild is requested
+if "--rebuild" in sys.argv and os.path.exists(db_path):
     print("Removing old database...")
     os.remove(db_path)
     # Also remove WAL files if they exist
@@ -17,9 +22,11 @@ if os.path.exists(db_path):
         if os.path.exists(wal_file):
             os.remove(wal_file)
 
-# Import database module (this will create tables)
+# Import database module (this will create tables and apply migrations)
 from database import db
 
+print(f"Database schema version: {db.get_schema_version()}")
+
 # Load flights and hotels
 print("\nInitializing database with flight and hotel data...")
 result = db.load_initial_data()
@@ -34,5 +41,5 @@ print("Database initialization complete!")
 print(f"{'='*60}")
 print(f"Total flights: {len(db.get_all_flights())}")
 print(f"Total hotels: {len(db.get_all_hotels())}")
-print(f"Total customers: {customer_count}")
+print(f"Customers loaded: {customer_count}")
 print(f"{'='*60}\n")
@@ -0,0 +1,229 @@
+"""
+In-process latency histograms and counters, rendered in Prometheus text format
+
+One registry (`metrics`) is shared by the database layer, the graph nodes and
+the LLM wrapper; the servers expose it at /api/metrics. Recording is a
+bucket search and an increment under a lock, cheap enough for every query.
+Set METRICS_ENABLED=0 to turn recording off.
+"""
+
+import bisect
+import functools
+import inspect
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Tuple
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# Seconds; spans sub-millisecond cached SQLite reads to multi-second LLM calls
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    """Render {name="value",...} with Prometheus escaping"""
+    parts = []
+    for name, value in zip(names, values):
+        escaped = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{escaped}"')
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = (),
+                 buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label values -> [bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str):
+        """Record one observation for the given label values"""
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *label_values: str):
+        """Observe the wall time of a with-block (also when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *label_values)
+
+    def get_stats(self) -> Dict[Tuple[str, ...], Dict]:
+        """Count, sum and mean per label values"""
+        with self._lock:
+            snapshot = {key: list(series) for key, series in self._series.items()}
+        stats = {}
+        for key, series in snapshot.items():
+            count = sum(series[:-1])
+            stats[key] = {"count": count, "sum": series[-1],
+                          "mean": series[-1] / count if count else 0.0}
+        return stats
+
+    def render(self) -> str:
+        with self._lock:
+            snapshot = sorted((key, list(series)) for key, series in self._series.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in snapshot:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_label_text(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {series[-1]!r}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, key)} {cumulative}")
+        return "\n".join(lines)
+
+
+class Counter:
+    """Monotonic counter keyed by label values"""
+
+    def __init__(self, name: str, help_text: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values: str, amount: float = 1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def get(self, *label_values: str) -> float:
+        """Current value for one set of label values (0 if never incremented)"""
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def render(self) -> str:
+        with self._lock:
+            snapshot = sorted(self._values.items())
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in snapshot:
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class Gauge:
+    """Value read from a callback at scrape time (pool sizes, cache entries, ...)"""
+
+    def __init__(self, name: str, help_text: str, read: Callable[[], Dict[Tuple[str, ...], float]],
+                 labels: Iterable[str] = ()):
+        """
+        Args:
+            read: Returns {label values: value}; use {(): value} without labels
+        """
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self.read = read
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        try:
+            values = self.read()
+        except Exception:
+            values = {}
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_label_text(self.labels, key)} {_format_value(value)}")
+        return "\n".join(lines)
+
+
+class MetricsRegistry:
+    """Named metrics rendered together; registering a name twice returns the first one"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, name: str, factory):
+        with self._lock:
+            if name not in self._metrics:
+                self._metrics[name] = factory()
+            return self._metrics[name]
+
+    def histogram(self, name: str, help_text: str, labels: Iterable[str] = (),
+                  buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(name, lambda: Histogram(name, help_text, labels, buckets))
+
+    def counter(self, name: str, help_text: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(name, lambda: Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, read: Callable, labels: Iterable[str] = ()) -> Gauge:
+        """Register (or replace) a callback gauge"""
+        with self._lock:
+            self._metrics[name] = Gauge(name, help_text, read, labels)
+            return self._metrics[name]
+
+    def get(self, name: str):
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+metrics = MetricsRegistry()
+
+# Shared series recorded by the database layer, graph nodes and LLM wrapper
+DB_QUERY_SECONDS = metrics.histogram(
+    "db_query_seconds", "BookingDatabase query wall time (catalog cache misses only), including pool waits",
+    labels=("method",))
+DB_POOL_WAIT_SECONDS = metrics.histogram(
+    "db_pool_wait_seconds", "Time spent waiting for a free pooled connection, by database file",
+    labels=("database",))
+GRAPH_NODE_SECONDS = metrics.histogram(
+    "graph_node_seconds", "Graph node wall time, including its LLM calls", labels=("node",))
+LLM_CALL_SECONDS = metrics.histogram(
+    "llm_call_seconds", "LLM call wall time by calling node and cache result", labels=("node", "cache"))
+LLM_TOKENS = metrics.counter(
+    "llm_tokens_total", "Tokens reported by the model by calling node", labels=("node", "kind"))
+BOOKINGS = metrics.counter(
+    "bookings_total", "Booking attempts by item type and outcome", labels=("kind", "status"))
+DB_BUSY_RETRIES = metrics.counter(
+    "db_busy_retries_total", "Write transactions retried after SQLITE_BUSY", labels=("operation",))
+
+
+def timed_query(method):
+    """Decorator for BookingDatabase methods (sync or async) recording db_query_seconds{method}"""
+    name = method.__name__
+
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(*args, **kwargs):
+            with DB_QUERY_SECONDS.time(name):
+                return await method(*args, **kwargs)
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with DB_QUERY_SECONDS.time(name):
+            return method(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,279 @@
+"""
+Versioned schema migrations for the booking database
+
+Each migration is applied once, in order, inside its own transaction and
+recorded in the schema_migrations table. Running migrate() on an up-to-date
+database is a no-op, so it is safe to call on every startup.
+
+A migration step is an SQL statement, or a function of the connection for
+steps that depend on what the SQLite build supports.
+"""
+
+import sqlite3
+from datetime import datetime
+from typing import List
+
+# Capacity given to flights and hotels that are inserted without one
+DEFAULT_FLIGHT_SEATS = 180
+DEFAULT_HOTEL_ROOMS = 50
+
+
+def fts5_trigram_available(conn: sqlite3.Connection) -> bool:
+    """Whether this SQLite build has FTS5 with the trigram tokenizer (SQLite 3.34+)"""
+    try:
+        conn.execute("CREATE VIRTUAL TABLE temp.fts5_probe USING fts5(text, tokenize='trigram')")
+        conn.execute('DROP TABLE temp.fts5_probe')
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def create_hotel_search_index(conn: sqlite3.Connection) -> bool:
+    """
+    Create (or refill) the hotels_fts trigram index and the triggers that maintain it
+
+    Rows share the hotel's rowid, so the triggers find them without a scan.
+    Runs inside the caller's transaction.
+
+    Returns:
+        False if FTS5 / the trigram tokenizer is unavailable (search then scans hotels)
+    """
+    if not fts5_trigram_available(conn):
+        return False
+    conn.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS hotels_fts
+        USING fts5(name, location, hotel_id UNINDEXED, tokenize='trigram')
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_fts_insert AFTER INSERT ON hotels
+        BEGIN
+            INSERT INTO hotels_fts (rowid, name, location, hotel_id)
+            VALUES (NEW.rowid, NEW.name, NEW.location, NEW.hotel_id);
+        END
+    ''')
+    # Upserts that leave name and location alone do not touch the index
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_fts_update AFTER UPDATE OF name, location ON hotels
+        WHEN OLD.name IS NOT NEW.name OR OLD.location IS NOT NEW.location
+        BEGIN
+            DELETE FROM hotels_fts WHERE rowid = OLD.rowid;
+            INSERT INTO hotels_fts (rowid, name, location, hotel_id)
+            VALUES (NEW.rowid, NEW.name, NEW.location, NEW.hotel_id);
+        END
+    ''')
+    conn.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_fts_delete AFTER DELETE ON hotels
+        BEGIN
+            DELETE FROM hotels_fts WHERE rowid = OLD.rowid;
+        END
+    ''')
+    conn.execute('DELETE FROM hotels_fts')
+    conn.execute('''
+        INSERT INTO hotels_fts (rowid, name, location, hotel_id)
+        SELECT rowid, name, location, hotel_id FROM hotels
+    ''')
+    return True
+
+
+# (version, description, steps) - append new migrations, never edit applied ones
+MIGRATIONS = [
+    (1, "Create customers, flights and hotels tables", [
+        '''
+        CREATE TABLE IF NOT EXISTS customers (
+            customer_id TEXT PRIMARY KEY,
+            flight_id TEXT,
+            hotel_id TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS flights (
+            flight_id TEXT PRIMARY KEY,
+            departure_airport TEXT NOT NULL,
+            arrival_airport TEXT NOT NULL,
+            departure_time TEXT NOT NULL,
+            arrival_time TEXT NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS hotels (
+            hotel_id TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            location TEXT NOT NULL,
+            price_per_night REAL NOT NULL
+        )
+        ''',
+    ]),
+    (2, "Add secondary indexes for airport and location lookups", [
+        # Covering indexes: airport lookups are answered from the index alone
+        '''
+        CREATE INDEX IF NOT EXISTS idx_flights_departure
+        ON flights (departure_airport, departure_time, flight_id, arrival_airport, arrival_time)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_flights_arrival
+        ON flights (arrival_airport, arrival_time, flight_id, departure_airport, departure_time)
+        ''',
+        # NOCASE collation lets "location = ? COLLATE NOCASE" use the index;
+        # location-only lookups use its leading column
+        '''
+        CREATE INDEX IF NOT EXISTS idx_hotels_location_price
+        ON hotels (location COLLATE NOCASE, price_per_night)
+        ''',
+    ]),
+    (3, "Add seat and room inventory", [
+        # The CHECK constraints are the last line of defence against overbooking
+        '''
+        CREATE TABLE IF NOT EXISTS flight_inventory (
+            flight_id TEXT PRIMARY KEY REFERENCES flights (flight_id),
+            seats_total INTEGER NOT NULL CHECK (seats_total >= 0),
+            seats_available INTEGER NOT NULL CHECK (seats_available BETWEEN 0 AND seats_total)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS hotel_inventory (
+            hotel_id TEXT PRIMARY KEY REFERENCES hotels (hotel_id),
+            rooms_total INTEGER NOT NULL CHECK (rooms_total >= 0),
+            rooms_available INTEGER NOT NULL CHECK (rooms_available BETWEEN 0 AND rooms_total)
+        )
+        ''',
+        f'''
+        INSERT OR IGNORE INTO flight_inventory (flight_id, seats_total, seats_available)
+        SELECT flight_id, {DEFAULT_FLIGHT_SEATS}, {DEFAULT_FLIGHT_SEATS} FROM flights
+        ''',
+        f'''
+        INSERT OR IGNORE INTO hotel_inventory (hotel_id, rooms_total, rooms_available)
+        SELECT hotel_id, {DEFAULT_HOTEL_ROOMS}, {DEFAULT_HOTEL_ROOMS} FROM hotels
+        ''',
+        # Existing bookings already hold a seat / room
+        '''
+        UPDATE flight_inventory SET seats_available = MAX(0, seats_available - (
+            SELECT COUNT(*) FROM customers WHERE customers.flight_id = flight_inventory.flight_id))
+        ''',
+        '''
+        UPDATE hotel_inventory SET rooms_available = MAX(0, rooms_available - (
+            SELECT COUNT(*) FROM customers WHERE customers.hotel_id = hotel_inventory.hotel_id))
+        ''',
+        # Every insert path (add_flight, bulk import) gets an inventory row
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_flights_inventory AFTER INSERT ON flights
+        BEGIN
+            INSERT OR IGNORE INTO flight_inventory (flight_id, seats_total, seats_available)
+            VALUES (NEW.flight_id, {DEFAULT_FLIGHT_SEATS}, {DEFAULT_FLIGHT_SEATS});
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS trg_hotels_inventory AFTER INSERT ON hotels
+        BEGIN
+            INSERT OR IGNORE INTO hotel_inventory (hotel_id, rooms_total, rooms_available)
+            VALUES (NEW.hotel_id, {DEFAULT_HOTEL_ROOMS}, {DEFAULT_HOTEL_ROOMS});
+        END
+        ''',
+    ]),
+    (4, "Move bookings into their own table", [
+        # customers.flight_id / hotel_id stay as the customer's latest booking of each kind
+        '''
+        CREATE TABLE IF NOT EXISTS bookings (
+            booking_id INTEGER PRIMARY KEY,
+            customer_id TEXT NOT NULL REFERENCES customers (customer_id),
+            item_type TEXT NOT NULL CHECK (item_type IN ('flight', 'hotel')),
+            item_id TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'confirmed' CHECK (status IN ('confirmed', 'cancelled')),
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        ''',
+        # A customer's bookings by status, in booking order (the rowid is the index's last key)
+        '''
+        CREATE INDEX IF NOT EXISTS idx_bookings_customer
+        ON bookings (customer_id, status)
+        ''',
+        '''
+        CREATE INDEX IF NOT EXISTS idx_bookings_item
+        ON bookings (item_type, item_id, status, customer_id)
+        ''',
+        # At most one confirmed booking per customer and item
+        '''
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_bookings_confirmed
+        ON bookings (customer_id, item_type, item_id) WHERE status = 'confirmed'
+        ''',
+        '''
+        INSERT INTO bookings (customer_id, item_type, item_id, created_at, updated_at)
+        SELECT customer_id, 'flight', flight_id, datetime('now', 'localtime'), datetime('now', 'localtime')
+        FROM customers WHERE flight_id IS NOT NULL AND flight_id != ''
+        ''',
+        '''
+        INSERT INTO bookings (customer_id, item_type, item_id, created_at, updated_at)
+        SELECT customer_id, 'hotel', hotel_id, datetime('now', 'localtime'), datetime('now', 'localtime')
+        FROM customers WHERE hotel_id IS NOT NULL AND hotel_id != ''
+        ''',
+    ]),
+    (5, "Add trigram full-text index over hotel names and locations", [
+        create_hotel_search_index,
+    ]),
+]
+
+
+def _ensure_version_table(conn: sqlite3.Connection):
+    """Create the table that records applied migrations"""
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT NOT NULL,
+            applied_at TEXT NOT NULL
+        )
+    ''')
+    conn.commit()
+
+
+def get_schema_version(conn: sqlite3.Connection) -> int:
+    """Return the highest applied migration version (0 for a fresh database)"""
+    _ensure_version_table(conn)
+    row = conn.execute('SELECT MAX(version) FROM schema_migrations').fetchone()
+    return row[0] or 0
+
+
+def migrate(conn: sqlite3.Connection, target_version: int = None) -> List[int]:
+    """
+    Apply all pending migrations up to target_version
+
+    Args:
+        conn: Open database connection
+        target_version: Stop after this version (default: latest)
+
+    Returns:
+        List of migration versions applied by this call
+    """
+    _ensure_version_table(conn)
+    applied = []
+
+    for version, description, steps in sorted(MIGRATIONS, key=lambda m: m[0]):
+        if target_version is not None and version > target_version:
+            break
+
+        # IMMEDIATE takes the write lock up front so concurrent workers
+        # starting at the same time apply each migration exactly once
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            row = conn.execute(
+                'SELECT 1 FROM schema_migrations WHERE version = ?', (version,)
+            ).fetchone()
+            if row:
+                conn.rollback()
+                continue
+
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(step)
+            conn.execute(
+                'INSERT INTO schema_migrations (version, description, applied_at) VALUES (?, ?, ?)',
+                (version, description, datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+            )
+            conn.commit()
+            applied.append(version)
+        except Exception:
+            conn.rollback()
+            raise
+
+    return applied
@@ -0,0 +1,205 @@
+"""
+Multi-leg itinerary search over the flights table
+
+RouteIndex keeps every flight grouped by departure airport and sorted by
+departure time, so the flights leaving an airport inside a layover window
+are found with a binary search instead of a SQL scan. search() walks this
+time-expanded graph best-first: partial itineraries are expanded in order
+of elapsed time ("fastest") or of stops and then elapsed time
+("fewest_stops"), so the first complete itineraries popped are the best
+ones. A flight is expanded at most `limit` times for each number of stops
+taken to reach it: those are the best paths into it, and no more can be
+needed for the best `limit` itineraries through it. That bounds the work by
+the flights reachable inside the search window rather than by the number
+of paths.
+"""
+
+import bisect
+import heapq
+from datetime import datetime
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+# Layover bounds in minutes
+DEFAULT_MIN_LAYOVER = 45
+DEFAULT_MAX_LAYOVER = 6 * 60
+
+DEFAULT_MAX_STOPS = 2
+
+# First legs considered when no latest departure is given, in minutes after the earliest
+DEFAULT_DEPARTURE_WINDOW = 24 * 60
+
+# Itineraries longer than this (first departure to last arrival, minutes) are not explored
+DEFAULT_MAX_DURATION = 36 * 60
+
+SORT_ORDERS = ("fastest", "fewest_stops")
+
+
+class Leg(NamedTuple):
+    """One flight in the index; times are minutes since 0001-01-01"""
+    departs: int
+    arrives: int
+    arrival_airport: str
+    flight_id: str
+    departure_airport: str
+    departure_time: str
+    arrival_time: str
+
+
+def to_minutes(value) -> int:
+    """Minutes since 0001-01-01 for a "YYYY-MM-DD HH:MM:SS" string or datetime"""
+    if not isinstance(value, datetime):
+        value = datetime.fromisoformat(str(value))
+    return value.toordinal() * 1440 + value.hour * 60 + value.minute
+
+
+class RouteIndex:
+    """Flights grouped by departure airport and sorted by departure time"""
+
+    def __init__(self, flights: Iterable[Dict]):
+        """
+        Args:
+            flights: Rows with flight_id, departure_airport, arrival_airport,
+                departure_time and arrival_time
+        """
+        by_airport = {}
+        skipped = 0
+        for flight in flights:
+            try:
+                departs = to_minutes(flight["departure_time"])
+                arrives = to_minutes(flight["arrival_time"])
+            except (TypeError, ValueError):
+                skipped += 1
+                continue
+            if arrives < departs or flight["departure_airport"] == flight["arrival_airport"]:
+                skipped += 1
+                continue
+            by_airport.setdefault(flight["departure_airport"], []).append(Leg(
+                departs, arrives, flight["arrival_airport"], flight["flight_id"],
+                flight["departure_airport"], str(flight["departure_time"]), str(flight["arrival_time"])
+            ))
+
+        self._legs = {}
+        self._departures = {}
+        self._pair_legs = {}  # (from, to) -> legs; the last hop of a search only needs these
+        for airport, legs in by_airport.items():
+            legs.sort()
+            self._legs[airport] = legs
+            self._departures[airport] = [leg.departs for leg in legs]
+            for leg in legs:
+                self._pair_legs.setdefault((airport, leg.arrival_airport), []).append(leg)
+        self._pair_departures = {pair: [leg.departs for leg in legs] for pair, legs in self._pair_legs.items()}
+
+        self.flight_count = sum(len(legs) for legs in self._legs.values())
+        self.skipped = skipped
+
+    def departures(self, airport: str, start: int, end: int, to: str = None) -> List[Leg]:
+        """Flights leaving an airport (for one destination if `to` is given) with start <= departure <= end"""
+        if to is None:
+            times, legs = self._departures.get(airport), self._legs.get(airport)
+        else:
+            times, legs = self._pair_departures.get((airport, to)), self._pair_legs.get((airport, to))
+        if not times:
+            return []
+        lo = bisect.bisect_left(times, start)
+        hi = bisect.bisect_right(times, end)
+        return legs[lo:hi]
+
+    def first_departure(self, airport: str) -> Optional[int]:
+        times = self._departures.get(airport)
+        return times[0] if times else None
+
+    def search(self, origin: str, destination: str, earliest=None, latest=None,
+               max_stops: int = DEFAULT_MAX_STOPS, min_layover: int = DEFAULT_MIN_LAYOVER,
+               max_layover: int = DEFAULT_MAX_LAYOVER, max_duration: int = DEFAULT_MAX_DURATION,
+               sort: str = "fastest", limit: int = 5) -> List[Dict]:
+        """
+        Find itineraries from origin to destination
+
+        Args:
+            origin: Departure airport code
+            destination: Arrival airport code
+            earliest: Earliest first departure (datetime or "YYYY-MM-DD[ HH:MM:SS]");
+                defaults to the first flight out of origin
+            latest: Latest first departure; defaults to DEFAULT_DEPARTURE_WINDOW after earliest
+            max_stops: Most connections allowed (0 = direct flights only)
+            min_layover: Minimum minutes between arriving and the next departure
+            max_layover: Maximum minutes between arriving and the next departure
+            max_duration: Longest itinerary explored, first departure to last arrival (minutes)
+            sort: "fastest" (shortest total time) or "fewest_stops" (then shortest time)
+            limit: Most itineraries returned
+
+        Returns:
+            Itinerary dicts, best first
+
+        Raises:
+            ValueError: If sort is not one of SORT_ORDERS
+        """
+        if sort not in SORT_ORDERS:
+            raise ValueError(f"sort must be one of {SORT_ORDERS}")
+        if origin == destination or limit < 1:
+            return []
+
+        start = to_minutes(earliest) if earliest is not None else self.first_departure(origin)
+        if start is None:
+            return []
+        end = to_minutes(latest) if latest is not None else start + DEFAULT_DEPARTURE_WINDOW
+
+        fewest_stops = sort == "fewest_stops"
+        heap = []
+        sequence = 0  # tie-breaker so paths are never compared
+        for leg in self.departures(origin, start, end):
+            elapsed = leg.arrives - leg.departs
+            if elapsed <= max_duration:
+                heap.append(((0, elapsed) if fewest_stops else (elapsed, 0), sequence, (leg,)))
+                sequence += 1
+        heapq.heapify(heap)
+
+        results = []
+        expanded = {}  # (leg, stops) -> paths expanded from it so far
+        while heap and len(results) < limit:
+            _, _, path = heapq.heappop(heap)
+            leg = path[-1]
+            stops = len(path) - 1
+            if leg.arrival_airport == destination:
+                results.append(_itinerary(path))
+                continue
+            if stops >= max_stops or expanded.get((leg, stops), 0) >= limit:
+                continue
+            expanded[(leg, stops)] = expanded.get((leg, stops), 0) + 1
+
+            first_departure = path[0].departs
+            visited = {origin, *(step.arrival_airport for step in path)}
+            # The last allowed hop can only be useful if it lands at the destination
+            to = destination if stops + 1 == max_stops else None
+            for nxt in self.departures(leg.arrival_airport, leg.arrives + min_layover, leg.arrives + max_layover, to):
+                elapsed = nxt.arrives - first_departure
+                if nxt.arrival_airport in visited or elapsed > max_duration:
+                    continue
+                # Paths popped earlier were no worse, so a flight expanded `limit` times is done
+                if expanded.get((nxt, stops + 1), 0) >= limit:
+                    continue
+                key = (stops + 1, elapsed) if fewest_stops else (elapsed, stops + 1)
+                heapq.heappush(heap, (key, sequence, path + (nxt,)))
+                sequence += 1
+
+        return results
+
+
+def _itinerary(path) -> Dict:
+    """Public dict form of a path of legs"""
+    return {
+        "departure_airport": path[0].departure_airport,
+        "arrival_airport": path[-1].arrival_airport,
+        "departure_time": path[0].departure_time,
+        "arrival_time": path[-1].arrival_time,
+        "stops": len(path) - 1,
+        "total_minutes": path[-1].arrives - path[0].departs,
+        "layover_minutes": [nxt.departs - prev.arrives for prev, nxt in zip(path, path[1:])],
+        "legs": [{
+            "flight_id": leg.flight_id,
+            "departure_airport": leg.departure_airport,
+            "arrival_airport": leg.arrival_airport,
+            "departure_time": leg.departure_time,
+            "arrival_time": leg.arrival_time,
+        } for leg in path],
+    }
@@ -12,8 +12,20 @@ from database import (
     query_flights_date_location,
     query_hotels_location,
     query_hotels_location_price,
+    query_hotel,
+    query_flights_by_ids,
+    query_hotels_by_ids,
+    query_itinerary,
+    BookingDatabase,
     db
 )
+from bulk_import import import_records
+from write_queue import WriteQueue
+import asyncio
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 
 def print_section(title):
@@ -23,6 +35,17 @@ def print_section(title):
     print("=" * 60)
 
 
+@contextmanager
+def temporary_database(name, **kwargs):
+    """An empty BookingDatabase in a temporary directory, so test rows stay out of the shipped one"""
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_db = BookingDatabase(os.path.join(tmp, name), group_commit=False, **kwargs)
+        try:
+            yield tmp_db
+        finally:
+            tmp_db.close()
+
+
 def test_customer_functions():
     """Test customer-related functions"""
     print_section("Testing Customer Functions")
@@ -89,26 +112,290 @@ def test_flight_queries():
     for flight in flights:
         print(f"   - {flight['flight_id']}: Departs at {flight['departure_time']}")
 
+    # Query several flights in one round trip
+    print("\n5. Query flights 'FLIGHT456', 'FLIGHT123' and 'NOPE' by ID...")
+    flights = query_flights_by_ids(["FLIGHT456", "FLIGHT123", "NOPE"])
+    print(f"   Found {len(flights)} flight(s): {[f['flight_id'] for f in flights]}")
+
 
 def test_hotel_queries():
     """Test hotel query functions"""
     print_section("Testing Hotel Query Functions")
 
+    # Query hotel by ID
+    print("\n1. Query hotel by ID 'HOTEL456'...")
+    hotel = query_hotel("HOTEL456")
+    if hotel:
+        print(f"   {hotel['hotel_id']}: {hotel['name']} in {hotel['location']}")
+    else:
+        print("   Hotel not found")
+    hotels = query_hotels_by_ids(["HOTEL123", "HOTEL456"])
+    print(f"   Batched lookup found {len(hotels)} hotel(s)")
+
     # Query hotels by location
-    print("\n1. Query all hotels in 'New York'...")
+    print("\n2. Query all hotels in 'New York'...")
     hotels = query_hotels_location("New York")
     print(f"   Found {len(hotels)} hotel(s):")
     for hotel in hotels:
         print(f"   - {hotel['hotel_id']}: {hotel['name']} - ${hotel['price_per_night']}/night")
 
     # Query hotels by location and price range
-    print("\n2. Query hotels in 'New York' with price range $240-$250...")
+    print("\n3. Query hotels in 'New York' with price range $240-$250...")
     hotels = query_hotels_location_price("New York", 240.0, 250.0)
     print(f"   Found {len(hotels)} hotel(s):")
     for hotel in hotels:
         print(f"   - {hotel['hotel_id']}: {hotel['name']} - ${hotel['price_per_night']}/night")
 
 
+def test_connection_pool():
+    """Test that queries reuse pooled connections"""
+    print_section("Testing Connection Pool")
+
+    before = db.pool.get_stats()
+    for _ in range(10):
+        db.get_customer("CUST999")
+    after = db.pool.get_stats()
+
+    print(f"\n1. Ran 10 queries, opened {after['created'] - before['created']} new connection(s)")
+    print(f"   Pool stats: {after}")
+    assert after["open"] <= db.pool.pool_size
+    assert after["reused"] - before["reused"] >= 9
+
+
+def test_bulk_import():
+    """Test chunked upsert import with validation"""
+    print_section("Testing Bulk Import")
+
+    rows = [
+        {"hotel_id": "HOTEL900", "name": "Import Inn", "location": "Boston", "price_per_night": "120"},
+        {"hotel_id": "HOTEL901", "name": "Import Lodge", "location": "Boston", "price_per_night": "95.5"},
+        {"hotel_id": "HOTEL902", "name": "Bad Price", "location": "Boston", "price_per_night": "cheap"},
+    ]
+    report = import_records(db, "hotels", rows, chunk_size=2)
+    print(f"\n1. First import: {report['rows_written']} written, {report['rows_invalid']} invalid")
+    assert report["rows_invalid"] == 1
+
+    report = import_records(db, "hotels", rows[:2])
+    print(f"2. Re-import: {report['rows_written']} written, {report['rows_unchanged']} unchanged")
+    assert report["rows_written"] == 0
+
+
+def test_catalog_cache():
+    """Test cached catalog reads and invalidation on write"""
+    print_section("Testing Catalog Cache")
+
+    db.invalidate_cache()
+    before = db.cache.get_stats()
+    query_hotels_location("Boston")
+    hotels = query_hotels_location("Boston")
+    after = db.cache.get_stats()
+    print(f"\n1. Repeated query: {after['hits'] - before['hits']} hit(s), {after['misses'] - before['misses']} miss(es)")
+    assert after["hits"] - before["hits"] == 1
+
+    db.add_hotel("HOTEL903", "Cache Buster", "Boston", 80.0)
+    refreshed = query_hotels_location("Boston")
+    print(f"2. After add_hotel: {len(hotels)} -> {len(refreshed)} hotel(s) in Boston")
+    assert any(h["hotel_id"] == "HOTEL903" for h in refreshed)
+
+    # Mutating a cached page (and its rows) must not change later hits
+    page = db.page_hotels("Boston")
+    page["items"][0]["name"] = "Mutated"
+    page["items"].clear()
+    again = db.page_hotels("Boston")
+    print(f"3. Cached page after a caller mutated its copy: {len(again['items'])} item(s)")
+    assert again["items"] and all(h["name"] != "Mutated" for h in again["items"])
+
+
+def test_pagination():
+    """Test sorted pages with a total count"""
+    print_section("Testing Pagination")
+
+    with temporary_database("pagination.db") as tmp_db:
+        for i in range(5):
+            tmp_db.add_hotel(f"HOTEL96{i}", f"Page Hotel {i}", "Pagetown", 100.0 + 10 * (4 - i))
+
+        first = tmp_db.page_hotels("pagetown", limit=2)
+        print(f"\n1. Page 1: {[h['hotel_id'] for h in first['items']]} of {first['total']}")
+        assert first["total"] == 5 and first["next_offset"] == 2
+        assert [h["price_per_night"] for h in first["items"]] == [100.0, 110.0]
+
+        last = tmp_db.page_hotels("Pagetown", limit=2, offset=4, sort="price_desc")
+        print(f"2. Last page (price_desc): {[h['hotel_id'] for h in last['items']]}")
+        assert last["next_offset"] is None and last["items"][0]["price_per_night"] == 100.0
+
+        top = tmp_db.query_hotels_by_location("Pagetown", sort="name", limit=3)
+        print(f"3. Top 3 by name: {[h['name'] for h in top]}")
+        assert len(top) == 3 and top[0]["name"] == "Page Hotel 0"
+
+
+def test_inventory():
+    """Test seat inventory and concurrent bookings of the last seats"""
+    print_section("Testing Inventory")
+
+    with temporary_database("inventory.db") as tmp_db:
+        full, other = "FLIGHT970", "FLIGHT971"
+        tmp_db.add_flight(full, "BOS", "MIA", "2030-02-01 09:00:00", "2030-02-01 12:30:00", seats=3)
+        tmp_db.add_flight(other, "BOS", "MIA", "2030-02-01 15:00:00", "2030-02-01 18:30:00", seats=3)
+        customers = [f"CUST97{i}" for i in range(10)]
+        for customer_id in customers:
+            tmp_db.add_customer(customer_id)
+
+        with ThreadPoolExecutor(max_workers=10) as pool:
+            results = list(pool.map(lambda c: tmp_db.reserve_flight(c, full)["status"], customers))
+        print(f"\n1. 10 customers racing for 3 seats: {results.count('booked')} booked, {results.count('sold_out')} sold out")
+        assert results.count("booked") == 3 and results.count("sold_out") == 7
+        assert tmp_db.get_flight_inventory(full)["seats_available"] == 0
+
+        holder = customers[results.index("booked")]
+        assert tmp_db.reserve_flight(holder, full)["status"] == "already_booked"
+        assert tmp_db.cancel_booking(holder, "flight", full)
+        print(f"2. {holder} cancelled: {full} has {tmp_db.get_flight_inventory(full)['seats_available']} seat(s) again")
+        assert tmp_db.get_flight_inventory(full)["seats_available"] == 1
+        assert not tmp_db.cancel_booking(holder, "flight", full)
+        assert tmp_db.reserve_flight(holder, "NOPE")["status"] == "unknown_item"
+
+        # A new customer is only created together with every initial booking
+        assert tmp_db.reserve_flight(holder, full)["status"] == "booked"
+        newcomer = "CUST960"
+        outcome = tmp_db.register_customer(newcomer, full)
+        print(f"3. New customer on sold-out {full}: {outcome['status']} ({outcome['bookings']['flight']['status']})")
+        assert outcome["status"] == "booking_failed" and outcome["bookings"]["flight"]["status"] == "sold_out"
+        assert not tmp_db.add_customer(newcomer, other, "HOTELNOPE")
+        assert tmp_db.get_customer(newcomer) is None
+        assert tmp_db.get_flight_inventory(other)["seats_available"] == 3
+        assert tmp_db.add_customer(newcomer, other)
+        assert tmp_db.get_customer(newcomer)["flight_id"] == other
+        assert tmp_db.get_flight_inventory(other)["seats_available"] == 2
+        assert tmp_db.register_customer(newcomer)["status"] == "customer_exists"
+
+
+def test_booking_history():
+    """Test that bookings accumulate per customer and come back as one itinerary"""
+    print_section("Testing Booking History")
+
+    with temporary_database("history.db") as tmp_db:
+        first, second, hotel = "FLIGHT980", "FLIGHT981", "HOTEL980"
+        tmp_db.add_flight(first, "BOS", "ORD", "2030-03-01 08:00:00", "2030-03-01 10:00:00")
+        tmp_db.add_flight(second, "ORD", "BOS", "2030-03-05 18:00:00", "2030-03-05 21:00:00")
+        tmp_db.add_hotel(hotel, "Lakeside Inn", "Chicago", 140.0)
+        customer_id = "CUST980"
+        tmp_db.add_customer(customer_id, first)
+        assert tmp_db.add_flight_to_customer(customer_id, second)
+        assert tmp_db.add_hotel_to_customer(customer_id, hotel)
+
+        itinerary = tmp_db.get_itinerary(customer_id)
+        print(f"\n1. {customer_id} itinerary: {[(b['item_type'], b['item_id']) for b in itinerary]}")
+        assert [b["item_id"] for b in itinerary] == [first, second, hotel]
+        assert itinerary[1]["departure_airport"] == "ORD"
+        assert itinerary[2]["name"] == "Lakeside Inn"
+        assert tmp_db.get_item_bookings("flight", second) == [customer_id]
+
+        # The customer's flight_id is the latest booking, and falls back when that one is cancelled
+        assert tmp_db.get_customer(customer_id)["flight_id"] == second
+        assert tmp_db.cancel_booking(customer_id, "flight", second)
+        assert tmp_db.get_customer(customer_id)["flight_id"] == first
+        history = tmp_db.get_bookings(customer_id, include_cancelled=True)
+        print(f"2. After cancelling {second}: {[(b['item_id'], b['status']) for b in history]}")
+        assert [b["status"] for b in history] == ["confirmed", "cancelled", "confirmed"]
+        assert len(tmp_db.get_bookings(customer_id)) == 2
+
+
+def test_hotel_search():
+    """Test typo-tolerant hotel search by name and location"""
+    print_section("Testing Hotel Search")
+
+    with temporary_database("hotel_search.db") as tmp_db:
+        tmp_db.load_initial_data()
+        tmp_db.add_hotel("HOTEL990", "Harbour View Lodge", "Reykjavik", 210.0)
+
+        # Misspelled city and name both find the new hotel, ranked first
+        for query in ("hotels in reykjavk", "harbor veiw lodge"):
+            results = tmp_db.search_hotels(query)
+            print(f"\n{query!r} -> {[(h['hotel_id'], h['score']) for h in results[:3]]}")
+            assert results and results[0]["location"] == "Reykjavik"
+        assert {h["location"] for h in tmp_db.search_hotels("chicgo")} == {"Chicago"}
+        assert tmp_db.search_hotels("show me hotels") == []
+
+        # The scan used without FTS5 ranks the same way
+        tmp_db.hotel_search_indexed = False
+        assert tmp_db.search_hotels("hotels in reykjavk", limit=1)[0]["location"] == "Reykjavik"
+
+
+def test_group_commit():
+    """Test that a failing unit in a write batch leaves the rest of the batch committed"""
+    print_section("Testing Group Commit")
+
+    with temporary_database("group_commit.db") as tmp_db:
+        customers = [f"CUST96{i}" for i in range(5)]
+        writer = WriteQueue(tmp_db.get_connection, window=0.05)
+
+        def insert(customer_id):
+            def work(conn):
+                conn.execute('INSERT INTO customers (customer_id) VALUES (?)', (customer_id,))
+                if customer_id == customers[2]:
+                    raise ValueError("rejected")
+                return customer_id
+            return work
+
+        futures = [writer.submit(insert(customer_id)) for customer_id in customers]
+        errors = [future.exception() for future in futures]
+        stats = writer.get_stats()
+        writer.close()
+        print(f"\n1. 5 writes in {stats['batches']} batch(es), {stats['failed_units']} rolled back")
+        assert stats["batches"] == 1 and stats["failed_units"] == 1
+        assert isinstance(errors[2], ValueError)
+        assert [tmp_db.get_customer(c) is not None for c in customers] == [True, True, False, True, True]
+
+        # Async callers await the same writer instead of blocking on it
+        customer_id, flight_id = "CUST940", "FLIGHT940"
+        writer = WriteQueue(tmp_db.get_connection)
+        committed = asyncio.run(writer.run_async(insert(customer_id)))
+        writer.close()
+        tmp_db.add_flight(flight_id, "BOS", "ORD", "2030-04-01 08:00:00", "2030-04-01 10:00:00", seats=1)
+        booking = asyncio.run(tmp_db.areserve_flight(customer_id, flight_id))
+        print(f"2. Awaited writes: {committed} inserted, {flight_id} {booking['status']}")
+        assert tmp_db.get_customer(committed)["flight_id"] == flight_id
+        assert booking["status"] == "booked" and tmp_db.get_flight_inventory(flight_id)["seats_available"] == 0
+
+
+def test_itinerary_search():
+    """Test direct and connecting itinerary search"""
+    print_section("Testing Itinerary Search")
+
+    # Without a catalog cache, so new flights must reach the route index by the write count alone
+    with temporary_database("routes.db", pool_size=1, cache_size=0) as tmp_db:
+        tmp_db.add_flight("FLIGHT950", "BOS", "DEN", "2030-01-05 08:00:00", "2030-01-05 11:00:00")
+        tmp_db.add_flight("FLIGHT951", "DEN", "SEA", "2030-01-05 12:30:00", "2030-01-05 14:30:00")
+        tmp_db.add_flight("FLIGHT952", "DEN", "SEA", "2030-01-05 11:15:00", "2030-01-05 13:00:00")
+        tmp_db.add_flight("FLIGHT953", "BOS", "SEA", "2030-01-05 07:00:00", "2030-01-05 16:00:00")
+
+        itineraries = tmp_db.search_itineraries("BOS", "SEA", "2030-01-05")
+        print(f"\n1. BOS -> SEA: {[[leg['flight_id'] for leg in i['legs']] for i in itineraries]}")
+        # FLIGHT952 leaves before the minimum layover, so the fastest trip connects to FLIGHT951
+        assert [leg["flight_id"] for leg in itineraries[0]["legs"]] == ["FLIGHT950", "FLIGHT951"]
+        assert itineraries[0]["layover_minutes"] == [90]
+
+        direct = tmp_db.search_itineraries("BOS", "SEA", "2030-01-05", sort="fewest_stops")
+        print(f"2. Fewest stops first: {direct[0]['stops']} stop(s) via {direct[0]['legs'][0]['flight_id']}")
+        assert direct[0]["stops"] == 0
+        assert tmp_db.search_itineraries("BOS", "SEA", "2030-01-05", max_stops=0)[0]["stops"] == 0
+
+        # A flight added after the index was built shows up without waiting for ROUTE_INDEX_TTL
+        tmp_db.add_flight("FLIGHT954", "BOS", "SEA", "2030-01-05 06:00:00", "2030-01-05 09:00:00")
+        fastest = tmp_db.search_itineraries("BOS", "SEA", "2030-01-05")
+        print(f"3. After add_flight without a cache: fastest is {fastest[0]['legs'][0]['flight_id']}")
+        assert fastest[0]["legs"][0]["flight_id"] == "FLIGHT954"
+
+        # Both morning flights to DEN connect to FLIGHT957, the slower one as the second-best trip
+        tmp_db.add_flight("FLIGHT955", "BOS", "DEN", "2030-01-06 06:00:00", "2030-01-06 09:00:00")
+        tmp_db.add_flight("FLIGHT956", "BOS", "DEN", "2030-01-06 07:00:00", "2030-01-06 09:30:00")
+        tmp_db.add_flight("FLIGHT957", "DEN", "SEA", "2030-01-06 11:00:00", "2030-01-06 13:00:00")
+        shared = tmp_db.search_itineraries("BOS", "SEA", "2030-01-06")
+        print(f"4. Trips sharing a connection: {[[leg['flight_id'] for leg in i['legs']] for i in shared]}")
+        assert [[leg["flight_id"] for leg in i["legs"]] for i in shared] == [
+            ["FLIGHT956", "FLIGHT957"], ["FLIGHT955", "FLIGHT957"]]
+
+
 def show_all_data():
     """Show all data in the database"""
     print_section("Database Contents")
@@ -136,6 +423,15 @@ if __name__ == "__main__":
     test_customer_functions()
     test_flight_queries()
     test_hotel_queries()
+    test_connection_pool()
+    test_bulk_import()
+    test_catalog_cache()
+    test_pagination()
+    test_inventory()
+    test_booking_history()
+    test_hotel_search()
+    test_group_commit()
+    test_itinerary_search()
 
     print("\n" + "=" * 60)
     print("  All tests completed!")
@@ -0,0 +1,209 @@
+"""
+Group commit for BookingDatabase write transactions
+
+Under WAL every COMMIT pays for a sync, and only one connection at a time
+can hold SQLite's write lock. WriteQueue funnels write transactions from
+all request threads through one writer thread: callers submit a unit of
+work (a function of the connection) and get a Future back. The writer
+takes the first queued unit, collects whatever else arrives within
+`window` seconds (up to `max_batch` units) and runs them all in a single
+BEGIN IMMEDIATE transaction, so one commit covers the whole batch.
+
+Each unit runs inside its own SAVEPOINT: a unit that raises is rolled back
+on its own and its Future gets the exception, while the rest of the batch
+commits. Futures are resolved only after the COMMIT succeeds, so a caller
+holding a result knows its write is durable. If the transaction itself
+fails with SQLITE_BUSY (another process holds the lock past the busy
+timeout), the whole batch is rolled back and run again.
+"""
+
+import asyncio
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, NamedTuple
+
+try:
+    from .metrics import metrics, DB_BUSY_RETRIES
+except ImportError:
+    from metrics import metrics, DB_BUSY_RETRIES
+
+WRITE_BATCH_SIZE = metrics.histogram(
+    "db_write_batch_size", "Write transactions committed together by the group-commit writer",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+
+
+def is_busy(error: sqlite3.OperationalError) -> bool:
+    """True for SQLITE_BUSY / "database is locked" errors, which are worth retrying"""
+    code = getattr(error, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(error).lower()
+    return "locked" in message or "busy" in message
+
+
+class _Unit(NamedTuple):
+    work: Callable
+    future: Future
+
+
+class WriteQueue:
+    """Single writer thread committing queued write transactions in batches"""
+
+    def __init__(self, connection: Callable, window: float = 0.001, max_batch: int = 256,
+                 max_retries: int = 5, retry_backoff: float = 0.005):
+        """
+        The writer thread is started on the first submit.
+
+        Args:
+            connection: Returns a connection context manager (BookingDatabase.get_connection)
+            window: Seconds to wait for more work once a batch has its first unit
+            max_batch: Most units committed in one transaction
+            max_retries: Times a batch is re-run after SQLITE_BUSY
+            retry_backoff: Base of the jittered exponential backoff between re-runs (seconds)
+        """
+        if max_batch < 1:
+            raise ValueError("max_batch must be at least 1")
+        self._connection = connection
+        self.window = window
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+        self.stats = {"units": 0, "batches": 0, "failed_units": 0, "busy_retries": 0}
+
+    # ==================== Callers ====================
+
+    def submit(self, work: Callable) -> Future:
+        """
+        Queue work(conn) for the next batch
+
+        Returns:
+            Future resolved with work's return value after the batch commits,
+            or with its exception
+
+        Raises:
+            RuntimeError: If the queue has been closed
+        """
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Write queue is closed")
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="booking-db-writer", daemon=True)
+                self._thread.start()
+            self._queue.put(_Unit(work, future))
+        return future
+
+    def run(self, work: Callable):
+        """Submit work and wait for its committed result (re-raises its exception)"""
+        return self.submit(work).result()
+
+    async def run_async(self, work: Callable):
+        """Submit work and await its committed result without blocking the event loop"""
+        return await asyncio.wrap_future(self.submit(work))
+
+    def close(self, timeout: float = 5.0):
+        """Commit what is already queued, then stop the writer thread"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def get_stats(self) -> dict:
+        """Snapshot of writer counters plus the current queue depth"""
+        with self._lock:
+            return {**self.stats, "queued": self._queue.qsize()}
+
+    # ==================== Writer Thread ====================
+
+    def _run(self):
+        while True:
+            batch, stop = self._collect()
+            if batch:
+                self._commit(batch)
+            if stop:
+                return
+
+    def _collect(self):
+        """Block for the first unit, then gather more until the window closes or the batch is full"""
+        first = self._queue.get()
+        if first is None:
+            return [], True
+        batch = [first]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            try:
+                unit = self._queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                break
+            if unit is None:
+                return batch, True
+            batch.append(unit)
+        return batch, False
+
+    def _commit(self, batch: List[_Unit]):
+        """Run a batch in one transaction (re-running it on SQLITE_BUSY) and resolve its futures"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                outcomes = self._execute(batch)
+                break
+            except sqlite3.OperationalError as e:
+                if is_busy(e) and attempt < self.max_retries:
+                    with self._lock:
+                        self.stats["busy_retries"] += 1
+                    DB_BUSY_RETRIES.inc("write_batch")
+                    time.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+                    continue
+                outcomes = [(False, e)] * len(batch)
+                break
+            except Exception as e:
+                outcomes = [(False, e)] * len(batch)
+                break
+
+        WRITE_BATCH_SIZE.observe(len(batch))
+        failed = 0
+        for unit, (ok, value) in zip(batch, outcomes):
+            if ok:
+                unit.future.set_result(value)
+            else:
+                failed += 1
+                unit.future.set_exception(value)
+        with self._lock:
+            self.stats["units"] += len(batch)
+            self.stats["batches"] += 1
+            self.stats["failed_units"] += failed
+
+    def _execute(self, batch: List[_Unit]) -> list:
+        """One BEGIN IMMEDIATE ... COMMIT around the batch; returns (ok, value) per unit"""
+        outcomes = []
+        with self._connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                for unit in batch:
+                    conn.execute('SAVEPOINT unit')
+                    try:
+                        value = unit.work(conn)
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO unit')
+                        conn.execute('RELEASE unit')
+                        outcomes.append((False, e))
+                    else:
+                        conn.execute('RELEASE unit')
+                        outcomes.append((True, value))
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        return outcomes
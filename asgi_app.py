@@ -0,0 +1,269 @@
+"""
+Async (ASGI) server for the booking agent.
+
+Exposes the same endpoints and JSON payloads as flask_app.py, but drives the
+graph with ainvoke, so a single process can hold many conversations that are
+waiting on the LLM without one OS thread each.
+
+Run with:
+    uvicorn asgi_app:app --host 0.0.0.0 --port 5000
+"""
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from langchain_core.messages import HumanMessage
+import sys
+import os
+
+# Add Airline_Agent to path
+sys.path.append(os.path.join(os.path.dirname(__file__), 'Airline_Agent'))
+
+from utils.state import get_initial_state, get_support_graph, get_turn_response, warm_up
+from utils.session_store import AsyncSessionLocks, create_session_store
+from utils.streaming import astream_turn, replay_turn, sse_event
+from utils.batching import arun_batch, parse_batch_request
+from Data.metrics import metrics
+
+# Session states: in-process LRU by default, SESSION_STORE=sqlite to share them between workers
+sessions = create_session_store()
+# Turns of one session run one at a time; different sessions run in parallel
+session_locks = AsyncSessionLocks()
+
+# Session and lock counters, read when /api/metrics is scraped
+metrics.gauge("chat_sessions", "Sessions held by the session store",
+              lambda: {(): sessions.get_stats()["sessions"]})
+metrics.gauge("session_lock_events", "Per-session turn lock counters",
+              lambda: {(event,): value for event, value in session_locks.get_stats().items()},
+              labels=("event",))
+
+
+def get_idempotency_key(request, data):
+    """Client-chosen key identifying a message, so retries are not run twice."""
+    return data.get('idempotency_key') or request.headers.get('Idempotency-Key')
+
+
+async def start_session(request):
+    """Start a new conversation session."""
+    try:
+        data = await request.json()
+        session_id = data.get('session_id', 'default')
+
+        # Initialize new session state
+        await run_in_threadpool(sessions.save, session_id, get_initial_state())
+
+        return JSONResponse({
+            'status': 'success',
+            'message': 'Session started successfully',
+            'session_id': session_id
+        })
+    except Exception as e:
+        return JSONResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status_code=500)
+
+
+async def end_session(request):
+    """End a conversation session."""
+    try:
+        data = await request.json()
+        session_id = data.get('session_id', 'default')
+
+        # Clear session state
+        await run_in_threadpool(sessions.delete, session_id)
+
+        return JSONResponse({
+            'status': 'success',
+            'message': 'Session ended successfully'
+        })
+    except Exception as e:
+        return JSONResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status_code=500)
+
+
+async def chat(request):
+    """Process a chat message."""
+    try:
+        data = await request.json()
+        user_message = data.get('message', '')
+        session_id = data.get('session_id', 'default')
+        idempotency_key = get_idempotency_key(request, data)
+
+        async with session_locks.hold(session_id):
+            # A retry of a message that was already answered gets the same answer
+            if idempotency_key:
+                cached = await run_in_threadpool(sessions.get_response, session_id, idempotency_key)
+                if cached:
+                    return JSONResponse(cached)
+
+            # Get or create session state (the store may be SQLite, so it is read off the event loop)
+            state = await run_in_threadpool(sessions.get, session_id) or get_initial_state()
+
+            # Add user message to state
+            state = {
+                **state,
+                "messages": state["messages"] + [HumanMessage(content=user_message)],
+                "intent": "",
+                "next": ""
+            }
+
+            # Invoke the agent; the event loop serves other requests while the LLM works
+            result = await get_support_graph().ainvoke(state)
+            response = {'status': 'success', **get_turn_response(result)}
+            await run_in_threadpool(sessions.save, session_id, result, idempotency_key=idempotency_key,
+                                    response=response)
+
+        return JSONResponse(response)
+    except Exception as e:
+        print(f"[ERROR] Exception in chat: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return JSONResponse({
+            'status': 'error',
+            'message': f'Error processing message: {str(e)}'
+        }, status_code=500)
+
+
+async def chat_stream(request):
+    """Process a chat message, streaming progress and the answer as server-sent events."""
+    data = await request.json()
+    user_message = data.get('message', '')
+    session_id = data.get('session_id', 'default')
+    idempotency_key = get_idempotency_key(request, data)
+
+    def save(result):
+        response = {'status': 'success', **get_turn_response(result)}
+        sessions.save(session_id, result, idempotency_key=idempotency_key, response=response)
+
+    async def events():
+        # The session stays locked until the stream finishes (or the client disconnects)
+        async with session_locks.hold(session_id):
+            cached = (await run_in_threadpool(sessions.get_response, session_id, idempotency_key)
+                      if idempotency_key else None)
+            if cached:
+                for event, payload in replay_turn(cached):
+                    yield sse_event(event, payload)
+                return
+
+            # Get or create session state
+            state = await run_in_threadpool(sessions.get, session_id) or get_initial_state()
+            state = {
+                **state,
+                "messages": state["messages"] + [HumanMessage(content=user_message)],
+                "intent": "",
+                "next": ""
+            }
+            async for event, payload in astream_turn(get_support_graph(), state, on_complete=save):
+                yield sse_event(event, payload)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+async def chat_batch(request):
+    """Process many (session_id, message) items concurrently, returning a result per item."""
+    try:
+        items, max_concurrency = parse_batch_request(await request.json())
+    except ValueError as e:
+        return JSONResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status_code=400)
+
+    try:
+        results = await arun_batch(get_support_graph(), sessions, session_locks, items, max_concurrency)
+        failed = sum(1 for result in results if result['status'] != 'success')
+        return JSONResponse({
+            'status': 'success',
+            'results': results,
+            'succeeded': len(results) - failed,
+            'failed': failed
+        })
+    except Exception as e:
+        print(f"[ERROR] Exception in chat batch: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return JSONResponse({
+            'status': 'error',
+            'message': f'Error processing batch: {str(e)}'
+        }, status_code=500)
+
+
+async def get_state(request):
+    """Get current session state."""
+    try:
+        data = await request.json()
+        session_id = data.get('session_id', 'default')
+
+        state = await run_in_threadpool(sessions.get, session_id)
+        if state is None:
+            return JSONResponse({
+                'status': 'error',
+                'message': 'Session not found'
+            }, status_code=404)
+
+        return JSONResponse({
+            'status': 'success',
+            'customer_id': state.get('customer_id', ''),
+            'intent': state.get('intent', ''),
+            'resolution_status': state.get('resolution_status', 'pending')
+        })
+    except Exception as e:
+        return JSONResponse({
+            'status': 'error',
+            'message': str(e)
+        }, status_code=500)
+
+
+async def health(request):
+    """Health check endpoint."""
+    return JSONResponse({
+        'status': 'healthy',
+        'service': 'Airline & Hotel Booking Agent API',
+        'sessions': await run_in_threadpool(sessions.get_stats)
+    })
+
+
+async def metrics_endpoint(request):
+    """Latency histograms and counters in Prometheus text format."""
+    # Rendering reads the session store's counters
+    return PlainTextResponse(await run_in_threadpool(metrics.render), media_type='text/plain; version=0.0.4')
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Build the database, LLM client and graph before serving (WARM_UP=0 leaves them to first use)."""
+    if os.getenv('WARM_UP', '1') == '1':
+        await run_in_threadpool(warm_up)
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route('/api/start_session', start_session, methods=['POST']),
+        Route('/api/end_session', end_session, methods=['POST']),
+        Route('/api/chat', chat, methods=['POST']),
+        Route('/api/chat/stream', chat_stream, methods=['POST']),
+        Route('/api/chat/batch', chat_batch, methods=['POST']),
+        Route('/api/get_state', get_state, methods=['POST']),
+        Route('/api/health', health, methods=['GET']),
+        Route('/api/metrics', metrics_endpoint, methods=['GET']),
+    ],
+    middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+    lifespan=lifespan,
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("Starting Airline & Hotel Booking Agent API (ASGI)...")
+    print("API will be available at http://localhost:5000")
+    uvicorn.run(app, host='0.0.0.0', port=5000)
@@ -1,37 +1,45 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 from langchain_core.messages import HumanMessage
+import logging
 import sys
 import os
 
 # Add Airline_Agent to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'Airline_Agent'))
 
-from utils.state import create_support_graph
+from utils.state import get_initial_state, get_support_graph, get_turn_response, warm_up
+from utils.session_store import SessionLocks, create_session_store
+from utils.streaming import replay_turn, sse_event, stream_turn
+from utils.batching import parse_batch_request, run_batch
+from Data.metrics import metrics
 
 app = Flask(__name__)
 CORS(app)
 
-# Initialize the agent graph
-agent_graph = create_support_graph()
+logger = logging.getLogger(__name__)
 
-# Store session states (in production, use Redis or database)
-sessions = {}
+# Session states: in-process LRU by default, SESSION_STORE=sqlite to share them between workers
+sessions = create_session_store()
+# Turns of one session run one at a time; different sessions run in parallel
+session_locks = SessionLocks()
 
+# Session and lock counters, read when /api/metrics is scraped
+metrics.gauge("chat_sessions", "Sessions held by the session store",
+              lambda: {(): sessions.get_stats()["sessions"]})
+metrics.gauge("session_lock_events", "Per-session turn lock counters",
+              lambda: {(event,): value for event, value in session_locks.get_stats().items()},
+              labels=("event",))
 
-def get_initial_state():
-    """Create initial state for a new session."""
-    return {
-        "messages": [],
-        "customer_id": "",
-        "ticket_id": "",
-        "hotel_id": "",
-        "intent": "",
-        "tools": [],
-        "issue_type": "",
-        "resolution_status": "pending",
-        "next": ""
-    }
+# The database, LLM client and graph are created on first use; build them now so the
+# first request does not pay for it (WARM_UP=0 skips this, e.g. for quick imports)
+if os.getenv('WARM_UP', '1') == '1':
+    warm_up()
+
+
+def get_idempotency_key(data):
+    """Client-chosen key identifying a message, so retries are not run twice."""
+    return data.get('idempotency_key') or request.headers.get('Idempotency-Key')
 
 
 @app.route('/api/start_session', methods=['POST'])
@@ -42,7 +50,7 @@ def start_session():
         session_id = data.get('session_id', 'default')
 
         # Initialize new session state
-        sessions[session_id] = get_initial_state()
+        sessions.save(session_id, get_initial_state())
 
         return jsonify({
             'status': 'success',
@@ -64,8 +72,7 @@ def end_session():
         session_id = data.get('session_id', 'default')
 
         # Clear session state
-        if session_id in sessions:
-            del sessions[session_id]
+        sessions.delete(session_id)
 
         return jsonify({
             'status': 'success',
@@ -85,52 +92,116 @@ def chat():
         data = request.json
         user_message = data.get('message', '')
         session_id = data.get('session_id', 'default')
+        idempotency_key = get_idempotency_key(data)
+
+        logger.debug("Received message: %s", user_message)
+        logger.debug("Session ID: %s", session_id)
+
+        with session_locks.hold(session_id):
+            # A retry of a message that was already answered gets the same answer
+            if idempotency_key:
+                cached = sessions.get_response(session_id, idempotency_key)
+                if cached:
+                    logger.debug("Replaying response for idempotency key %s", idempotency_key)
+                    return jsonify(cached)
+
+            # Get or create session state
+            state = sessions.get(session_id)
+            if state is None:
+                state = get_initial_state()
+                logger.debug("Created new session: %s", session_id)
+            logger.debug("Current state messages count: %d", len(state['messages']))
+
+            # Add user message to state (a new dict, so a failed turn leaves the stored session untouched)
+            state = {
+                **state,
+                "messages": state["messages"] + [HumanMessage(content=user_message)],
+                "intent": "",
+                "next": ""
+            }
+
+            logger.debug("Invoking agent graph...")
+            # Invoke the agent
+            result = get_support_graph().invoke(state)
+            response = {'status': 'success', **get_turn_response(result)}
+            sessions.save(session_id, result, idempotency_key=idempotency_key, response=response)
+
+        logger.debug("Agent completed. Total messages: %d", len(result['messages']))
+        logger.debug("Response: %.100s...", response['response'])
+
+        return jsonify(response)
+    except Exception as e:
+        print(f"[ERROR] Exception in chat: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'status': 'error',
+            'message': f'Error processing message: {str(e)}'
+        }), 500
 
-        print(f"\n[DEBUG] Received message: {user_message}")
-        print(f"[DEBUG] Session ID: {session_id}")
-
-        # Get or create session state
-        if session_id not in sessions:
-            sessions[session_id] = get_initial_state()
-            print(f"[DEBUG] Created new session: {session_id}")
-
-        state = sessions[session_id]
-        print(f"[DEBUG] Current state messages count: {len(state['messages'])}")
-
-        # Add user message to state
-        state["messages"].append(HumanMessage(content=user_message))
-        state["intent"] = ""
-        state["next"] = ""
-
-        print(f"[DEBUG] Invoking agent graph...")
-        # Invoke the agent
-        result = agent_graph.invoke(state)
-        sessions[session_id] = result
-
-        print(f"[DEBUG] Agent completed. Total messages: {len(result['messages'])}")
-
-        # Get the last AI message
-        last_message = result["messages"][-1]
-        if hasattr(last_message, 'content'):
-            response = last_message.content
-        else:
-            response = str(last_message)
 
-        print(f"[DEBUG] Response: {response[:100]}...")
+@app.route('/api/chat/stream', methods=['POST'])
+def chat_stream():
+    """Process a chat message, streaming progress and the answer as server-sent events."""
+    data = request.json
+    user_message = data.get('message', '')
+    session_id = data.get('session_id', 'default')
+    idempotency_key = get_idempotency_key(data)
+
+    def save(result):
+        response = {'status': 'success', **get_turn_response(result)}
+        sessions.save(session_id, result, idempotency_key=idempotency_key, response=response)
+
+    def events():
+        # The session stays locked until the stream finishes (or the client disconnects)
+        with session_locks.hold(session_id):
+            cached = sessions.get_response(session_id, idempotency_key) if idempotency_key else None
+            if cached:
+                turn = replay_turn(cached)
+            else:
+                # Get or create session state
+                state = sessions.get(session_id) or get_initial_state()
+                state = {
+                    **state,
+                    "messages": state["messages"] + [HumanMessage(content=user_message)],
+                    "intent": "",
+                    "next": ""
+                }
+                turn = stream_turn(get_support_graph(), state, on_complete=save)
+            for event, payload in turn:
+                yield sse_event(event, payload)
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/chat/batch', methods=['POST'])
+def chat_batch():
+    """Process many (session_id, message) items concurrently, returning a result per item."""
+    try:
+        items, max_concurrency = parse_batch_request(request.json)
+    except ValueError as e:
+        return jsonify({
+            'status': 'error',
+            'message': str(e)
+        }), 400
 
+    try:
+        results = run_batch(get_support_graph(), sessions, session_locks, items, max_concurrency)
+        failed = sum(1 for result in results if result['status'] != 'success')
         return jsonify({
             'status': 'success',
-            'response': response,
-            'customer_id': result.get('customer_id', ''),
-            'intent': result.get('intent', '')
+            'results': results,
+            'succeeded': len(results) - failed,
+            'failed': failed
         })
     except Exception as e:
-        print(f"[ERROR] Exception in chat: {str(e)}")
+        print(f"[ERROR] Exception in chat batch: {str(e)}")
         import traceback
         traceback.print_exc()
         return jsonify({
             'status': 'error',
-            'message': f'Error processing message: {str(e)}'
+            'message': f'Error processing batch: {str(e)}'
         }), 500
 
 
@@ -141,13 +212,13 @@ def get_state():
         data = request.json
         session_id = data.get('session_id', 'default')
 
-        if session_id not in sessions:
+        state = sessions.get(session_id)
+        if state is None:
             return jsonify({
                 'status': 'error',
                 'message': 'Session not found'
             }), 404
 
-        state = sessions[session_id]
         return jsonify({
             'status': 'success',
             'customer_id': state.get('customer_id', ''),
@@ -166,10 +237,17 @@ def health():
     """Health check endpoint."""
     return jsonify({
         'status': 'healthy',
-        'service': 'Airline & Hotel Booking Agent API'
+        'service': 'Airline & Hotel Booking Agent API',
+        'sessions': sessions.get_stats()
     })
 
 
+@app.route('/api/metrics', methods=['GET'])
+def metrics_endpoint():
+    """Latency histograms and counters in Prometheus text format."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 if __name__ == '__main__':
     print("Starting Airline & Hotel Booking Agent API...")
     print("API will be available at http://localhost:5000")
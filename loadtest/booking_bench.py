@@ -0,0 +1,184 @@
+"""
+Booking throughput benchmark under contention.
+
+Simulates a fare sale: many customers book a few "hot" flights at once,
+from several threads in each of several processes (each process has its
+own connection pool, so they contend on SQLite's write lock exactly like
+separate server workers). Reports bookings per second, latency
+percentiles, outcomes and SQLITE_BUSY retries, then checks the database
+for overbooking and exits 1 if any flight sold more seats than it has.
+
+    python -m loadtest.booking_bench --processes 4 --threads 16 --bookings 4000 --flights 2 --seats 500
+
+Bookings go through the group-commit writer (Data/write_queue.py) unless
+--no-group-commit is given, which commits every booking on its own.
+
+Runs against a throwaway database in a temporary directory.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from Data.database import BookingDatabase, BOOKED
+from Data.metrics import DB_BUSY_RETRIES
+from loadtest.load_driver import percentile
+
+
+def flight_ids(count: int) -> List[str]:
+    return [f"FLIGHTSALE{i}" for i in range(count)]
+
+
+def setup(db_path: str, flights: int, seats: int, customers: int):
+    """Create the hot flights and the customers who will race for them."""
+    db = BookingDatabase(db_path, pool_size=1, cache_size=0)
+    for flight_id in flight_ids(flights):
+        db.add_flight(flight_id, "JFK", "MIA", "2030-12-20 08:00:00", "2030-12-20 11:00:00", seats=seats)
+    with db.get_connection() as conn:
+        conn.executemany('INSERT OR IGNORE INTO customers (customer_id) VALUES (?)',
+                         [(f"SALE{i}",) for i in range(customers)])
+        conn.commit()
+    db.close()
+
+
+def worker(args) -> Dict:
+    """Book every customer in `customers` from `threads` threads; returns raw results."""
+    db_path, customers, flights, threads, seed, group_commit = args
+    db = BookingDatabase(db_path, pool_size=threads, cache_size=0, group_commit=group_commit)
+    rng = random.Random(seed)
+    targets = [(customer_id, rng.choice(flight_ids(flights))) for customer_id in customers]
+
+    def book(target):
+        started = time.perf_counter()
+        status = db.reserve_flight(*target)["status"]
+        return status, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(book, targets))
+    batches = db.write_queue.get_stats()["batches"] if db.write_queue else len(results)
+    db.close()
+    return {
+        "statuses": [status for status, _ in results],
+        "latencies": [latency for _, latency in results],
+        "busy_retries": DB_BUSY_RETRIES.get("reserve_flight") + DB_BUSY_RETRIES.get("write_batch"),
+        "commits": batches,
+    }
+
+
+def check_inventory(db_path: str, flights: int) -> List[Dict]:
+    """Seats sold per flight from both sides: the inventory counter and the confirmed bookings of it."""
+    db = BookingDatabase(db_path, pool_size=1, cache_size=0)
+    rows = []
+    with db.get_connection() as conn:
+        for flight_id in flight_ids(flights):
+            inventory = conn.execute(
+                'SELECT seats_total, seats_available FROM flight_inventory WHERE flight_id = ?', (flight_id,)
+            ).fetchone()
+            holders = conn.execute(
+                "SELECT COUNT(*) FROM bookings WHERE item_type = 'flight' AND item_id = ? AND status = 'confirmed'",
+                (flight_id,)
+            ).fetchone()[0]
+            rows.append({
+                "flight_id": flight_id,
+                "seats_total": inventory["seats_total"],
+                "seats_sold": inventory["seats_total"] - inventory["seats_available"],
+                "customers_holding": holders,
+            })
+    db.close()
+    return rows
+
+
+def run(processes: int, threads: int, bookings: int, flights: int, seats: int, seed: int = 7,
+        group_commit: bool = True) -> Dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "booking_bench.db")
+        setup(db_path, flights, seats, bookings)
+
+        customers = [f"SALE{i}" for i in range(bookings)]
+        shards = [(db_path, customers[i::processes], flights, threads, seed + i, group_commit)
+                  for i in range(processes)]
+        started = time.perf_counter()
+        if processes == 1:
+            results = [worker(shards[0])]
+        else:
+            with multiprocessing.get_context("spawn").Pool(processes) as pool:
+                results = pool.map(worker, shards)
+        elapsed = time.perf_counter() - started
+
+        inventory = check_inventory(db_path, flights)
+
+    statuses = Counter(status for result in results for status in result["statuses"])
+    latencies = [latency for result in results for latency in result["latencies"]]
+    return {
+        "processes": processes,
+        "threads_per_process": threads,
+        "group_commit": group_commit,
+        "bookings": bookings,
+        "elapsed_seconds": round(elapsed, 3),
+        "bookings_per_second": round(bookings / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {name: round(percentile(latencies, pct) * 1000, 2)
+                       for name, pct in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))},
+        "statuses": dict(statuses),
+        "busy_retries": sum(result["busy_retries"] for result in results),
+        "commits": sum(result["commits"] for result in results),
+        "inventory": inventory,
+        "overbooked": [row["flight_id"] for row in inventory
+                       if row["seats_sold"] > row["seats_total"] or row["seats_sold"] != row["customers_holding"]],
+        "booked_matches_sold": statuses.get(BOOKED, 0) == sum(row["seats_sold"] for row in inventory),
+    }
+
+
+def print_report(report: Dict):
+    print("\n" + "=" * 60)
+    print("BOOKING BENCHMARK")
+    print("=" * 60)
+    print(f"Workers:         {report['processes']} process(es) x {report['threads_per_process']} threads, "
+          f"group commit {'on' if report['group_commit'] else 'off'}")
+    print(f"Bookings:        {report['bookings']} in {report['elapsed_seconds']}s "
+          f"({report['bookings_per_second']} bookings/s)")
+    latency = report["latency_ms"]
+    print(f"Latency (ms):    p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    print(f"Outcomes:        {report['statuses']}")
+    print(f"Commits:         {report['commits']} "
+          f"({report['bookings'] / max(report['commits'], 1):.1f} bookings per commit)")
+    print(f"Busy retries:    {report['busy_retries']}")
+    for row in report["inventory"]:
+        print(f"  {row['flight_id']}: {row['seats_sold']}/{row['seats_total']} seats sold, "
+              f"{row['customers_holding']} customers holding it")
+    consistent = not report["overbooked"] and report["booked_matches_sold"]
+    print(f"Overbooking:     {'none' if consistent else 'DETECTED ' + ', '.join(report['overbooked'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent seat bookings against SQLite")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes (separate connection pools)")
+    parser.add_argument("--threads", type=int, default=16, help="Booking threads per process")
+    parser.add_argument("--bookings", type=int, default=2000, help="Booking attempts (one customer each)")
+    parser.add_argument("--flights", type=int, default=1, help="Hot flights the customers compete for")
+    parser.add_argument("--seats", type=int, default=500, help="Seats per flight")
+    parser.add_argument("--no-group-commit", dest="group_commit", action="store_false",
+                        help="Commit each booking in its own transaction instead of batching them")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this file")
+    args = parser.parse_args()
+
+    report = run(args.processes, args.threads, args.bookings, args.flights, args.seats,
+                 group_commit=args.group_commit)
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if report["overbooked"] or not report["booked_matches_sold"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
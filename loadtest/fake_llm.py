@@ -0,0 +1,328 @@
+"""
+Deterministic stand-in for ChatGroq, for load tests and offline runs.
+
+FakeChatModel answers every prompt the graph nodes send (intent detection,
+routing, orchestrators, ID extraction, responses) from scripted rules
+instead of calling a model, after sleeping for a latency drawn from a
+configurable distribution. It supports invoke/ainvoke, token streaming and
+with_structured_output, so every graph path and server endpoint works.
+
+Select it in-process with LLM_BACKEND=fake, or serve the same rules over
+HTTP with loadtest/fake_server.py. Settings (env var / constructor arg):
+    FAKE_LLM_LATENCY      latency spec (see LatencyModel.parse), default "lognormal:0.4:1.2"
+    FAKE_LLM_TOKEN_DELAY  seconds between streamed tokens, default 0.01
+    FAKE_LLM_SEED         random seed for the latency draws, default 7
+    FAKE_LLM_SCRIPT       JSON file of [{"match": regex, "response": text}] rules tried first
+"""
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+# Repository root, for the agent's ID patterns when run as a script
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from Airline_Agent.utils.entities import CUSTOMER_ID_PATTERN, FLIGHT_ID_PATTERN, HOTEL_ID_PATTERN
+
+
+# ==================== Latency ====================
+
+class LatencyModel:
+    """Random response latency in seconds, reproducible for a given seed."""
+
+    def __init__(self, kind: str = "fixed", a: float = 0.0, b: float = 0.0, seed: int = 7):
+        self.kind = kind
+        self.a = a
+        self.b = b
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec: str, seed: int = 7) -> "LatencyModel":
+        """
+        Build a model from a spec string:
+            "fixed:0.3"             always 0.3s
+            "uniform:0.1:0.8"       uniform between 0.1s and 0.8s
+            "lognormal:0.4:1.2"     lognormal with median 0.4s and p95 1.2s
+            "0" / ""                no delay
+        """
+        parts = (spec or "0").split(":")
+        if parts[0] in ("fixed", "uniform", "lognormal"):
+            kind, values = parts[0], [float(p) for p in parts[1:]]
+        else:
+            kind, values = "fixed", [float(p) for p in parts]
+        if kind == "fixed":
+            return cls("fixed", values[0] if values else 0.0, seed=seed)
+        if kind in ("uniform", "lognormal") and len(values) == 2:
+            return cls(kind, values[0], values[1], seed=seed)
+        raise ValueError(f"Invalid latency spec: {spec}")
+
+    def sample(self) -> float:
+        """Draw one latency."""
+        with self._lock:
+            if self.kind == "uniform":
+                return self._random.uniform(self.a, self.b)
+            if self.kind == "lognormal":
+                # median = exp(mu); p95 = exp(mu + 1.645 sigma)
+                mu = math.log(self.a)
+                sigma = max(math.log(self.b / self.a) / 1.645, 0.0)
+                return self._random.lognormvariate(mu, sigma)
+            return self.a
+
+
+# ==================== Scripted Responses ====================
+
+INTENT_ACTIONS = {
+    "book_flight": "book_flight",
+    "my_flight_details": "flight_details",
+    "all_flight_details": "all_flights",
+    "book_hotel": "book_hotel",
+    "my_hotel_details": "hotel_details",
+    "all_hotel_details": "all_hotels",
+}
+
+AIRPORT_CITIES = {"new york": "JFK", "los angeles": "LAX", "chicago": "ORD", "san francisco": "SFO"}
+HOTEL_CITIES = {"new york": "New York", "chicago": "Chicago", "san francisco": "San Fransisco",
+                "san fransisco": "San Fransisco"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (about four characters per token), used for usage metadata."""
+    return (len(text or "") + 3) // 4
+
+
+def last_user_text(messages: List[BaseMessage]) -> str:
+    """The latest thing the user said, whether sent as a message or rendered into a prompt."""
+    for message in reversed(messages):
+        if isinstance(message, HumanMessage):
+            # Prompts that render the conversation as "User: ..." lines
+            lines = re.findall(r"^\s*User: (.*)$", message.content, re.MULTILINE)
+            return lines[-1] if lines else message.content
+    return messages[-1].content if messages else ""
+
+
+def classify(text: str) -> str:
+    """Keyword intent classifier standing in for the intent prompt."""
+    lowered = text.lower()
+    # "Book HOTEL789" names a hotel by ID only
+    hotel = bool(re.search(r"\b(hotels?|rooms?|stay)\b", lowered) or HOTEL_ID_PATTERN.search(text))
+    flight = bool(re.search(r"\b(flights?|fly)\b", lowered) or FLIGHT_ID_PATTERN.search(text))
+    if CUSTOMER_ID_PATTERN.search(text) and not (flight or hotel or re.search(r"\bbook\b", lowered)):
+        return "set_state_variables"
+    if re.search(r"\b(book|reserve)\b", lowered):
+        return "book_hotel" if hotel else "book_flight"
+    if re.search(r"\bmy\b", lowered) and (hotel or flight):
+        return "my_hotel_details" if hotel else "my_flight_details"
+    if hotel:
+        return "all_hotel_details"
+    if flight:
+        return "all_flight_details"
+    if re.search(r"\b(help|issue|problem|complaint)\b", lowered):
+        return "customer_support_help"
+    return "disambiguation"
+
+
+def find_airport(text: str) -> str:
+    match = re.search(r"\b(JFK|LAX|ORD|SFO)\b", text, re.IGNORECASE)
+    if match:
+        return match.group(1).upper()
+    for city, code in AIRPORT_CITIES.items():
+        if city in text.lower():
+            return code
+    return "JFK"
+
+
+def find_route(text: str) -> List[str]:
+    """Airport codes named in the text, in order, without repeats."""
+    codes = [match.upper() for match in re.findall(r"\b(JFK|LAX|ORD|SFO)\b", text, re.IGNORECASE)]
+    return list(dict.fromkeys(codes))
+
+
+def flight_action(text: str) -> str:
+    """all_flights, or connections when two airports are named."""
+    return "connections" if len(find_route(text)) >= 2 else "all_flights"
+
+
+def find_city(text: str) -> str:
+    for city, name in HOTEL_CITIES.items():
+        if city in text.lower():
+            return name
+    return "New York"
+
+
+def find_id(prefix: str, text: str, default: str) -> str:
+    match = re.search(rf"\b{prefix}\d+\b", text, re.IGNORECASE)
+    return match.group(0).upper() if match else default
+
+
+def route(messages: List[BaseMessage]) -> Dict[str, Any]:
+    """Structured routing decision (RouteSchema) for the combined router."""
+    user = last_user_text(messages)
+    intent = classify(user)
+    action = INTENT_ACTIONS.get(intent, "")
+    if action == "all_flights":
+        action = flight_action(user)
+    route_airports = find_route(user)
+    return {
+        "intent": intent,
+        "action": action,
+        "customer_id": find_id("CUST", user, None),
+        "flight_id": find_id("FLIGHT", user, None),
+        "hotel_id": find_id("HOTEL", user, None),
+        "departure_airport": find_airport(user) if intent == "all_flight_details" else None,
+        "arrival_airport": route_airports[1] if action == "connections" else None,
+        "location": find_city(user) if intent == "all_hotel_details" else None,
+    }
+
+
+def default_response(messages: List[BaseMessage]) -> str:
+    """Answer a node prompt, recognised by its instruction text."""
+    prompt = "\n".join(m.content for m in messages if isinstance(m.content, str))
+    user = last_user_text(messages)
+
+    if "intent detection agent" in prompt:
+        return json.dumps({"intent": classify(user)})
+    if "Flight Booking Agent" in prompt or "Hotel Booking Agent" in prompt:
+        kind = "hotel" if "Hotel Booking Agent" in prompt else "flight"
+        action = INTENT_ACTIONS.get(classify(user), "")
+        if action == "all_flights":
+            return flight_action(user)
+        return action if kind in action else f"all_{kind}s"
+    if "Extract the customer ID" in prompt:
+        return find_id("CUST", prompt, "CUST123")
+    if "Extract the departure airport" in prompt:
+        return find_airport(prompt.split("MUST MAP")[0])
+    if "Extract the departure and arrival airports" in prompt:
+        airports = find_route(prompt.split("MUST MAP")[0])
+        return " ".join((airports + ["JFK", "LAX"])[:2])
+    if "Extract the flight ID" in prompt:
+        return find_id("FLIGHT", prompt, "FLIGHT123")
+    if "Extract the hotel ID" in prompt:
+        return find_id("HOTEL", prompt.replace("HOTELXXX", ""), "HOTEL123")
+    if "request is ambiguous" in prompt:
+        return "Could you tell me a bit more? I can help with flight and hotel bookings and details."
+    tool = re.search(r"message from the tool: (.*)", prompt, re.DOTALL)
+    if tool:
+        return "Here is what I found for you: " + " ".join(tool.group(1).split())[:300]
+    return "I can help you with flight and hotel bookings."
+
+
+def load_script(path: Optional[str]) -> List[Dict[str, Any]]:
+    """Read scripted rules ([{"match": regex, "response": text}, ...]) from a JSON file."""
+    if not path:
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+    return [{"match": re.compile(rule["match"], re.IGNORECASE | re.DOTALL), "response": rule["response"]}
+            for rule in rules]
+
+
+class FakeResponder:
+    """Shared rule engine and latency source for the in-process model and the HTTP server."""
+
+    def __init__(self, latency: str = None, token_delay: float = None, seed: int = None, script: str = None):
+        seed = int(os.getenv("FAKE_LLM_SEED", "7")) if seed is None else seed
+        self.latency = LatencyModel.parse(latency if latency is not None
+                                          else os.getenv("FAKE_LLM_LATENCY", "lognormal:0.4:1.2"), seed)
+        self.token_delay = float(os.getenv("FAKE_LLM_TOKEN_DELAY", "0.01")) if token_delay is None else token_delay
+        self.rules = load_script(script if script is not None else os.getenv("FAKE_LLM_SCRIPT"))
+
+    def respond(self, messages: List[BaseMessage]) -> str:
+        prompt = "\n".join(m.content for m in messages if isinstance(m.content, str))
+        for rule in self.rules:
+            if rule["match"].search(prompt):
+                return rule["response"]
+        return default_response(messages)
+
+    def usage(self, messages: List[BaseMessage], text: str) -> Dict[str, int]:
+        prompt_tokens = sum(estimate_tokens(m.content) for m in messages if isinstance(m.content, str))
+        completion_tokens = estimate_tokens(text)
+        return {"input_tokens": prompt_tokens, "output_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens}
+
+    @staticmethod
+    def tokens(text: str) -> List[str]:
+        """Split a response into stream chunks (words with their trailing space)."""
+        return re.findall(r"\S+\s*", text) or [text]
+
+
+# ==================== Chat Model ====================
+
+class FakeChatModel(BaseChatModel):
+    """Scripted chat model with simulated latency; a drop-in for ChatGroq in the graph."""
+
+    model_name: str = "fake-llm"
+    temperature: float = 0.7
+    responder: Any = None
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        if self.responder is None:
+            self.responder = FakeResponder()
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-llm"
+
+    def _message(self, messages, text):
+        return AIMessage(content=text, usage_metadata=self.responder.usage(messages, text),
+                         response_metadata={"model_name": self.model_name})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        time.sleep(self.responder.latency.sample())
+        text = self.responder.respond(messages)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, text))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.responder.latency.sample())
+        text = self.responder.respond(messages)
+        return ChatResult(generations=[ChatGeneration(message=self._message(messages, text))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        time.sleep(self.responder.latency.sample())
+        for token in self.responder.tokens(self.responder.respond(messages)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            time.sleep(self.responder.token_delay)
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        await asyncio.sleep(self.responder.latency.sample())
+        for token in self.responder.tokens(self.responder.respond(messages)):
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+            await asyncio.sleep(self.responder.token_delay)
+
+    def with_structured_output(self, schema, include_raw: bool = False, **kwargs):
+        """Structured output for the combined router: a RouteSchema-shaped dict."""
+        def output(messages):
+            parsed = route(messages)
+            if not include_raw:
+                return parsed
+            text = json.dumps(parsed)
+            raw = AIMessage(content=text, usage_metadata=self.responder.usage(messages, text))
+            return {"raw": raw, "parsed": parsed, "parsing_error": None}
+
+        def invoke(messages):
+            time.sleep(self.responder.latency.sample())
+            return output(messages)
+
+        async def ainvoke(messages):
+            await asyncio.sleep(self.responder.latency.sample())
+            return output(messages)
+
+        return RunnableLambda(invoke, afunc=ainvoke)
@@ -0,0 +1,170 @@
+"""
+Local HTTP server that speaks the Groq (OpenAI-compatible) chat completions API
+using the FakeResponder rules from fake_llm.py.
+
+Point the real ChatGroq client at it to exercise the full network path
+(HTTP client, connection pooling, streaming parser) without a Groq account:
+
+    python -m loadtest.fake_server --port 8765 --latency lognormal:0.4:1.2
+    GROQ_API_BASE=http://127.0.0.1:8765 GROQ_KEY=fake GROQ_MODEL=fake-llm python flask_app.py
+
+Supports plain and streamed completions, and tool calls (used by
+with_structured_output in the combined router).
+"""
+import argparse
+import json
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+try:
+    from .fake_llm import FakeResponder, route
+except ImportError:
+    from fake_llm import FakeResponder, route
+
+COMPLETIONS_PATH = "/openai/v1/chat/completions"
+
+ROLE_MESSAGES = {"system": SystemMessage, "user": HumanMessage, "assistant": AIMessage}
+
+
+def to_messages(payload_messages):
+    """Convert OpenAI-style message dicts into LangChain messages for the rule engine."""
+    messages = []
+    for message in payload_messages:
+        content = message.get("content") or ""
+        if isinstance(content, list):
+            content = " ".join(part.get("text", "") for part in content if isinstance(part, dict))
+        messages.append(ROLE_MESSAGES.get(message.get("role"), HumanMessage)(content=content))
+    return messages
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    """Handles POST /openai/v1/chat/completions; everything else is 404."""
+
+    responder = None  # set by serve()
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass  # keep load-test output readable
+
+    def _send_json(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        if self.path.rstrip("/") != COMPLETIONS_PATH:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        messages = to_messages(request.get("messages", []))
+        model = request.get("model", "fake-llm")
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+
+        time.sleep(self.responder.latency.sample())
+
+        tools = request.get("tools") or []
+        if tools:
+            content = None
+            tool_calls = [{
+                "id": f"call_{uuid.uuid4().hex[:8]}",
+                "type": "function",
+                "function": {"name": tools[0]["function"]["name"], "arguments": json.dumps(route(messages))},
+            }]
+            usage_text = tool_calls[0]["function"]["arguments"]
+        else:
+            content = self.responder.respond(messages)
+            tool_calls = None
+            usage_text = content
+
+        counts = self.responder.usage(messages, usage_text)
+        usage = {"prompt_tokens": counts["input_tokens"], "completion_tokens": counts["output_tokens"],
+                 "total_tokens": counts["total_tokens"]}
+
+        if request.get("stream"):
+            self._stream(completion_id, model, content, tool_calls, usage)
+            return
+
+        message = {"role": "assistant", "content": content}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self._send_json(200, {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message,
+                         "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": usage,
+        })
+
+    def _stream(self, completion_id, model, content, tool_calls, usage):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        def send(delta, finish_reason=None, extra=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+                **(extra or {}),
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode("utf-8"))
+            self.wfile.flush()
+
+        send({"role": "assistant", "content": ""})
+        if tool_calls:
+            send({"tool_calls": [{"index": 0, **tool_calls[0]}]})
+        else:
+            for token in self.responder.tokens(content):
+                send({"content": token})
+                time.sleep(self.responder.token_delay)
+        send({}, "tool_calls" if tool_calls else "stop", {"x_groq": {"usage": usage}})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def serve(host: str = "127.0.0.1", port: int = 8765, responder: FakeResponder = None) -> ThreadingHTTPServer:
+    """Create the server (call serve_forever() on it, or run it in a thread)."""
+    handler = type("Handler", (FakeLLMHandler,), {"responder": responder or FakeResponder()})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fake Groq-compatible LLM server for load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", default=None, help='Latency spec, e.g. "lognormal:0.4:1.2" (default FAKE_LLM_LATENCY)')
+    parser.add_argument("--token-delay", type=float, default=None, help="Seconds between streamed tokens")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--script", default=None, help="JSON file of scripted rules")
+    args = parser.parse_args()
+
+    responder = FakeResponder(latency=args.latency, token_delay=args.token_delay, seed=args.seed, script=args.script)
+    server = serve(args.host, args.port, responder)
+    print(f"Fake LLM listening on http://{args.host}:{args.port}{COMPLETIONS_PATH}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""
+End-to-end load test for the chat API.
+
+Replays multi-turn conversation scripts (scenarios.json) against the API at
+a target concurrency: each virtual user runs one conversation at a time in
+its own session, turn after turn. Reports per-turn latency percentiles,
+throughput and error rates, and can fail the run when thresholds are
+exceeded, for use as a regression gate. Turns that name an expected intent
+or answering action (the tool node, e.g. "book_hotel") count as errors when
+they are routed elsewhere, so a misroute cannot pass as a fast turn.
+
+Against a running server (Flask or ASGI):
+    python -m loadtest.load_driver --url http://localhost:5000 --concurrency 20 --conversations 200
+
+Fully offline, in one process (Flask app + in-process fake LLM, no network):
+    python -m loadtest.load_driver --in-process --concurrency 20 --conversations 200 --latency lognormal:0.2:0.6
+
+Add --stream to use /api/chat/stream and also report time to first token.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+DEFAULT_SCENARIOS = os.path.join(os.path.dirname(__file__), "scenarios.json")
+
+
+# ==================== Clients ====================
+
+class HTTPClient:
+    """Talks to a running server over HTTP; one requests.Session per virtual user."""
+
+    def __init__(self, base_url: str, timeout: float = 60.0):
+        import requests
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self._local = threading.local()
+        self._requests = requests
+
+    def _session(self):
+        if not hasattr(self._local, "session"):
+            self._local.session = self._requests.Session()
+        return self._local.session
+
+    def post_json(self, path: str, body: Dict) -> (int, Dict):
+        response = self._session().post(f"{self.base_url}{path}", json=body, timeout=self.timeout)
+        return response.status_code, response.json()
+
+    def post_stream(self, path: str, body: Dict):
+        """Yield (event, data) pairs from a server-sent-event response."""
+        with self._session().post(f"{self.base_url}{path}", json=body, stream=True,
+                                  timeout=self.timeout) as response:
+            if response.status_code != 200:
+                yield "error", {"message": f"HTTP {response.status_code}"}
+                return
+            yield from parse_sse(response.iter_lines(decode_unicode=True))
+
+
+class InProcessClient:
+    """Drives flask_app in this process through Flask's test client (no sockets)."""
+
+    def __init__(self):
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        sys.path.insert(0, root)
+        import flask_app
+        self.app = flask_app.app
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, "client"):
+            self._local.client = self.app.test_client()
+        return self._local.client
+
+    def post_json(self, path: str, body: Dict) -> (int, Dict):
+        response = self._client().post(path, json=body)
+        return response.status_code, response.get_json()
+
+    def post_stream(self, path: str, body: Dict):
+        response = self._client().post(path, json=body, buffered=False)
+        if response.status_code != 200:
+            yield "error", {"message": f"HTTP {response.status_code}"}
+            return
+        lines = (line for chunk in response.response for line in chunk.decode("utf-8").splitlines())
+        yield from parse_sse(lines)
+
+
+def parse_sse(lines):
+    """Parse "event:"/"data:" lines into (event, data) pairs."""
+    event = None
+    for line in lines:
+        if line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            yield event, json.loads(line[len("data:"):])
+
+
+# ==================== Load Run ====================
+
+class Recorder:
+    """Thread-safe collection of per-turn results."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = []
+        self.first_token = []
+        self.errors = Counter()
+        self.turns = 0
+        self.conversations = 0
+
+    def turn(self, latency: float, error: Optional[str] = None, first_token: Optional[float] = None):
+        with self._lock:
+            self.turns += 1
+            if error:
+                self.errors[error] += 1
+            else:
+                self.latencies.append(latency)
+                if first_token is not None:
+                    self.first_token.append(first_token)
+
+    def conversation_done(self):
+        with self._lock:
+            self.conversations += 1
+
+
+def check_expected(turn: Dict, answer: Dict) -> Optional[str]:
+    """Error for a turn whose intent or answering action differs from the scenario's expectation."""
+    for field in ("intent", "action"):
+        if field in turn and answer.get(field) != turn[field]:
+            return f"{turn['message'][:40]!r}: expected {field} {turn[field]}, got {answer.get(field) or 'none'}"
+    return None
+
+
+def run_turn(client, session_id: str, turn: Dict, stream: bool, recorder: Recorder):
+    body = {"session_id": session_id, "message": turn["message"], "idempotency_key": uuid.uuid4().hex}
+    start = time.perf_counter()
+    try:
+        if stream:
+            first_token, error = None, "stream ended without done event"
+            for event, data in client.post_stream("/api/chat/stream", body):
+                if event == "token" and first_token is None:
+                    first_token = time.perf_counter() - start
+                elif event == "done":
+                    error = check_expected(turn, data)
+                elif event == "error":
+                    error = data.get("message", "error")[:80]
+            recorder.turn(time.perf_counter() - start, error, first_token)
+        else:
+            status, data = client.post_json("/api/chat", body)
+            if status != 200 or (data or {}).get("status") != "success":
+                error = f"HTTP {status}: {((data or {}).get('message') or '')[:80]}"
+            else:
+                error = check_expected(turn, data)
+            recorder.turn(time.perf_counter() - start, error)
+    except Exception as e:
+        recorder.turn(time.perf_counter() - start, f"{type(e).__name__}: {str(e)[:80]}")
+
+
+def run_conversation(client, scenario: Dict, run_id: str, number: int, stream: bool, recorder: Recorder):
+    session_id = f"load-{run_id}-{number}"
+    for turn in scenario["turns"]:
+        # A turn is a message, or {"message", "intent", "action"} with the expected routing
+        run_turn(client, session_id, turn if isinstance(turn, dict) else {"message": turn}, stream, recorder)
+    try:
+        client.post_json("/api/end_session", {"session_id": session_id})
+    except Exception:
+        pass
+    recorder.conversation_done()
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile (0 for an empty list)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(int(round(pct / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(recorder: Recorder, elapsed: float, concurrency: int) -> Dict:
+    error_count = sum(recorder.errors.values())
+    report = {
+        "concurrency": concurrency,
+        "conversations": recorder.conversations,
+        "turns": recorder.turns,
+        "errors": error_count,
+        "error_rate": round(error_count / recorder.turns, 4) if recorder.turns else 0.0,
+        "elapsed_seconds": round(elapsed, 2),
+        "turns_per_second": round(recorder.turns / elapsed, 2) if elapsed else 0.0,
+        "latency_seconds": {name: round(percentile(recorder.latencies, pct), 3)
+                            for name, pct in (("p50", 50), ("p95", 95), ("p99", 99), ("max", 100))},
+        "error_types": dict(recorder.errors.most_common(10)),
+    }
+    if recorder.first_token:
+        report["first_token_seconds"] = {name: round(percentile(recorder.first_token, pct), 3)
+                                         for name, pct in (("p50", 50), ("p95", 95), ("p99", 99))}
+    return report
+
+
+def print_report(report: Dict):
+    print("\n" + "=" * 60)
+    print("LOAD TEST RESULTS")
+    print("=" * 60)
+    print(f"Concurrency:     {report['concurrency']}")
+    print(f"Conversations:   {report['conversations']}")
+    print(f"Turns:           {report['turns']} in {report['elapsed_seconds']}s "
+          f"({report['turns_per_second']} turns/s)")
+    print(f"Errors:          {report['errors']} ({report['error_rate']:.2%})")
+    latency = report["latency_seconds"]
+    print(f"Latency (s):     p50 {latency['p50']}  p95 {latency['p95']}  p99 {latency['p99']}  max {latency['max']}")
+    if "first_token_seconds" in report:
+        ttft = report["first_token_seconds"]
+        print(f"First token (s): p50 {ttft['p50']}  p95 {ttft['p95']}  p99 {ttft['p99']}")
+    for error, count in report["error_types"].items():
+        print(f"  {count:5d} x {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay conversation scripts against the chat API")
+    parser.add_argument("--url", default="http://localhost:5000", help="Base URL of a running server")
+    parser.add_argument("--in-process", action="store_true",
+                        help="Drive flask_app in this process with the fake LLM instead of a server")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS, help="JSON list of {name, turns}; a turn may be {message, intent, action}")
+    parser.add_argument("--concurrency", type=int, default=10, help="Virtual users running at once")
+    parser.add_argument("--conversations", type=int, default=100, help="Total conversations to run")
+    parser.add_argument("--stream", action="store_true", help="Use /api/chat/stream and report time to first token")
+    parser.add_argument("--latency", default=None, help="Fake LLM latency spec for --in-process")
+    parser.add_argument("--json", dest="json_path", default=None, help="Also write the report to this file")
+    parser.add_argument("--max-p95", type=float, default=None, help="Exit 1 if p95 latency exceeds this (s)")
+    parser.add_argument("--max-error-rate", type=float, default=None, help="Exit 1 if the error rate exceeds this")
+    args = parser.parse_args()
+
+    with open(args.scenarios, "r", encoding="utf-8") as f:
+        scenarios = json.load(f)
+
+    if args.in_process:
+        os.environ.setdefault("LLM_BACKEND", "fake")
+        if args.latency is not None:
+            os.environ["FAKE_LLM_LATENCY"] = args.latency
+        client = InProcessClient()
+    else:
+        client = HTTPClient(args.url)
+
+    run_id = uuid.uuid4().hex[:8]
+    recorder = Recorder()
+    print(f"Running {args.conversations} conversations at concurrency {args.concurrency} "
+          f"({'stream' if args.stream else 'chat'} endpoint, {len(scenarios)} scenarios)...")
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for number in range(args.conversations):
+            pool.submit(run_conversation, client, scenarios[number % len(scenarios)], run_id, number,
+                        args.stream, recorder)
+    report = summarize(recorder, time.perf_counter() - start, args.concurrency)
+
+    print_report(report)
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    failed = False
+    if args.max_p95 is not None and report["latency_seconds"]["p95"] > args.max_p95:
+        print(f"\nFAIL: p95 latency {report['latency_seconds']['p95']}s exceeds {args.max_p95}s")
+        failed = True
+    if args.max_error_rate is not None and report["error_rate"] > args.max_error_rate:
+        print(f"\nFAIL: error rate {report['error_rate']:.2%} exceeds {args.max_error_rate:.2%}")
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()